@@ -0,0 +1,316 @@
+# backend/analytics.py
+"""
+Колоночная выгрузка утверждений и отчётов для аналитики (Parquet, нужен pyarrow).
+
+Вместо чтения коллекций Firestore документ за документом периодическая задача
+export_analytics дописывает новые и изменённые документы в Parquet-файлы, а запросы
+читают только нужные колонки этих файлов:
+
+    python analytics.py export                       # то же, что делает задача beat
+    python analytics.py verdicts [--since 2026-01-01] # распределение вердиктов по языкам
+    python analytics.py cache-age                    # возраст кэшированных вердиктов по языкам
+    python analytics.py top-claims [--limit 20] [--lang ru]  # утверждения из наибольшего числа отчётов
+
+Раскладка (каталог ANALYTICS_EXPORT_DIR, партиции в стиле Hive):
+  claims/lang=ru/month=2026-10/part-<run>.parquet   — 'claims' по last_checked_at;
+  reports/lang=ru/month=2026-10/part-<run>.parquet  — 'analyses' по updated_at
+                                                      (отчёты без updated_at ещё не проверены и не выгружаются);
+  <dataset>/_watermark.json                         — последний выгруженный last_checked_at/updated_at
+                                                      и id его документа (курсор firestore_scan).
+
+Изменённый документ дописывается новой строкой; запросы берут по каждому ключу
+строку с наибольшим водяным полем. Поэтому повторная выгрузка после сбоя
+(файлы записаны, водяной знак — нет) даёт лишь дубликаты, которые отбрасываются при чтении.
+"""
+import argparse
+import json
+import os
+import sys
+import uuid
+from datetime import datetime, timezone, timedelta
+
+import firestore_scan
+from constants import (ANALYTICS_EXPORT_DIR, ANALYTICS_FIRESTORE_PAGE_SIZE, ANALYTICS_MAX_ROWS_PER_RUN,
+                       CACHE_EXPIRATION_DAYS, DEFAULT_LANGUAGE)
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+EXPORT_DIR = os.environ.get('ANALYTICS_EXPORT_DIR', ANALYTICS_EXPORT_DIR)
+WATERMARK_FILE = '_watermark.json'  # файлы с '_' и '.' в начале pyarrow.dataset пропускает
+
+
+def _claim_row(doc_id, data):
+    sources = data.get('sources')
+    return {
+        "claim_hash": doc_id,
+        "claim": data.get('claim'),
+        "verdict": data.get('verdict'),
+        "confidence_percentage": _int(data.get('confidence_percentage')),
+        "sources_count": len(sources) if isinstance(sources, list) else 0,
+        "last_checked_at": data.get('last_checked_at'),
+    }
+
+
+def _report_row(doc_id, data):
+    from tasks import get_claim_hash
+    results = data.get('detailed_results') or []
+    summary = data.get('summary_data') or {}
+    return {
+        "analysis_id": doc_id,
+        "status": data.get('status'),
+        "input_type": data.get('input_type'),
+        "overall_verdict": summary.get('overall_verdict') if isinstance(summary, dict) else None,
+        "confirmed_credibility": _int(data.get('confirmed_credibility')),
+        "average_confidence": _int(data.get('average_confidence')),
+        "claim_hashes": [get_claim_hash(res['claim']) for res in results
+                         if isinstance(res, dict) and res.get('claim')],
+        "created_at": _timestamp(data.get('created_at')),
+        "updated_at": data.get('updated_at'),
+    }
+
+
+def _schemas():
+    timestamp = pa.timestamp('us', tz='UTC')
+    return {
+        'claims': pa.schema([
+            ("claim_hash", pa.string()), ("claim", pa.string()), ("verdict", pa.string()),
+            ("confidence_percentage", pa.int32()), ("sources_count", pa.int32()),
+            ("last_checked_at", timestamp),
+        ]),
+        'reports': pa.schema([
+            ("analysis_id", pa.string()), ("status", pa.string()), ("input_type", pa.string()),
+            ("overall_verdict", pa.string()), ("confirmed_credibility", pa.int32()),
+            ("average_confidence", pa.int32()), ("claim_hashes", pa.list_(pa.string())),
+            ("created_at", timestamp), ("updated_at", timestamp),
+        ]),
+    }
+
+
+# Выгружаемые коллекции: водяное поле, ключ строки и поля, которые читаются из Firestore
+DATASETS = {
+    'claims': {
+        'collection': 'claims',
+        'order_field': 'last_checked_at',
+        'key': 'claim_hash',
+        'fields': ['claim', 'verdict', 'confidence_percentage', 'sources', 'target_lang', 'last_checked_at'],
+        'row': _claim_row,
+    },
+    'reports': {
+        'collection': 'analyses',
+        'order_field': 'updated_at',
+        'key': 'analysis_id',
+        'fields': ['status', 'input_type', 'target_lang', 'summary_data', 'confirmed_credibility',
+                   'average_confidence', 'detailed_results', 'created_at', 'updated_at'],
+        'row': _report_row,
+    },
+}
+
+
+def _int(value):
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def _timestamp(value):
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _dataset_dir(name):
+    return os.path.join(EXPORT_DIR, name)
+
+
+def read_watermark(name):
+    """Курсор (время, id документа) последней выгруженной строки или None."""
+    try:
+        with open(os.path.join(_dataset_dir(name), WATERMARK_FILE), encoding='utf-8') as f:
+            saved = json.load(f)
+    except FileNotFoundError:
+        return None
+    return datetime.fromisoformat(saved['watermark']), saved.get('doc_id')
+
+
+def _write_watermark(name, watermark):
+    changed_at, doc_id = watermark
+    path = os.path.join(_dataset_dir(name), WATERMARK_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({"watermark": changed_at.isoformat(), "doc_id": doc_id,
+                   "exported_at": datetime.now(timezone.utc).isoformat()}, f)
+    os.replace(path + '.tmp', path)
+
+
+def _write_partitions(name, rows_by_partition, run_id):
+    schema = _schemas()[name]
+    for (lang, month), rows in rows_by_partition.items():
+        directory = os.path.join(_dataset_dir(name), f"lang={lang}", f"month={month}")
+        os.makedirs(directory, exist_ok=True)
+        # Пишем во временный файл с точкой в начале: читатели не увидят недописанный Parquet
+        temp_path = os.path.join(directory, f".part-{run_id}.parquet.tmp")
+        pq.write_table(pa.Table.from_pylist(rows, schema=schema), temp_path, compression='zstd')
+        os.replace(temp_path, os.path.join(directory, f"part-{run_id}.parquet"))
+
+
+def export_dataset(db, name, run_id):
+    """Дописывает в датасет документы, изменённые после водяного знака. Возвращает число строк."""
+    source = DATASETS[name]
+    order_field = source['order_field']
+    watermark = read_watermark(name)
+    rows_by_partition, exported = {}, 0
+    for doc in firestore_scan.walk_changed_documents(db, source['collection'], order_field, source['fields'],
+                                                     ANALYTICS_FIRESTORE_PAGE_SIZE, watermark):
+        data = doc.to_dict()
+        changed_at = _timestamp(data.get(order_field))
+        if changed_at is None:
+            continue
+        row = source['row'](doc.id, {**data, order_field: changed_at})
+        lang = data.get('target_lang') or DEFAULT_LANGUAGE
+        rows_by_partition.setdefault((lang, changed_at.strftime('%Y-%m')), []).append(row)
+        watermark = (changed_at, doc.id)
+        exported += 1
+        if exported >= ANALYTICS_MAX_ROWS_PER_RUN:
+            break  # остальное дочитает следующий запуск
+    if exported:
+        _write_partitions(name, rows_by_partition, run_id)
+        _write_watermark(name, watermark)
+    return exported
+
+
+def export(db):
+    """
+    Точка входа для периодической задачи: инкрементальная выгрузка всех датасетов.
+    Возвращает {датасет: число выгруженных строк}.
+    """
+    if pa is None:
+        print("[analytics] pyarrow is not installed, export skipped")
+        return {}
+    run_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    return {name: export_dataset(db, name, run_id) for name in DATASETS}
+
+
+# --- Запросы к выгруженным файлам ---
+
+def load(name, columns=None):
+    """
+    Актуальные строки датасета (последняя версия каждого документа) или None, если файлов нет.
+    columns — нужные колонки; ключ, водяное поле и партиции (lang, month) читаются всегда.
+    """
+    directory = _dataset_dir(name)
+    if not os.path.isdir(directory):
+        return None
+    source = DATASETS[name]
+    key, order_field = source['key'], source['order_field']
+    dataset = ds.dataset(directory, format='parquet', partitioning='hive')
+    if columns is not None:
+        columns = list(dict.fromkeys([key, order_field, 'lang', 'month', *columns]))
+    table = dataset.to_table(columns=columns)
+    if table.num_rows == 0:
+        return table
+    table = table.sort_by([(key, 'ascending'), (order_field, 'descending')])
+    keys = table[key].combine_chunks()
+    # После сортировки первая строка каждого ключа — самая свежая
+    is_first = pc.not_equal(keys.slice(1), keys.slice(0, len(keys) - 1)).fill_null(True)
+    return table.filter(pa.concat_arrays([pa.array([True]), is_first]))
+
+
+def _print_rows(header, rows):
+    widths = [max(len(str(value)) for value in column) for column in zip(header, *rows)]
+    for line in [header, *rows]:
+        print("  ".join(str(value).ljust(width) for value, width in zip(line, widths)).rstrip())
+
+
+def query_verdicts(since=None):
+    """Распределение вердиктов по языкам (актуальные вердикты кэша 'claims')."""
+    table = load('claims', ['verdict'])
+    if not table:
+        print("No exported claims")
+        return
+    if since:
+        table = table.filter(pc.greater_equal(table['last_checked_at'],
+                                              pa.scalar(_timestamp(since), pa.timestamp('us', tz='UTC'))))
+    counts = table.group_by(['lang', 'verdict']).aggregate([('claim_hash', 'count')]).to_pylist()
+    totals = {}
+    for item in counts:
+        totals[item['lang']] = totals.get(item['lang'], 0) + item['claim_hash_count']
+    counts.sort(key=lambda item: (str(item['lang']), -item['claim_hash_count']))
+    _print_rows(("lang", "verdict", "claims", "share"),
+                [(item['lang'], item['verdict'], item['claim_hash_count'],
+                  f"{100 * item['claim_hash_count'] / totals[item['lang']]:.1f}%") for item in counts])
+
+
+def query_cache_age():
+    """Сколько вердиктов каждого языка свежие, скоро устареют и уже просрочены."""
+    table = load('claims', [])
+    if not table:
+        print("No exported claims")
+        return
+    now = datetime.now(timezone.utc)
+    bounds = [0] + [days for days in (7, 30) if days < CACHE_EXPIRATION_DAYS] + [CACHE_EXPIRATION_DAYS]
+    buckets = [(f"{newer}-{older}d", newer, older) for newer, older in zip(bounds, bounds[1:])]
+    buckets.append(("expired", CACHE_EXPIRATION_DAYS, None))
+    timestamp = pa.timestamp('us', tz='UTC')
+    by_lang = {}
+    for label, newer_days, older_days in buckets:
+        mask = pc.less_equal(table['last_checked_at'], pa.scalar(now - timedelta(days=newer_days), timestamp))
+        if older_days is not None:
+            mask = pc.and_(mask, pc.greater(table['last_checked_at'],
+                                            pa.scalar(now - timedelta(days=older_days), timestamp)))
+        for item in table.filter(mask).group_by('lang').aggregate([('claim_hash', 'count')]).to_pylist():
+            by_lang.setdefault(item['lang'], {})[label] = item['claim_hash_count']
+    _print_rows(("lang", *[label for label, _, _ in buckets]),
+                [(lang, *[counts.get(label, 0) for label, _, _ in buckets])
+                 for lang, counts in sorted(by_lang.items())])
+
+
+def query_top_claims(limit=20, lang=None):
+    """Утверждения, встречающиеся в наибольшем числе отчётов, с их текущим вердиктом."""
+    reports = load('reports', ['claim_hashes'])
+    if not reports:
+        print("No exported reports")
+        return
+    if lang:
+        reports = reports.filter(pc.equal(reports['lang'], lang))
+    counts = pc.value_counts(pc.list_flatten(reports['claim_hashes'])).to_pylist()
+    counts = sorted(counts, key=lambda item: -item['counts'])[:limit]
+    claims = load('claims', ['claim', 'verdict']) or pa.table({'claim_hash': pa.array([], pa.string())})
+    top_hashes = pa.array([item['values'] for item in counts], pa.string())
+    claims = {row['claim_hash']: row for row in claims.filter(pc.is_in(claims['claim_hash'], top_hashes)).to_pylist()}
+    _print_rows(("reports", "verdict", "claim"),
+                [(item['counts'], claims.get(item['values'], {}).get('verdict') or '-',
+                  (claims.get(item['values'], {}).get('claim') or item['values'])[:100]) for item in counts])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export claims and reports to Parquet and query the export.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('export', help="incremental export from Firestore")
+    verdicts_parser = commands.add_parser('verdicts', help="verdict distribution per language")
+    verdicts_parser.add_argument('--since', type=datetime.fromisoformat, help="only verdicts checked since this ISO date")
+    commands.add_parser('cache-age', help="age of cached verdicts per language")
+    top_parser = commands.add_parser('top-claims', help="claims that appear in the most reports")
+    top_parser.add_argument('--limit', type=int, default=20)
+    top_parser.add_argument('--lang', help="only reports in this language")
+    args = parser.parse_args()
+
+    if pa is None:
+        print("pyarrow is not installed: pip install pyarrow")
+        sys.exit(1)
+    if args.command == 'export':
+        from tasks import get_db_client
+        print(f"Exported rows: {export(get_db_client())}")
+    elif args.command == 'verdicts':
+        query_verdicts(args.since)
+    elif args.command == 'cache-age':
+        query_cache_age()
+    else:
+        query_top_claims(args.limit, args.lang)
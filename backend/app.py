@@ -1,5 +1,9 @@
 import os
-from flask import Flask, request, jsonify, render_template, make_response, redirect, url_for, g, current_app
+import re
+import time
+import threading
+import redis
+from flask import Flask, request, jsonify, render_template, make_response, redirect, url_for, g, current_app, send_from_directory, Response
 from flask_cors import CORS
 from celery.result import AsyncResult
 from datetime import datetime
@@ -7,21 +11,57 @@ from google.cloud.firestore_v1.query import Query
 from flask_babel import Babel, _
 from datetime import datetime, timezone, timedelta
 from constants import CACHE_EXPIRATION_DAYS
-from constants import BLOG_POSTING_INTERVAL_MINUTES
+from constants import BLOG_POSTING_INTERVAL_MINUTES, SITEMAP_REFRESH_MINUTES, LANGUAGES, DEFAULT_LANGUAGE
+from constants import CLAIM_REFRESH_INTERVAL_MINUTES, BACKGROUND_TASK_PRIORITY, BULK_MAX_INPUTS
+from constants import ANALYTICS_EXPORT_INTERVAL_MINUTES, FEED_REBUILD_INTERVAL_MINUTES
+from constants import (CELERY_RESULT_EXPIRES_SECONDS, CELERY_RESULT_COMPRESSION, SEARCH_PAGE_SIZE,
+                       CELERY_VISIBILITY_TIMEOUT_SECONDS, REPORT_STREAM_MAX_SECONDS, FEED_PAGE_SIZE,
+                       REPORT_STREAM_MAX_CONNECTIONS)
 
 from celery_init import celery as celery_app
-from tasks import get_db_client
+from tasks import get_db_client, build_claims_for_selection, is_youtube_url
+import doc_cache
+import batches
+import search_index
+import resilience
+import report_stream
+import feeds
+import sitemaps
+import tracing
+from blob_store import get_blob
+from hreflang import hreflang_links
+from responses import FastJSONProvider, compress_response, analysis_etag, list_etag, conditional_json
+from assets import StaticAssetsMiddleware, asset_url_for, DIST_DIR, IMMUTABLE_CACHE_CONTROL
+from routing import (LocaleRoutingMiddleware, SUPPORTED_LANGUAGES, LANGUAGE_LOOKUP,
+                     preferred_language, is_bot_user_agent)
 
 app = Flask(__name__)
+# Tracing is optional (see tracing.py); the request span wraps every other request hook
+tracing.setup()
+tracing.init_app(app)
+app.json = FastJSONProvider(app)
+app.after_request(compress_response)
 CORS(app)
 
 # --- ВСТАВЬТЕ ЭТОТ БЛОК КОДА СЮДА ---
 # --- ЦЕНТРАЛЬНАЯ КОНФИГУРАЦИЯ CELERY (ИСПРАВЛЕННАЯ) ---
 app.config.update(
     broker_url=os.environ.get('REDIS_URL', 'redis://localhost:6379/0'), # <-- НОВОЕ ИМЯ
-    result_backend=os.environ.get('REDIS_URL', 'redis://localhost:6379/0') # <-- НОВОЕ ИМЯ
+    result_backend=os.environ.get('REDIS_URL', 'redis://localhost:6379/0'), # <-- НОВОЕ ИМЯ
+    # Результаты компактные (fact_check возвращает ссылку на отчёт) и живут недолго
+    result_expires=CELERY_RESULT_EXPIRES_SECONDS,
+    result_compression=CELERY_RESULT_COMPRESSION,
+    # fact_check подтверждается после выполнения (acks_late): воркер не должен держать лишних сообщений без ack
+    worker_prefetch_multiplier=1,
 )
 celery_app.conf.update(app.config)
+# Приоритеты задач в Redis-брокере: фоновые перепроверки не должны обгонять запросы пользователей
+celery_app.conf.broker_transport_options = {
+    'priority_steps': list(range(10)),
+    'queue_order_strategy': 'priority',
+    # Задачи воркера, убитого целиком (деплой, OOM), вернутся в очередь через это время
+    'visibility_timeout': CELERY_VISIBILITY_TIMEOUT_SECONDS,
+}
 # ... остальной код конфигурации ...
 
 # Явно указываем, где искать задачи
@@ -34,6 +74,25 @@ celery_app.conf.beat_schedule = {
         'task': 'tasks.generate_and_publish_article',
         'schedule': 60.0 * BLOG_POSTING_INTERVAL_MINUTES,
     },
+    'regenerate-sitemaps': {
+        'task': 'tasks.regenerate_sitemaps',
+        'schedule': 60.0 * SITEMAP_REFRESH_MINUTES,
+    },
+    'refresh-expiring-claims': {
+        'task': 'tasks.refresh_expiring_claims',
+        'schedule': 60.0 * CLAIM_REFRESH_INTERVAL_MINUTES,
+        'options': {'priority': BACKGROUND_TASK_PRIORITY},
+    },
+    'rebuild-feeds': {
+        'task': 'tasks.rebuild_feeds',
+        'schedule': 60.0 * FEED_REBUILD_INTERVAL_MINUTES,
+        'options': {'priority': BACKGROUND_TASK_PRIORITY},
+    },
+    'export-analytics': {
+        'task': 'tasks.export_analytics',
+        'schedule': 60.0 * ANALYTICS_EXPORT_INTERVAL_MINUTES,
+        'options': {'priority': BACKGROUND_TASK_PRIORITY},
+    },
 }
 # --- КОНЕЦ БЛОКА ---
 
@@ -43,25 +102,11 @@ from blog import bp as blog_bp
 app.register_blueprint(blog_bp, url_prefix='/<lang>/blog')
 # =================================================
 
-# Initialize g.current_lang to None at the beginning of each request.
-# This ensures it's always defined.
+# Ensure g.current_lang is always defined. before_request functions run *after*
+# url_value_preprocessors, so keep the value pull_lang_from_url may already have set.
 @app.before_request
 def ensure_g():
-    g.current_lang = None
-
-LANGUAGES = {
-    'en': {'name': 'English', 'flag': '🇺🇸'},
-    'es': {'name': 'Español', 'flag': '🇪🇸'},
-    'zh': {'name': '中文', 'flag': '🇨🇳'},
-    'hi': {'name': 'हिन्दी', 'flag': '🇮🇳'},
-    'fr': {'name': 'Français', 'flag': '🇫🇷'},
-    'ar': {'name': 'العربية', 'flag': '🇸🇦'},
-    'bn': {'name': 'বাংলা', 'flag': '🇧🇩'},
-    'ru': {'name': 'Русский', 'flag': '🇷🇺'},
-    'uk': {'name': 'Українська', 'flag': '🇺🇦'},
-    'pt': {'name': 'Português', 'flag': '🇵🇹'},
-    'de': {'name': 'Deutsch', 'flag': '🇩🇪'}
-}
+    g.setdefault('current_lang', None)
 
 # Mapping for og:locale meta tag
 OG_LOCALE_MAPPING = {
@@ -78,159 +123,98 @@ OG_LOCALE_MAPPING = {
     'de': 'de_DE'
 }
 
-app.config['BABEL_DEFAULT_LOCALE'] = 'en'
-SUPPORTED_LANGUAGES_IN_URL = list(LANGUAGES.keys())
+app.config['BABEL_DEFAULT_LOCALE'] = DEFAULT_LANGUAGE
+SUPPORTED_LANGUAGES_IN_URL = SUPPORTED_LANGUAGES
+
+# Host redirects and lang-prefix redirects happen in the WSGI middleware before Flask
+# dispatch (see routing.py), so every request that reaches the views below already
+# carries a supported language prefix (or is an API/static/sitemap path).
+app.wsgi_app = LocaleRoutingMiddleware(app.wsgi_app, app.url_map)
+# Built static assets (see assets.py) are answered from memory, precompressed, ahead of everything else
+app.wsgi_app = StaticAssetsMiddleware(app.wsgi_app)
 
 def get_locale():
     # 1. Use language from URL if available and valid (set in g.current_lang by pull_lang_from_url)
-    if hasattr(g, 'current_lang') and g.current_lang in SUPPORTED_LANGUAGES_IN_URL:
+    if getattr(g, 'current_lang', None) in LANGUAGE_LOOKUP:
         return g.current_lang
 
-    # This part is primarily for determining language for initial redirection
-    # from non-prefixed URLs, or if URL lang was invalid.
-    # 2. Language code from 'lang' cookie
-    lang_code = request.cookies.get('lang')
-    if lang_code and lang_code in SUPPORTED_LANGUAGES_IN_URL:
-        return lang_code
-
-    # 3. Best match from Accept-Language header
-    best_match = request.accept_languages.best_match(SUPPORTED_LANGUAGES_IN_URL)
-    if best_match:
-        return best_match
-
-    # 4. Fallback to default locale
-    return current_app.config['BABEL_DEFAULT_LOCALE']
+    # 2. Language code from 'lang' cookie, 3. best match from Accept-Language (memoized),
+    # 4. fallback to default locale
+    return preferred_language(request.cookies.get('lang'), request.headers.get('Accept-Language'))
 
 babel = Babel(app, locale_selector=get_locale)
 
 @app.url_value_preprocessor
 def pull_lang_from_url(endpoint, values):
     # This preprocessor runs *after* the route is matched but *before* the view function.
-    # 'values' contains the matched URL parameters.
+    # 'values' contains the matched URL parameters. Invalid prefixes (e.g. /xx/report/123)
+    # were already redirected by LocaleRoutingMiddleware; default just in case.
     if values and 'lang' in values:
-        url_lang_candidate = values['lang']
-        if url_lang_candidate in SUPPORTED_LANGUAGES_IN_URL:
-            g.current_lang = url_lang_candidate # Set if valid
-        else:
-            # Invalid lang in URL (e.g., /xx/report/123)
-            # We will redirect to the default language version of the same page.
-            # Set g.current_lang to the default so get_locale() called by Babel picks it up for this cycle if no redirect happens.
-            g.current_lang = current_app.config['BABEL_DEFAULT_LOCALE']
-
-            # Construct the path for redirection
-            path_parts = request.path.split('/') # Example: ['', 'xx', 'report', '123']
-            if len(path_parts) > 1 and path_parts[1] == url_lang_candidate: # path_parts[0] is empty
-                path_parts[1] = g.current_lang # Replace 'xx' with 'en'
-                new_path = "/".join(path_parts)
-                if request.query_string:
-                    new_path += f"?{request.query_string.decode('utf-8')}"
-
-                # Returning a response from url_value_preprocessor short-circuits the request
-                # and issues the response (the redirect).
-                return redirect(new_path, code=302) # Temporary redirect
-
-@app.before_request
-def global_before_request_handler():
-    # This runs after ensure_g and after url_value_preprocessor for matched routes.
-
-    # 1. Domain redirection (if necessary)
-    old_domain = "propacondom.com"
-    new_domain = "factchecking.pro"
-    if request.host.startswith(old_domain):
-        new_url = f"https://{new_domain}{request.full_path}"
-        if new_url.endswith('?'): # Avoid trailing '?' if no query string
-            new_url = new_url[:-1]
-        return redirect(new_url, code=301) # Permanent redirect for domain change
-    if request.path in ['/robots.txt', '/sitemap.xml']:
-        return None
-    # 2. Language prefix redirection for non-API, non-static routes
-    # This section handles requests that either:
-    #   a) Don't have a language prefix (e.g., `/` or `/report/xyz`)
-    #   b) Matched a route *without* a `<lang>` parameter (e.g. old @app.route('/'), @app.route('/report/...'))
-    # It relies on g.current_lang NOT being set by pull_lang_from_url (which means no valid lang prefix was in the URL that matched a <lang> rule).
-    first_segment = request.path.lstrip('/').split('/', 1)[0]
-    if first_segment in SUPPORTED_LANGUAGES_IN_URL:
-        # Уже есть lang-префикс, ничего не делаем!
-        return None
-    if not g.current_lang and request.endpoint and not request.path.startswith('/api/') and request.endpoint != 'static':
-        preferred_lang_for_redirect = get_locale()
-        current_path = request.path
-        if current_path == '/':
-            new_path = f"/{preferred_lang_for_redirect}/"
-        else:
-            new_path = f"/{preferred_lang_for_redirect}{current_path}"
-        if request.query_string:
-            new_path += f"?{request.query_string.decode('utf-8')}"
-        return redirect(new_path, code=302)
+        g.current_lang = values['lang'] if values['lang'] in LANGUAGE_LOOKUP else DEFAULT_LANGUAGE
 
 class FlaskTask(celery_app.Task):
     def __call__(self, *args, **kwargs):
-        with app.app_context():
+        # Continues the trace of the request that enqueued the task (queue wait + execution spans)
+        with app.app_context(), tracing.task_span(self):
             return self.run(*args, **kwargs)
 
 celery_app.Task = FlaskTask
 
+# Request-independent template values are registered once instead of on every render.
+app.jinja_env.globals.update(
+    LANGUAGES=LANGUAGES,
+    SUPPORTED_LANGS_FOR_HREFLANG=SUPPORTED_LANGUAGES_IN_URL,
+    OG_LOCALE_MAPPING=OG_LOCALE_MAPPING,
+    url_for=asset_url_for
+)
+
 @app.context_processor
 def inject_conf_var():
-    # g.current_lang should be reliably set by pull_lang_from_url if a valid lang is in the URL.
-    # If not (e.g. during initial redirect, or if URL had no lang prefix),
-    # get_locale() determines the language Babel will use.
-    # This ensures CURRENT_LANG in templates is consistent with what Babel is using.
-
-    # If g.current_lang was set from a valid URL segment, it's the source of truth.
-    # Otherwise, get_locale() provides the language determined by cookie/header/default, which Babel also uses.
-    template_current_lang = g.current_lang if hasattr(g, 'current_lang') and g.current_lang in SUPPORTED_LANGUAGES_IN_URL else get_locale()
-
-    def hreflang_url(endpoint, view_args, lang):
-        args = dict(view_args) if view_args else {}
-        args['lang'] = lang
-        # Ensure absolute URLs for hreflang tags
-        return url_for(endpoint, _external=True, **args)
-    return dict(
-        LANGUAGES=LANGUAGES,
-        CURRENT_LANG=template_current_lang,
-        SUPPORTED_LANGS_FOR_HREFLANG=SUPPORTED_LANGUAGES_IN_URL,
-        hreflang_url=hreflang_url,
-        OG_LOCALE_MAPPING=OG_LOCALE_MAPPING
-    )
+    # g.current_lang is set by pull_lang_from_url if a valid lang is in the URL; otherwise
+    # get_locale() falls back to cookie/header/default, which is also what Babel uses.
+    # This keeps CURRENT_LANG in templates consistent with the Babel locale.
+    context = {'CURRENT_LANG': get_locale(), 'HREFLANG_LINKS': (), 'CANONICAL_URL': None}
+    # All hreflang alternates of a lang-prefixed page, built in one pass and memoized per page
+    # (see hreflang.py); the canonical/og:url is the alternate for the page's own language.
+    view_args = request.view_args or {}
+    if request.endpoint and request.endpoint not in ('static', 'set_language') and 'lang' in view_args:
+        links = hreflang_links(request.endpoint, view_args, request.url_root)
+        context['HREFLANG_LINKS'] = links
+        context['CANONICAL_URL'] = dict(links).get(view_args['lang'])
+    return context
+
+def providers_unavailable_response(providers):
+    """
+    503 with a clear status when a provider the task needs has an open circuit breaker
+    (see resilience.py), so the request fails fast instead of queueing behind a degraded provider.
+    """
+    unavailable = resilience.unavailable_providers(providers)
+    if not unavailable:
+        return None
+    retry_after = max(seconds for _, seconds in unavailable)
+    response = jsonify({
+        "error": "An upstream provider is temporarily unavailable. Please try again shortly.",
+        "status": "PROVIDER_UNAVAILABLE",
+        "providers": [provider for provider, _ in unavailable],
+        "retry_after": retry_after,
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
 
 @app.route('/api/report/<analysis_id>')
 def get_report_or_selection(analysis_id):
-    db = get_db_client()
-    doc = db.collection('analyses').document(analysis_id).get()
-    if not doc.exists:
+    data = doc_cache.get_document('analyses', analysis_id)
+    if data is None:
         return jsonify({'error': 'Not found'}), 404
-    data = doc.to_dict()
     status = data.get('status', 'UNKNOWN')
     if status == 'COMPLETED':
+        etag = analysis_etag(analysis_id, data)
         data['id'] = analysis_id
-        if 'extracted_claims' not in data:
-            db = get_db_client()
-            doc = db.collection('analyses').document(analysis_id).get()
-            if doc.exists:
-                doc_data = doc.to_dict()
-                data['extracted_claims'] = doc_data.get('extracted_claims', [])
-            else:
-                data['extracted_claims'] = []
-        return jsonify(data)
+        data.setdefault('extracted_claims', [])
+        return conditional_json(data, etag)
     elif status == 'PENDING_SELECTION':
-        claims_ref = db.collection('claims')
-        cache_expiry_date = datetime.now(timezone.utc) - timedelta(days=CACHE_EXPIRATION_DAYS)
-        claims_for_selection = []
-        for claim in data.get("extracted_claims", []):
-            claim_hash = claim["hash"]
-            claim_text = claim["text"]
-            claim_doc = claims_ref.document(claim_hash).get()
-            claim_info = { "hash": claim_hash, "text": claim_text }
-            if claim_doc.exists:
-                cached_data = claim_doc.to_dict()
-                last_checked = cached_data.get('last_checked_at')
-                if last_checked and last_checked.replace(tzinfo=timezone.utc) > cache_expiry_date:
-                    claim_info["is_cached"] = True
-                    claim_info["cached_data"] = { "verdict": cached_data.get("verdict", ""), "last_checked_at": str(last_checked) }
-                else: claim_info["is_cached"] = False
-            else: claim_info["is_cached"] = False
-            claims_for_selection.append(claim_info)
+        claims_for_selection = build_claims_for_selection(data.get("extracted_claims", []), data.get("target_lang"))
         return jsonify({
             "status": "PENDING_SELECTION", "claims_for_selection": claims_for_selection,
             "video_title": data.get("video_title") or data.get("title") or "",
@@ -247,6 +231,9 @@ def fact_check_selected():
         return jsonify({"error": "analysis_id and a list of selected_claims_data are required"}), 400
     analysis_id = data['analysis_id']
     selected_claims = data['selected_claims_data']
+    unavailable = providers_unavailable_response(['gemini', 'google_search'])
+    if unavailable is not None:
+        return unavailable
     task = celery_app.send_task('tasks.fact_check_selected', args=[analysis_id, selected_claims])
     return jsonify({"task_id": task.id}), 202
 
@@ -259,8 +246,8 @@ def set_language_prefixed(lang, lang_code_to_set):
 # This route will be updated later to handle redirection to new lang-prefixed URLs
 @app.route('/set_language/<lang_code_to_set>')
 def set_language(lang_code_to_set):
-    if lang_code_to_set not in SUPPORTED_LANGUAGES_IN_URL:
-        lang_code_to_set = current_app.config['BABEL_DEFAULT_LOCALE']
+    if lang_code_to_set not in LANGUAGE_LOOKUP:
+        lang_code_to_set = DEFAULT_LANGUAGE
 
     redirect_url = None
 
@@ -336,25 +323,127 @@ def analyze():
     # For API, language can be passed in payload or defaults via get_locale (cookie/header based)
     # API calls are not prefixed, so g.current_lang won't be set from URL.
     target_lang = data.get('lang', get_locale())
-    if target_lang not in SUPPORTED_LANGUAGES_IN_URL:
-        target_lang = current_app.config['BABEL_DEFAULT_LOCALE']
+    if target_lang not in LANGUAGE_LOOKUP:
+        target_lang = DEFAULT_LANGUAGE
+    providers = ['gemini', 'searchapi'] if is_youtube_url(user_input) else ['gemini']
+    unavailable = providers_unavailable_response(providers)
+    if unavailable is not None:
+        return unavailable
     task = celery_app.send_task('tasks.extract_claims', args=[user_input, target_lang])
     return jsonify({"task_id": task.id}), 202
 
+@app.route('/api/analyze_bulk', methods=['POST'])
+def analyze_bulk():
+    data = request.get_json()
+    if not data or not isinstance(data.get('inputs'), list) or not data['inputs']:
+        return jsonify({"error": "A non-empty list of inputs is required"}), 400
+    if len(data['inputs']) > BULK_MAX_INPUTS:
+        return jsonify({"error": f"At most {BULK_MAX_INPUTS} inputs per request"}), 400
+    if not all(isinstance(item, str) and item.strip() for item in data['inputs']):
+        return jsonify({"error": "Every input must be a non-empty string"}), 400
+    target_lang = data.get('lang', get_locale())
+    if target_lang not in LANGUAGE_LOOKUP:
+        target_lang = DEFAULT_LANGUAGE
+    providers = ['gemini']
+    if any(isinstance(item, str) and is_youtube_url(item) for item in data['inputs']):
+        providers.append('searchapi')
+    if data.get('auto_fact_check'):
+        providers.append('google_search')
+    unavailable = providers_unavailable_response(providers)
+    if unavailable is not None:
+        return unavailable
+    batch_id, total, duplicates = batches.create_batch(data['inputs'], target_lang,
+                                                       auto_fact_check=bool(data.get('auto_fact_check')))
+    return jsonify({"batch_id": batch_id, "total": total, "duplicates": duplicates}), 202
+
+@app.route('/api/batch/<batch_id>', methods=['GET'])
+def get_batch_status(batch_id):
+    status = batches.get_status(batch_id)
+    if status is None:
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify(status)
+
+def resolve_task_result(result):
+    """
+    Tasks that produce a full report only store a pointer ({"result_ref": "analyses/<id>", ...})
+    in the result backend; load the referenced document on demand.
+    """
+    if not isinstance(result, dict) or 'result_ref' not in result:
+        return result
+    collection, doc_id = result['result_ref'].split('/', 1)
+    data = doc_cache.get_document(collection, doc_id)
+    if data is None:
+        return result
+    data['id'] = doc_id
+    data.setdefault('extracted_claims', [])
+    return data
+
 @app.route('/api/status/<task_id>', methods=['GET'])
 def get_status(task_id):
     try:
         task_result = AsyncResult(task_id, app=celery_app)
+        result = task_result.result if task_result.state == 'SUCCESS' else None
+        # ?resolve=0 returns just the stored pointer/summary (the frontend only needs result.id)
+        if request.args.get('resolve') != '0':
+            result = resolve_task_result(result)
         response_data = {
             'status': task_result.state,
             'info': task_result.info if task_result.state != 'SUCCESS' else None,
-            'result': task_result.result if task_result.state == 'SUCCESS' else None
+            'result': result
         }
+        if task_result.state == 'SUCCESS':
+            # A finished task never changes; a resolved report changes only with its analysis
+            etag = f"{task_id}:{request.args.get('resolve', '1')}"
+            if isinstance(result, dict) and 'updated_at' in result:
+                etag += f":{analysis_etag(result.get('id'), result)}"
+            return conditional_json(response_data, etag)
         return jsonify(response_data)
     except Exception as e:
         print(f"Error getting task status for {task_id}: {e}")
         return jsonify({'status': 'FAILURE', 'result': 'Could not retrieve task status from backend.'}), 500
 
+STREAM_ID_RE = re.compile(r'^\d+-\d+$')
+stream_slots = threading.BoundedSemaphore(REPORT_STREAM_MAX_CONNECTIONS)
+
+@app.route('/api/status/<task_id>/stream', methods=['GET'])
+def stream_status(task_id):
+    """
+    Server-Sent Events for a running fact-check: verdict cards and the summary as it is generated
+    (see report_stream.py). The connection is closed after REPORT_STREAM_MAX_SECONDS to free the
+    gunicorn thread; EventSource reconnects with Last-Event-ID and continues where it left off.
+    Each stream holds a gunicorn thread, so at most REPORT_STREAM_MAX_CONNECTIONS run at once;
+    beyond that the client gets 204, which stops EventSource, and the page falls back to polling.
+    """
+    if not stream_slots.acquire(blocking=False):
+        return '', 204
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_id') or '0'
+    if not STREAM_ID_RE.match(last_id):
+        last_id = '0'
+
+    def events(last_id):
+        deadline = time.monotonic() + REPORT_STREAM_MAX_SECONDS
+        yield "retry: 1000\n\n"
+        while time.monotonic() < deadline:
+            try:
+                batch = report_stream.read(task_id, last_id)
+            except redis.RedisError as e:
+                print(f"Report stream for {task_id} failed: {e}")
+                return
+            if not batch:
+                yield ": keep-alive\n\n"
+                continue
+            for stream_id, event, data in batch:
+                last_id = stream_id
+                yield f"id: {stream_id}\nevent: {event}\ndata: {data}\n\n"
+                if event in report_stream.FINAL_EVENTS:
+                    return
+
+    response = Response(events(last_id), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Released when the server closes the response, whether or not the generator ever started
+    response.call_on_close(stream_slots.release)
+    return response
+
 def get_analyses(last_timestamp_str=None):
     db = get_db_client()
     query = db.collection('analyses').order_by('created_at', direction=Query.DESCENDING)
@@ -375,12 +464,47 @@ def get_analyses(last_timestamp_str=None):
         results.append(data)
     return results
 
+@app.route('/api/search', methods=['GET'])
+def api_search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Query parameter q is required"}), 400
+    lang = request.args.get('lang', get_locale())
+    try:
+        page = int(request.args.get('page', 1))
+        page_size = int(request.args.get('page_size', SEARCH_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "page and page_size must be integers"}), 400
+    try:
+        return jsonify(search_index.search(query, lang, page, page_size))
+    except Exception as e:
+        print(f"Error in /api/search: {e}")
+        return jsonify({"error": "Search is temporarily unavailable"}), 503
+
+@app.route('/api/feed', methods=['GET'])
+def api_feed():
+    """
+    Completed reports in the visitor's language, newest first (see feeds.py).
+    ?type=youtube|url|text narrows the feed, ?cursor= is next_cursor of the previous page,
+    ?page_size= is clamped to the allowed range and echoed back.
+    """
+    lang = request.args.get('lang', get_locale())
+    try:
+        page = feeds.get_page(lang, request.args.get('type', feeds.ALL), request.args.get('cursor'),
+                              request.args.get('page_size', FEED_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    except Exception as e:
+        print(f"Error in /api/feed: {e}")
+        return jsonify({"error": "Failed to fetch the feed"}), 500
+    return conditional_json(page, f"{list_etag(page['items'])}:{page['page_size']}")
+
 @app.route('/api/get_recent_analyses', methods=['GET'])
 def api_get_recent_analyses():
     last_timestamp = request.args.get('last_timestamp')
     try:
         analyses = get_analyses(last_timestamp)
-        return jsonify(analyses)
+        return conditional_json(analyses, list_etag(analyses))
     except Exception as e:
         print(f"Error in /api/get_recent_analyses: {e}")
         return jsonify({"error": "Failed to fetch more analyses"}), 500
@@ -391,25 +515,24 @@ def api_get_recent_analyses():
 def serve_index(lang):
     print(f"SERVE_INDEX: lang={lang}, path={request.path}")
     try:
-        recent_analyses = get_analyses()
+        feed_page = feeds.get_page(lang)
         url_param = request.args.get('url', '')
-        return render_template("index.html", recent_analyses=recent_analyses, initial_url=url_param)
+        return render_template("index.html", recent_analyses=feed_page['items'],
+                               feed_cursor=feed_page['next_cursor'], initial_url=url_param)
     except Exception as e:
         print(f"Error fetching initial analyses: {e}")
-        return render_template("index.html", recent_analyses=[], initial_url='')
+        return render_template("index.html", recent_analyses=[], feed_cursor=None, initial_url='')
 
 @app.route('/<lang>/report/<analysis_id>', methods=['GET'])
 def serve_report(lang, analysis_id):
     try:
-        db = get_db_client()
-        doc_ref = db.collection('analyses').document(analysis_id)
-        doc = doc_ref.get()
-        if doc.exists:
-            report_data = doc.to_dict()
+        report_data = doc_cache.get_document('analyses', analysis_id)
+        if report_data is not None:
             if 'created_at' in report_data and hasattr(report_data['created_at'], 'isoformat'):
                 report_data['created_at'] = report_data['created_at'].isoformat()
-            recent_analyses = get_analyses()
-            return render_template('report.html', report=report_data, recent_analyses=recent_analyses)
+            feed_page = feeds.get_page(lang)
+            return render_template('report.html', report=report_data, recent_analyses=feed_page['items'],
+                                   feed_cursor=feed_page['next_cursor'])
         else:
             return _("Report not found"), 404
     except Exception as e:
@@ -429,121 +552,51 @@ def root_redirect():
     - Regular users are redirected based on their cookie or Accept-Language header.
     This prevents bots from being redirected based on their origin's Accept-Language
     if it doesn't match the site's primary content strategy for indexing.
+    Normally handled by LocaleRoutingMiddleware before Flask; kept as the routed fallback.
     """
-    user_agent_string = request.user_agent.string.lower()
-    bot_keywords = [
-        'googlebot', 'bingbot', 'slurp', 'duckduckbot', 'baiduspider',
-        'yandexbot', 'sogou', 'exabot', 'facebot', 'facebookexternalhit', # facebook
-        'twitterbot', 'linkedinbot', 'applebot', 'pinterest'
-    ]
-
-    is_bot_request = any(keyword in user_agent_string for keyword in bot_keywords)
-
-    if is_bot_request:
+    if is_bot_user_agent(request.user_agent.string):
         # For bots, always redirect to the default language homepage (e.g., English)
         # This ensures consistent indexing.
-        default_lang_for_bots = app.config.get('BABEL_DEFAULT_LOCALE', 'en')
-        # Add a comment indicating this behavior for future reference.
-        # Comment: Bots visiting root are redirected to the default language version.
-        print(f"Bot detected: {user_agent_string}, redirecting to /{default_lang_for_bots}/") # For logging
-        return redirect(url_for('serve_index', lang=default_lang_for_bots), code=302)
-    else:
-        # For regular users, determine preferred language via get_locale()
-        # (which checks URL, then cookie, then Accept-Language header, then default)
-        preferred_lang = get_locale()
-        return redirect(url_for('serve_index', lang=preferred_lang), code=302)
+        return redirect(url_for('serve_index', lang=DEFAULT_LANGUAGE), code=302)
+    # For regular users, determine preferred language via get_locale()
+    # (which checks URL, then cookie, then Accept-Language header, then default)
+    return redirect(url_for('serve_index', lang=get_locale()), code=302)
 
 # Sitemap generation
 @app.route('/sitemap.xml', methods=['GET', 'HEAD'])
 def sitemap():
     """
-    Generates the sitemap.xml dynamically.
-    Includes homepage and a generic report page for each supported language.
-    Provides alternate hreflang links for each URL.
+    Serves the sitemap index precomputed by the `tasks.regenerate_sitemaps` beat job.
+    The index points at gzip shards under /sitemaps/ listing every completed report,
+    every blog article and the homepages, each with hreflang alternates.
+    Until the first run has finished, falls back to a plain urlset of the homepages.
     """
-    xml_parts = [
-        '<?xml version="1.0" encoding="UTF-8"?>',
-        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"',
-        '        xmlns:xhtml="http://www.w3.org/1999/xhtml">'
-    ]
-
-    # Define pages to include in the sitemap (endpoint name and view_args if any)
-    # For dynamic parts like <analysis_id>, we list the general structure.
-    # Actual sitemaps might list specific important URLs, but for a dynamic app,
-    # this approach is more manageable for on-the-fly generation.
-    pages_to_map = [
-        ('serve_index', {}),
-        # Add other key public page endpoints here if they exist
-        # For example, if there was a generic '/<lang>/reports/' page:
-        # ('serve_reports_overview', {})
-        # For now, we don't have a generic reports list page, only individual ones.
-        # We will represent the report section by its structure.
-        # A true sitemap for individual reports would require fetching all report IDs.
-        # For simplicity, we will point to the base structure, implying /<lang>/report/*
-        # This is a common simplification. Alternatively, one could list a few recent reports.
-        # For this exercise, we will only add a conceptual entry for reports.
-        # In a real-world scenario, one might list top N reports or use a separate sitemap for reports.
-    ]
-
-    # Add a conceptual entry for the report structure
-    # This doesn't create a sitemap entry for /<lang>/report/ directly as it's not a page,
-    # but signals to search engines that URLs under /<lang>/report/ exist.
-    # A more robust way for numerous items is a sitemap index file.
-    # For now, we'll list the main index pages.
-    # If we had a page like /en/reports (plural) that lists reports, we'd add its endpoint.
-    # Since /<lang>/report/<id> is the structure, we'll skip adding a generic /<lang>/report/
-    # to the sitemap unless it's an actual browseable page.
-    # Let's assume for now `serve_report` is for specific reports and not a generic listing.
-
-    supported_langs = list(LANGUAGES.keys())
-    default_lang = app.config['BABEL_DEFAULT_LOCALE'] # 'en'
-
-    for endpoint_name, view_args in pages_to_map:
-        for lang_code in supported_langs:
-            # Create the primary URL for the current language
-            loc_args = view_args.copy()
-            loc_args['lang'] = lang_code
-            # Ensure SERVER_NAME is configured for url_for to generate absolute URLs
-            # If not, it will generate relative URLs. For sitemaps, absolute URLs are required.
-            # Flask's url_for generates absolute URLs if app.config['SERVER_NAME'] is set
-            # and _external=True. If not set, we might need to prepend the domain manually.
-            # For this exercise, we assume it's configured or will be.
-            # A common setup is to set app.config['SERVER_NAME'] = 'factchecking.pro'
-            # and app.config['APPLICATION_ROOT'] = '/'
-            # and app.config['PREFERRED_URL_SCHEME'] = 'https'
-            # For now, let's ensure _external=True and rely on Flask's behavior.
-            # It's crucial that the server is configured for this.
-            # If request context is available (which it is in a route), _external=True works.
-
-            # Construct URL, ensuring it's absolute
-            # For sitemap, we need absolute URLs. url_for with _external=True
-            # relies on request context or SERVER_NAME configuration.
-            # In a route handler, request context is available.
-            current_url = url_for(endpoint_name, _external=True, _scheme='https', **loc_args)
-
-            xml_parts.append('  <url>')
-            xml_parts.append(f'    <loc>{current_url}</loc>')
-
-            # Add alternate links for all languages
-            for alt_lang_code in supported_langs:
-                alt_args = view_args.copy()
-                alt_args['lang'] = alt_lang_code
-                alt_url = url_for(endpoint_name, _external=True, _scheme='https', **alt_args)
-                xml_parts.append(f'    <xhtml:link rel="alternate" hreflang="{alt_lang_code}" href="{alt_url}"/>')
-
-            # Add x-default link (pointing to the default language version, e.g., English)
-            default_args = view_args.copy()
-            default_args['lang'] = default_lang
-            default_url = url_for(endpoint_name, _external=True, _scheme='https', **default_args)
-            xml_parts.append(f'    <xhtml:link rel="alternate" hreflang="x-default" href="{default_url}"/>')
-
-            xml_parts.append('  </url>')
-
-    xml_parts.append('</urlset>')
-    sitemap_xml = "\n".join(xml_parts)
+    sitemap_xml = get_blob(sitemaps.SITEMAP_INDEX_BLOB)
+    if sitemap_xml is None:
+        sitemap_xml = sitemaps.render_urlset(sitemaps.static_pages())
 
     response = make_response(sitemap_xml)
     response.headers["Content-Type"] = "application/xml"
+    response.headers["Cache-Control"] = "public, max-age=3600"
+    return response
+
+@app.route('/sitemaps/<name>', methods=['GET', 'HEAD'])
+def sitemap_shard(name):
+    """Serves one precomputed gzip sitemap shard as stored bytes."""
+    shard = get_blob(f"sitemaps/{name}") if name.endswith('.xml.gz') else None
+    if shard is None:
+        return "Not found", 404
+    response = make_response(shard)
+    response.headers["Content-Type"] = "application/gzip"
+    response.headers["Cache-Control"] = "public, max-age=3600"
+    return response
+
+# Fingerprinted static assets
+@app.route('/assets/<path:filename>', methods=['GET', 'HEAD'])
+def assets(filename):
+    """Fallback for fingerprinted assets; normally answered by StaticAssetsMiddleware."""
+    response = send_from_directory(DIST_DIR, filename)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
     return response
 
 # robots.txt generation
@@ -561,7 +614,8 @@ def robots_txt():
         lines.append(f"Allow: /{lang_code}/")
 
     # Allow crawling of the sitemap itself
-    lines.append("Allow: /sitemap.xml") # Path to the sitemap
+    lines.append("Allow: /sitemap.xml") # Path to the sitemap index
+    lines.append("Allow: /sitemaps/") # Sitemap shards listed in the index
 
     # Disallow API paths
     lines.append("Disallow: /api/")
@@ -0,0 +1,189 @@
+# backend/assets.py
+"""
+Сборка и раздача статики.
+
+Сборка (`python assets.py build`, выполняется в Dockerfile):
+  * минифицирует .js/.css (rjsmin/rcssmin, если установлены; CSS — простым
+    встроенным минификатором, JS без них остаётся как есть);
+  * кладёт файлы в static/dist/ под именами с хешем содержимого: script.3f2a9c1d0b7e.js;
+  * рядом пишет сжатые варианты .gz и .br (brotli — если установлен модуль brotli);
+  * сохраняет manifest.json: исходное имя -> имя с хешем.
+
+Раздача: StaticAssetsMiddleware держит собранные файлы в памяти и отвечает на
+/assets/<имя с хешем> (Cache-Control: immutable) и /static/<исходное имя> ещё до Flask,
+выбирая предсжатый вариант по Accept-Encoding.
+В шаблонах url_for('static', filename=...) подменяется на asset_url_for и выдаёт /assets/-ссылки.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import sys
+
+from flask import url_for
+from werkzeug.datastructures import Headers
+from werkzeug.wrappers import Request, Response
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BACKEND_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+ASSETS_URL_PREFIX = '/assets/'
+STATIC_URL_PREFIX = '/static/'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+STATIC_CACHE_CONTROL = 'public, max-age=3600'
+
+# Типы, которые имеет смысл сжимать (png/jpg уже сжаты)
+COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.svg', '.ico', '.json', '.txt', '.html'}
+# Файлы в порядке предпочтения: (content-coding, суффикс файла)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_SPACE_RE = re.compile(r'\s+')
+CSS_PUNCTUATION_RE = re.compile(r'\s*([{};:,>])\s*')
+
+
+# --- Сборка ---
+
+def minify_css(source):
+    try:
+        import rcssmin
+        return rcssmin.cssmin(source)
+    except ImportError:
+        source = CSS_COMMENT_RE.sub('', source)
+        source = CSS_SPACE_RE.sub(' ', source)
+        return CSS_PUNCTUATION_RE.sub(r'\1', source).replace(';}', '}').strip()
+
+
+def minify_js(source):
+    try:
+        import rjsmin
+        return rjsmin.jsmin(source)
+    except ImportError:
+        return source  # без настоящего парсера JS безопасно не минифицировать
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def _compress_variants(path, data):
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        return
+    with open(path + '.br', 'wb') as f:
+        f.write(brotli.compress(data, quality=11))
+
+
+def build(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """Собирает static/dist/ с нуля. Возвращает манифест."""
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    os.makedirs(dist_dir)
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist_dir]
+        for file_name in sorted(files):
+            source_path = os.path.join(root, file_name)
+            rel_path = os.path.relpath(source_path, static_dir).replace(os.sep, '/')
+            stem, ext = os.path.splitext(rel_path)
+            with open(source_path, 'rb') as f:
+                data = f.read()
+            if ext in MINIFIERS:
+                data = MINIFIERS[ext](data.decode('utf-8')).encode('utf-8')
+
+            hashed_name = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+            target_path = os.path.join(dist_dir, hashed_name)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            with open(target_path, 'wb') as f:
+                f.write(data)
+            if ext in COMPRESSIBLE_EXTENSIONS:
+                _compress_variants(target_path, data)
+            manifest[rel_path] = hashed_name
+
+    with open(os.path.join(dist_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Манифест сборки; пустой, если сборка не выполнялась (локальная разработка)."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+manifest = load_manifest()
+
+
+def asset_url_for(endpoint, **values):
+    """url_for для шаблонов: статика из манифеста получает адрес /assets/<имя с хешем>."""
+    if endpoint == 'static' and values.get('filename') in manifest:
+        values['filename'] = manifest[values['filename']]
+        return url_for('assets', **values)
+    return url_for(endpoint, **values)
+
+
+# --- Раздача ---
+
+class StaticAssetsMiddleware:
+    """
+    WSGI-обёртка: отдаёт собранную статику из памяти, не доходя до Flask.
+    Файлы, которых нет в манифесте, и всё остальное передаются дальше.
+    """
+
+    def __init__(self, wsgi_app, dist_dir=DIST_DIR):
+        self.wsgi_app = wsgi_app
+        self.files = {}
+        for original_name, hashed_name in load_manifest(os.path.join(dist_dir, 'manifest.json')).items():
+            entry = self._load_entry(os.path.join(dist_dir, hashed_name), hashed_name)
+            self.files[ASSETS_URL_PREFIX + hashed_name] = (entry, IMMUTABLE_CACHE_CONTROL)
+            self.files[STATIC_URL_PREFIX + original_name] = (entry, STATIC_CACHE_CONTROL)
+
+    @staticmethod
+    def _load_entry(path, hashed_name):
+        variants = {}
+        for encoding, suffix in (('identity', ''),) + ENCODINGS:
+            if os.path.exists(path + suffix):
+                with open(path + suffix, 'rb') as f:
+                    variants[encoding] = f.read()
+        content_type = mimetypes.guess_type(hashed_name)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type == 'application/javascript':
+            content_type += '; charset=utf-8'
+        return {'variants': variants, 'content_type': content_type,
+                'etag': hashlib.sha256(variants['identity']).hexdigest()[:16]}
+
+    def __call__(self, environ, start_response):
+        found = self.files.get(environ.get('PATH_INFO', ''))
+        if found is None or environ.get('REQUEST_METHOD') not in ('GET', 'HEAD'):
+            return self.wsgi_app(environ, start_response)
+        entry, cache_control = found
+        request = Request(environ)
+
+        headers = Headers({'Cache-Control': cache_control, 'Vary': 'Accept-Encoding',
+                           'ETag': f'"{entry["etag"]}"'})
+        if entry['etag'] in request.if_none_match:
+            return Response(status=304, headers=headers)(environ, start_response)
+
+        encoding = next((coding for coding, _ in ENCODINGS
+                         if coding in entry['variants'] and request.accept_encodings[coding]), 'identity')
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        body = entry['variants'][encoding]
+        response = Response(body, headers=headers, content_type=entry['content_type'])
+        return response(environ, start_response)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['build']:
+        print("Usage: python assets.py build")
+        sys.exit(1)
+    built = build()
+    print(f"Built {len(built)} assets into {DIST_DIR}")
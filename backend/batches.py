@@ -0,0 +1,183 @@
+# backend/batches.py
+"""
+Пакетный анализ: много входов (URL, YouTube, текст) в одном запросе /api/analyze_bulk.
+
+Состояние пакета хранится в Redis:
+  batch:{id}:meta     — язык, режим автопроверки, число элементов;
+  batch:{id}:items    — JSON-элементы по индексу (вход, стадия, id задач, analysis_id);
+  batch:{id}:pending  — индексы, ещё не отправленные в Celery.
+
+Одновременно в работе не больше BULK_MAX_CONCURRENCY элементов: сначала отправляется
+первое «окно», а каждый завершившийся элемент (через link/link_error колбэки) отправляет
+следующий. Входы, которые дают один и тот же analysis_id, отбрасываются как дубликаты.
+"""
+import json
+import time
+import uuid
+
+from celery_init import celery
+from constants import BULK_MAX_CONCURRENCY, BULK_BATCH_TTL_SECONDS
+from redis_store import get_redis_client
+
+# Стадии элемента пакета
+QUEUED = 'QUEUED'
+EXTRACTING = 'EXTRACTING'
+PENDING_SELECTION = 'PENDING_SELECTION'
+FACT_CHECKING = 'FACT_CHECKING'
+COMPLETED = 'COMPLETED'
+FAILED = 'FAILED'
+ACTIVE_STAGES = (QUEUED, EXTRACTING, FACT_CHECKING)
+
+# Чтение-изменение-запись элемента одной командой: KEYS[1] — хэш items, ARGV — индекс и JSON изменений
+UPDATE_ITEM_SCRIPT = """
+local raw = redis.call('HGET', KEYS[1], ARGV[1])
+local item = raw and cjson.decode(raw) or {}
+for field, value in pairs(cjson.decode(ARGV[2])) do
+    item[field] = value
+end
+local encoded = cjson.encode(item)
+redis.call('HSET', KEYS[1], ARGV[1], encoded)
+return encoded
+"""
+
+
+def _key(batch_id, name):
+    return f"batch:{batch_id}:{name}"
+
+
+def analysis_key(user_input, target_lang):
+    """
+    Ключ для дедупликации входов до запуска задач: для YouTube и текста он совпадает
+    с analysis_id; для веб-страниц analysis_id зависит от содержимого, поэтому берётся сам URL.
+    """
+    from tasks import is_youtube_url, is_url, get_video_id, get_text_hash
+    user_input = user_input.strip()
+    if is_youtube_url(user_input):
+        video_id = get_video_id(user_input)
+        if video_id:
+            return f"{video_id}_{target_lang}"
+    elif is_url(user_input):
+        return f"url:{user_input.rstrip('/')}_{target_lang}"
+    return f"text_{get_text_hash(user_input)}_{target_lang}"
+
+
+def create_batch(inputs, target_lang, auto_fact_check=False):
+    """
+    Сохраняет пакет и запускает первое окно задач. Возвращает (batch_id, число элементов, число дубликатов).
+    inputs — непустые строки (проверяет /api/analyze_bulk).
+    """
+    seen_keys = set()
+    items = []
+    for user_input in inputs:
+        key = analysis_key(user_input, target_lang)
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+        items.append({"input": user_input.strip(), "stage": QUEUED})
+    duplicates = len(inputs) - len(items)
+
+    batch_id = uuid.uuid4().hex
+    r = get_redis_client()
+    pipe = r.pipeline()
+    pipe.hset(_key(batch_id, 'meta'), mapping={
+        "lang": target_lang,
+        "auto_fact_check": int(bool(auto_fact_check)),
+        "total": len(items),
+        "created_at": int(time.time()),
+    })
+    if items:
+        pipe.hset(_key(batch_id, 'items'), mapping={index: json.dumps(item, ensure_ascii=False)
+                                                     for index, item in enumerate(items)})
+        pipe.rpush(_key(batch_id, 'pending'), *range(len(items)))
+    for name in ('meta', 'items', 'pending'):
+        pipe.expire(_key(batch_id, name), BULK_BATCH_TTL_SECONDS)
+    pipe.execute()
+
+    dispatch_next(batch_id, BULK_MAX_CONCURRENCY)
+    return batch_id, len(items), duplicates
+
+
+def get_meta(batch_id):
+    raw_meta = get_redis_client().hgetall(_key(batch_id, 'meta'))
+    if not raw_meta:
+        return None
+    meta = {name.decode(): value.decode() for name, value in raw_meta.items()}
+    meta["auto_fact_check"] = meta.get("auto_fact_check") == "1"
+    meta["total"] = int(meta.get("total", 0))
+    return meta
+
+
+def get_item(batch_id, index):
+    raw_item = get_redis_client().hget(_key(batch_id, 'items'), index)
+    return json.loads(raw_item) if raw_item else None
+
+
+def update_item(batch_id, index, **changes):
+    """Атомарно дописывает поля элемента (колбэки задач и dispatch_next пишут одновременно)."""
+    raw_item = get_redis_client().eval(UPDATE_ITEM_SCRIPT, 1, _key(batch_id, 'items'), index,
+                                       json.dumps(changes, ensure_ascii=False))
+    return json.loads(raw_item)
+
+
+def dispatch_next(batch_id, count=1):
+    """Отправляет в Celery следующие count элементов пакета."""
+    meta = get_meta(batch_id)
+    if meta is None:
+        return 0
+    r = get_redis_client()
+    dispatched = 0
+    for _ in range(count):
+        index = r.lpop(_key(batch_id, 'pending'))
+        if index is None:
+            break
+        index = int(index)
+        # Стадия пишется до отправки: колбэк быстрой задачи (например, уже готового анализа)
+        # может сработать раньше, чем вернётся send_task, и его стадию нельзя перезаписать
+        task_id = uuid.uuid4().hex
+        item = update_item(batch_id, index, stage=EXTRACTING, task_id=task_id)
+        _send(batch_id, index, 'tasks.extract_claims', [item["input"], meta["lang"]], task_id,
+              'tasks.batch_item_extracted')
+        dispatched += 1
+    return dispatched
+
+
+def start_fact_check(batch_id, index, analysis_id, selected_claims):
+    task_id = uuid.uuid4().hex
+    update_item(batch_id, index, stage=FACT_CHECKING, fact_check_task_id=task_id)
+    _send(batch_id, index, 'tasks.fact_check_selected', [analysis_id, selected_claims], task_id,
+          'tasks.batch_item_checked')
+
+
+def _send(batch_id, index, task_name, args, task_id, on_success):
+    """Отправляет задачу элемента с колбэками; если брокер недоступен, элемент помечается FAILED."""
+    try:
+        celery.send_task(
+            task_name, args=args, task_id=task_id,
+            link=celery.signature(on_success, args=(batch_id, index)),
+            link_error=celery.signature('tasks.batch_item_failed', args=(batch_id, index)),
+        )
+    except Exception as e:
+        print(f"[batches] Could not send {task_name} for {batch_id}/{index}: {e}")
+        update_item(batch_id, index, stage=FAILED, error=str(e))
+
+
+def get_status(batch_id):
+    """Сводный статус пакета: счётчики по стадиям и список элементов."""
+    meta = get_meta(batch_id)
+    if meta is None:
+        return None
+    raw_items = get_redis_client().hgetall(_key(batch_id, 'items'))
+    items = [json.loads(raw_items[index]) for index in sorted(raw_items, key=int)]
+    counts = {stage: 0 for stage in (QUEUED, EXTRACTING, PENDING_SELECTION, FACT_CHECKING, COMPLETED, FAILED)}
+    for item in items:
+        counts[item.get("stage", QUEUED)] += 1
+    in_progress = sum(counts[stage] for stage in ACTIVE_STAGES)
+    return {
+        "batch_id": batch_id,
+        "status": "PROGRESS" if in_progress else "SUCCESS",
+        "lang": meta["lang"],
+        "auto_fact_check": meta["auto_fact_check"],
+        "total": meta["total"],
+        "counts": counts,
+        "items": items,
+    }
@@ -0,0 +1,42 @@
+# backend/blob_store.py
+"""
+Хранилище заранее подготовленных байтов (sitemap-шарды и т.п.) в Redis:
+воркер пишет, веб отдаёт как есть. Поверх Redis — LRU в памяти процесса.
+"""
+import redis
+
+from constants import BLOB_CACHE_LOCAL_MAXSIZE, BLOB_CACHE_LOCAL_TTL_SECONDS
+from doc_cache import LRUCache
+from redis_store import get_redis_client
+
+local_blobs = LRUCache(BLOB_CACHE_LOCAL_MAXSIZE, BLOB_CACHE_LOCAL_TTL_SECONDS)
+
+
+def _blob_key(name):
+    return f"blob:{name}"
+
+
+def put_blob(name, data, ttl=None):
+    """Сохраняет байты под именем name (ttl в секундах, None — бессрочно)."""
+    get_redis_client().set(_blob_key(name), data, ex=ttl)
+    local_blobs.set(name, data)
+
+
+def get_blob(name):
+    """Возвращает байты или None, если такого блоба нет (или Redis недоступен)."""
+    data = local_blobs.get(name)
+    if data is not None:
+        return data
+    try:
+        data = get_redis_client().get(_blob_key(name))
+    except redis.RedisError as e:
+        print(f"[blob_store] Could not read {name}: {e}")
+        return None
+    if data is not None:
+        local_blobs.set(name, data)
+    return data
+
+
+def delete_blob(name):
+    local_blobs.pop(name)
+    get_redis_client().delete(_blob_key(name))
@@ -0,0 +1,78 @@
+# backend/blog/prerender.py
+"""
+Статические версии страниц блога: при публикации статьи воркер рендерит её страницу
+и индекс блога для каждого языка и кладёт сжатый gzip HTML в blob_store.
+Блюпринт отдаёт эти байты как есть — запрос краулера не читает Firestore.
+
+  blog/{lang}/index.html.gz          — индекс (последние BLOG_INDEX_SIZE статей), бессрочно;
+  blog/{lang}/articles/{slug}.html.gz — страница статьи, на BLOG_PRERENDER_TTL_SECONDS.
+
+Если блоба нет (истёк срок, Redis пуст), страница рендерится динамически
+и сохраняется снова — следующий запрос уже получит готовые байты.
+"""
+import gzip
+
+from flask import render_template
+from google.cloud import firestore
+
+from blob_store import put_blob
+from constants import BLOG_INDEX_SIZE, BLOG_PRERENDER_TTL_SECONDS, SITE_DOMAIN
+from routing import SUPPORTED_LANGUAGES
+
+SITE_URL = f"https://{SITE_DOMAIN}"
+
+
+def index_blob_name(lang):
+    return f"blog/{lang}/index.html.gz"
+
+
+def article_blob_name(lang, slug):
+    return f"blog/{lang}/articles/{slug}.html.gz"
+
+
+def render_index_page(articles):
+    return render_template('blog_index.html', articles=articles)
+
+
+def render_article_page(article):
+    return render_template('blog_article.html', article=article)
+
+
+def latest_articles(db):
+    query = db.collection('blog_articles').order_by(
+        'published_at', direction=firestore.Query.DESCENDING).limit(BLOG_INDEX_SIZE)
+    return [{"id": doc.id, **doc.to_dict()} for doc in query.stream()]
+
+
+def store_index(lang, html):
+    put_blob(index_blob_name(lang), gzip.compress(html.encode('utf-8'), mtime=0))
+
+
+def store_article(lang, slug, html):
+    put_blob(article_blob_name(lang, slug), gzip.compress(html.encode('utf-8'), mtime=0),
+             ttl=BLOG_PRERENDER_TTL_SECONDS)
+
+
+def _render_for(app, path, render):
+    # Контекст запроса к странице нужного языка: url_value_preprocessor выставит язык,
+    # а ссылки в шаблоне будут абсолютными для боевого домена.
+    with app.test_request_context(path, base_url=SITE_URL):
+        app.preprocess_request()
+        return render()
+
+
+def prerender(app, db, article=None):
+    """
+    Рендерит индекс блога (и страницу статьи, если передана) для всех языков.
+    Возвращает число сохранённых страниц.
+    """
+    articles = latest_articles(db)
+    stored = 0
+    for lang in SUPPORTED_LANGUAGES:
+        store_index(lang, _render_for(app, f"/{lang}/blog/", lambda: render_index_page(articles)))
+        stored += 1
+        if article is not None:
+            html = _render_for(app, f"/{lang}/blog/{article['slug']}", lambda: render_article_page(article))
+            store_article(lang, article['slug'], html)
+            stored += 1
+    return stored
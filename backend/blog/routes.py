@@ -1,10 +1,35 @@
 # backend/blog/routes.py
 
-from flask import render_template, abort
-from google.cloud import firestore
+import gzip
+
+from flask import abort, make_response, request
 from . import bp
+from .prerender import (index_blob_name, article_blob_name, render_index_page, render_article_page,
+                        latest_articles, store_index, store_article)
+from blob_store import get_blob
+from constants import BLOG_PAGE_CACHE_SECONDS
 from tasks import get_db_client
 
+
+def prerendered_response(name):
+    """
+    Готовая страница из blob_store (см. prerender.py) или None.
+    Клиентам с gzip отдаём сжатые байты как есть, остальным — распакованными.
+    """
+    blob = get_blob(name)
+    if blob is None:
+        return None
+    if request.accept_encodings['gzip']:
+        response = make_response(blob)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = make_response(gzip.decompress(blob))
+    response.headers['Content-Type'] = 'text/html; charset=utf-8'
+    response.headers['Cache-Control'] = f'public, max-age={BLOG_PAGE_CACHE_SECONDS}'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
 # БЫЛО:
 # @bp.route('/')
 # def blog_index():
@@ -14,16 +39,16 @@ from tasks import get_db_client
 def blog_index(lang): # <-- Добавьте 'lang' в качестве аргумента
     """
     Этот код выполняется, когда пользователь заходит на /<lang>/blog/
+    Обычно отдаёт страницу, заранее отрендеренную при публикации статьи.
     """
+    prerendered = prerendered_response(index_blob_name(lang))
+    if prerendered is not None:
+        return prerendered
     # 'lang' здесь не используется, так как язык обрабатывается
     # глобально через Babel, но функция ОБЯЗАНА его принять.
-    db = get_db_client()
-    query = db.collection('blog_articles').order_by(
-        'published_at', direction=firestore.Query.DESCENDING).limit(20)
-    
-    articles = [{"id": doc.id, **doc.to_dict()} for doc in query.stream()]
-    
-    return render_template('blog_index.html', articles=articles)
+    html = render_index_page(latest_articles(get_db_client()))
+    store_index(lang, html)
+    return html
 
 
 # БЫЛО:
@@ -35,7 +60,11 @@ def blog_index(lang): # <-- Добавьте 'lang' в качестве аргу
 def article_detail(lang, slug): # <-- Добавьте 'lang' и здесь
     """
     Этот код выполняется для адресов вида /<lang>/blog/my-first-article
+    Обычно отдаёт страницу, заранее отрендеренную при публикации статьи.
     """
+    prerendered = prerendered_response(article_blob_name(lang, slug))
+    if prerendered is not None:
+        return prerendered
     db = get_db_client()
     doc_ref = db.collection('blog_articles').document(slug)
     article_doc = doc_ref.get()
@@ -43,4 +72,6 @@ def article_detail(lang, slug): # <-- Добавьте 'lang' и здесь
     if not article_doc.exists:
         abort(404)
         
-    return render_template('blog_article.html', article=article_doc.to_dict())
\ No newline at end of file
+    html = render_article_page(article_doc.to_dict())
+    store_article(lang, slug, html)
+    return html
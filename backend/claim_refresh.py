@@ -0,0 +1,115 @@
+# backend/claim_refresh.py
+"""
+Stale-while-revalidate для вердиктов в коллекции 'claims'.
+
+  * каждая отправка утверждения на проверку увеличивает его счётчик популярности
+    в Redis (sorted set); просмотры отчёта и экрана выбора не считаются — опросы страницы
+    и краулеры не должны управлять перепроверками. Счётчики затухают с периодом
+    полураспада CLAIM_POPULARITY_HALF_LIFE_DAYS, набор обрезается до CLAIM_POPULARITY_MAX_ITEMS;
+  * периодическая задача перепроверяет самые популярные утверждения, у которых
+    срок CACHE_EXPIRATION_DAYS скоро истечёт, в пределах бюджета на запуск;
+  * если пользователь всё же попал на просроченный вердикт, ему отдаётся старый
+    вердикт с пометкой "refreshing", а перепроверка уходит в фон.
+"""
+import time
+from datetime import datetime, timezone, timedelta
+
+import redis
+
+import doc_cache
+from constants import (CACHE_EXPIRATION_DAYS, CLAIM_REFRESH_LEAD_DAYS, CLAIM_REFRESH_SCAN_LIMIT,
+                       CLAIM_MAX_STALE_DAYS, CLAIM_REFRESH_LOCK_SECONDS, CLAIM_POPULARITY_HALF_LIFE_DAYS,
+                       CLAIM_POPULARITY_MAX_ITEMS)
+from redis_store import get_redis_client
+
+POPULARITY_KEY = "claims:popularity"
+DECAYED_AT_KEY = "claims:popularity:decayed_at"
+
+
+def _refreshing_key(claim_hash):
+    return f"claims:refreshing:{claim_hash}"
+
+
+def claim_age(last_checked):
+    return datetime.now(timezone.utc) - last_checked.replace(tzinfo=timezone.utc)
+
+
+def is_fresh(last_checked):
+    return bool(last_checked) and claim_age(last_checked) < timedelta(days=CACHE_EXPIRATION_DAYS)
+
+
+def can_serve_stale(last_checked):
+    """Просроченный, но ещё не слишком старый вердикт можно показать, пока идёт перепроверка."""
+    return bool(last_checked) and claim_age(last_checked) < timedelta(days=CACHE_EXPIRATION_DAYS + CLAIM_MAX_STALE_DAYS)
+
+
+def record_claim_requests(claim_hashes):
+    """Учитывает отправку утверждений на проверку для ранжирования фоновых перепроверок."""
+    claim_hashes = [claim_hash for claim_hash in claim_hashes if claim_hash]
+    if not claim_hashes:
+        return
+    try:
+        pipe = get_redis_client().pipeline(transaction=False)
+        for claim_hash in claim_hashes:
+            pipe.zincrby(POPULARITY_KEY, 1, claim_hash)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"[claim_refresh] Could not record claim popularity: {e}")
+
+
+def mark_refreshing(claim_hash):
+    """Ставит метку "перепроверяется". False, если перепроверка уже идёт."""
+    try:
+        return bool(get_redis_client().set(_refreshing_key(claim_hash), 1, nx=True, ex=CLAIM_REFRESH_LOCK_SECONDS))
+    except redis.RedisError as e:
+        print(f"[claim_refresh] Could not mark {claim_hash} as refreshing: {e}")
+        return False
+
+
+def clear_refreshing(claim_hash):
+    try:
+        get_redis_client().delete(_refreshing_key(claim_hash))
+    except redis.RedisError as e:
+        print(f"[claim_refresh] Could not clear refreshing flag for {claim_hash}: {e}")
+
+
+def decay_popularity():
+    """
+    Уменьшает счётчики популярности пропорционально времени с прошлого затухания
+    и удаляет всё, что не входит в CLAIM_POPULARITY_MAX_ITEMS самых популярных.
+    """
+    try:
+        r = get_redis_client()
+        now = time.time()
+        decayed_at = float(r.getset(DECAYED_AT_KEY, now) or now)
+        weight = 0.5 ** ((now - decayed_at) / (CLAIM_POPULARITY_HALF_LIFE_DAYS * 86400))
+        pipe = r.pipeline()
+        if weight < 1:
+            pipe.zunionstore(POPULARITY_KEY, {POPULARITY_KEY: weight})
+        pipe.zremrangebyrank(POPULARITY_KEY, 0, -(CLAIM_POPULARITY_MAX_ITEMS + 1))
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"[claim_refresh] Could not decay claim popularity: {e}")
+
+
+def select_refresh_candidates(budget):
+    """
+    Самые популярные утверждения, чей вердикт истекает в ближайшие CLAIM_REFRESH_LEAD_DAYS дней
+    (или уже истёк). Возвращает список (claim_hash, claim_doc) длиной не больше budget.
+    """
+    popular_hashes = [claim_hash.decode() for claim_hash in
+                      get_redis_client().zrevrange(POPULARITY_KEY, 0, CLAIM_REFRESH_SCAN_LIMIT - 1)]
+    claim_docs = doc_cache.get_documents('claims', popular_hashes)
+    refresh_after = timedelta(days=CACHE_EXPIRATION_DAYS - CLAIM_REFRESH_LEAD_DAYS)
+    candidates = []
+    for claim_hash in popular_hashes:
+        claim_doc = claim_docs.get(claim_hash)
+        if not claim_doc or not claim_doc.get('claim'):
+            continue
+        last_checked = claim_doc.get('last_checked_at')
+        if last_checked and claim_age(last_checked) < refresh_after:
+            continue
+        candidates.append((claim_hash, claim_doc))
+        if len(candidates) >= budget:
+            break
+    return candidates
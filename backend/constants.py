@@ -1,20 +1,186 @@
 # constants.py
+# Языки интерфейса (префикс URL /<lang>/) и их отображение в переключателе
+LANGUAGES = {
+    'en': {'name': 'English', 'flag': '🇺🇸'},
+    'es': {'name': 'Español', 'flag': '🇪🇸'},
+    'zh': {'name': '中文', 'flag': '🇨🇳'},
+    'hi': {'name': 'हिन्दी', 'flag': '🇮🇳'},
+    'fr': {'name': 'Français', 'flag': '🇫🇷'},
+    'ar': {'name': 'العربية', 'flag': '🇸🇦'},
+    'bn': {'name': 'বাংলা', 'flag': '🇧🇩'},
+    'ru': {'name': 'Русский', 'flag': '🇷🇺'},
+    'uk': {'name': 'Українська', 'flag': '🇺🇦'},
+    'pt': {'name': 'Português', 'flag': '🇵🇹'},
+    'de': {'name': 'Deutsch', 'flag': '🇩🇪'}
+}
+DEFAULT_LANGUAGE = 'en'
+
+# Основной домен сайта (старый propacondom.com редиректится сюда)
+SITE_DOMAIN = 'factchecking.pro'
+
 # Максимальное число claims, которые можно извлечь из одного источника
 MAX_CLAIMS_EXTRACTED = 10
 
 # Максимум claims для проверки за раз (будет зависеть от подписки)
 MAX_CLAIMS_TO_CHECK = 5
 
+# === Модели Gemini по видам промптов (models.py), env GEMINI_MODEL_<KIND> переопределяет ===
+DEFAULT_GEMINI_MODEL = 'gemini-1.5-pro'
+GEMINI_MODELS = {
+    'moderation': 'gemini-1.5-flash',   # ответ одним словом OK/BLOCKED
+    'extraction': 'gemini-1.5-pro',
+    'verdict': 'gemini-1.5-pro',
+    'summary': 'gemini-1.5-flash',
+    'blog': 'gemini-1.5-flash',
+}
+
+# Сколько утверждений отправлять модели в одном запросе на вердикт (1 — по одному, как раньше)
+VERDICT_BATCH_SIZE = 5
+
 # Срок устаревания клейма для recheck (например, 30 дней)
 CACHE_EXPIRATION_DAYS = 30
 
+# === Фоновая перепроверка вердиктов (claim_refresh.py) ===
+CLAIM_REFRESH_INTERVAL_MINUTES = 30
+CLAIM_REFRESH_BUDGET = 20            # максимум перепроверок за один запуск
+CLAIM_REFRESH_SCAN_LIMIT = 500       # сколько самых популярных утверждений просматривать
+CLAIM_REFRESH_LEAD_DAYS = 3          # перепроверять за 3 дня до истечения CACHE_EXPIRATION_DAYS
+CLAIM_MAX_STALE_DAYS = 30            # дольше этого просроченный вердикт не показываем даже с пометкой
+CLAIM_REFRESH_LOCK_SECONDS = 600
+# Популярность утверждений (по отправкам на проверку) затухает с периодом полураспада
+# и хранится только для CLAIM_POPULARITY_MAX_ITEMS самых популярных
+CLAIM_POPULARITY_HALF_LIFE_DAYS = 7
+CLAIM_POPULARITY_MAX_ITEMS = 10000
+
+# === Спекулятивная проверка во время выбора утверждений (speculative.py) ===
+SPECULATIVE_FACT_CHECK_MODE = 'off'  # 'off' | 'search' | 'verdicts'; переопределяется env SPECULATIVE_FACT_CHECK
+SPECULATIVE_CLAIMS_BUDGET = 3        # сколько некэшированных утверждений проверять заранее на один анализ
+SPECULATIVE_RESULT_TTL_SECONDS = 1800
+
+# === Пакетный анализ /api/analyze_bulk (batches.py) ===
+BULK_MAX_INPUTS = 500              # максимум входов в одном запросе
+BULK_MAX_CONCURRENCY = 10          # сколько элементов пакета обрабатывается одновременно
+BULK_AUTO_SELECT_CLAIMS = 3        # сколько утверждений автоматически отправлять на проверку
+BULK_BATCH_TTL_SECONDS = 7 * 24 * 3600
+
+# === Хранение результатов Celery ===
+CELERY_RESULT_EXPIRES_SECONDS = 3600   # результаты нужны только пока фронтенд опрашивает /api/status
+CELERY_RESULT_COMPRESSION = 'zlib'
+
+# === Возобновляемая проверка утверждений (tasks.fact_check_selected) ===
+FACT_CHECK_TIME_LIMIT_SECONDS = 600
+FACT_CHECK_SOFT_TIME_LIMIT_SECONDS = 570  # успеть поставить повтор до жёсткого лимита
+FACT_CHECK_MAX_RETRIES = 3                # повторы после таймаута или недоступного провайдера
+FACT_CHECK_MAX_REDELIVERIES = 3           # сколько раз задачу можно получить заново после падения воркера
+# Сообщение без ack возвращается в очередь Redis через это время после выдачи воркеру:
+# должно быть больше самой долгой задачи с acks_late, иначе её выполнят дважды
+CELERY_VISIBILITY_TIMEOUT_SECONDS = 1200
+
+# Создавать клиентов Firestore/Gemini/Redis при старте дочернего процесса Celery (worker_process_init)
+WORKER_EAGER_INIT = True
+
+# === Сжатие ответов веб-процесса (responses.py) ===
+COMPRESSION_MIN_BYTES = 1024
+GZIP_COMPRESS_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# === Полнотекстовый поиск /api/search (search_index.py) ===
+SEARCH_PAGE_SIZE = 10
+SEARCH_MAX_PAGE_SIZE = 50
+SEARCH_MAX_QUERY_TERMS = 12
+
+# === Сбор фрагментов страниц для вердиктов (evidence.py) ===
+EVIDENCE_MAX_CONCURRENCY = 8            # одновременных загрузок страниц
+EVIDENCE_MAX_PAGE_BYTES = 512 * 1024    # читаем не больше этого с каждой страницы
+EVIDENCE_FETCH_TIMEOUT_SECONDS = 5
+EVIDENCE_DEADLINE_SECONDS = 12          # общий бюджет на загрузку страниц одного прогона
+EVIDENCE_DOMAIN_INTERVAL_SECONDS = 1.0  # пауза между запросами к одному домену
+EVIDENCE_PAGE_CACHE_TTL_SECONDS = 3 * 24 * 3600
+EVIDENCE_FAILED_PAGE_TTL_SECONDS = 3600
+EVIDENCE_MAX_PAGE_TEXT_CHARS = 100000
+EVIDENCE_PASSAGES_PER_PAGE = 3
+EVIDENCE_PASSAGE_CHARS = 600
+
+# === Ленты отчётов по языку и типу ввода (feeds.py) ===
+FEED_INPUT_TYPES = ('youtube', 'url', 'text')
+FEED_PAGE_SIZE = 10
+FEED_MIN_PAGE_SIZE = 5
+FEED_MAX_PAGE_SIZE = 50
+FEED_MAX_ITEMS = 1000             # сколько последних отчётов хранит лента одного языка
+FEED_FALLBACK_SCAN_LIMIT = 30     # документов Firestore на страницу, пока ленты не построены
+FEED_REBUILD_INTERVAL_MINUTES = 10  # beat проверяет, что ленты построены (иначе строит)
+FEED_REBUILD_LOCK_SECONDS = 600
+
+# === Поток событий проверки для страницы отчёта (report_stream.py) ===
+REPORT_STREAM_TTL_SECONDS = 3600
+REPORT_STREAM_MAXLEN = 2000
+REPORT_STREAM_MAX_SECONDS = 25   # дольше одно SSE-соединение не держит поток gunicorn; браузер переподключится
+# Одновременных SSE-соединений на процесс gunicorn (из 8 потоков); сверх лимита — 204, и страница опрашивает /api/status
+REPORT_STREAM_MAX_CONNECTIONS = 3
+
+# === Хеджирование и circuit breaker для внешних провайдеров (resilience.py) ===
+RESILIENCE_PROVIDERS = {
+    'gemini': {'hedge': True, 'initial_hedge_delay': 20.0},
+    'searchapi': {'hedge': True, 'initial_hedge_delay': 5.0},
+    'google_search': {'hedge': True, 'initial_hedge_delay': 3.0},
+}
+HEDGE_PERCENTILE = 0.95          # дубликат отправляется, когда вызов медленнее p95 недавних
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY_SECONDS = 0.5
+HEDGE_POOL_SIZE = 16             # запросов в пуле, включая брошенные; пул занят — вызов идёт без хеджа
+BREAKER_FAILURE_THRESHOLD = 5    # ошибок за окно, после которых цепь размыкается
+BREAKER_WINDOW_SECONDS = 60
+BREAKER_COOLDOWN_SECONDS = 30
+BREAKER_PROBATION_SECONDS = 120  # после паузы первая же ошибка снова размыкает цепь
+PROVIDER_TIMEOUT_SECONDS = 30    # таймаут HTTP-запросов к SearchAPI и Custom Search
+GEMINI_TIMEOUT_SECONDS = 120
+
+# Приоритет фоновых задач в брокере Redis (0 — наивысший, 9 — самый низкий)
+BACKGROUND_TASK_PRIORITY = 9
+
 # === Blog Generation Settings ===
 BLOG_POSTING_INTERVAL_MINUTES = 20000  # 1 раз в сутки. Для отладки можно поставить 10
 WORDS_PER_SECTION = 150
 SUMMARY_WORD_COUNT = 30
 BLOG_SECTIONS_PER_ARTICLE = 4
+# Сначала один вызов строит план (заголовок + заголовки секций), затем секции пишутся параллельно.
+# False — старый последовательный режим, где каждой секции передаются заголовки предыдущих.
+BLOG_OUTLINE_FIRST = True
+# Очередь тем (topic_queue.py): через сколько секунд невыполненная тема возвращается в очередь
+# и сколько попыток генерации даётся одной теме
+TOPIC_CLAIM_TIMEOUT_SECONDS = 3600
+TOPIC_MAX_ATTEMPTS = 3
+# Статические страницы блога (blog/prerender.py): индекс — последние BLOG_INDEX_SIZE статей,
+# страница статьи хранится в blob_store BLOG_PRERENDER_TTL_SECONDS и затем рендерится заново по запросу
+BLOG_INDEX_SIZE = 20
+BLOG_PRERENDER_TTL_SECONDS = 30 * 24 * 3600
+BLOG_PAGE_CACHE_SECONDS = 300  # Cache-Control для браузеров и CDN
 PROMO_LINKS = [
     "https://factchecking.pro",
     "https://factchecking.pro/report/some-report-id", # Пример ссылки
     "https://factchecking.pro/about"
-]
\ No newline at end of file
+]
+
+# === Кэш документов Firestore (doc_cache.py) ===
+DOC_CACHE_LOCAL_MAXSIZE = 2048       # записей в LRU каждого процесса
+DOC_CACHE_LOCAL_TTL_SECONDS = 5      # короткий TTL: другие процессы узнают о записи не позже чем через 5 с
+DOC_CACHE_REDIS_TTL_SECONDS = 600
+
+# === Sitemap (sitemaps.py) ===
+SITEMAP_REFRESH_MINUTES = 60
+SITEMAP_FIRESTORE_PAGE_SIZE = 500
+# Каждый отчёт/статья даёт по URL на каждый язык (с hreflang-альтернативами),
+# 2500 записей * 11 языков = 27 500 URL и ~40 МБ XML: укладываемся в лимиты 50 000 URL / 50 МБ
+SITEMAP_ENTRIES_PER_SHARD = 2500
+
+# === Хранилище готовых байтов (blob_store.py) ===
+BLOB_CACHE_LOCAL_MAXSIZE = 256
+BLOB_CACHE_LOCAL_TTL_SECONDS = 60
+
+# === Колоночная выгрузка для аналитики (analytics.py) ===
+# Каталог с Parquet-файлами по умолчанию — только для ручного запуска analytics.py из backend/.
+# Задача beat выгружает, лишь если задан env ANALYTICS_EXPORT_DIR (постоянный том или смонтированный бакет)
+ANALYTICS_EXPORT_DIR = 'analytics_export'
+ANALYTICS_EXPORT_INTERVAL_MINUTES = 60
+ANALYTICS_FIRESTORE_PAGE_SIZE = 500
+ANALYTICS_MAX_ROWS_PER_RUN = 50000  # остаток дочитывает следующий запуск
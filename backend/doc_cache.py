@@ -0,0 +1,229 @@
+# backend/doc_cache.py
+"""
+Двухуровневый кэш документов Firestore (analyses, claims):
+  1. ограниченный LRU в памяти процесса с коротким TTL (снимок хранится вместе с версией);
+  2. Redis, общий для веба и воркеров.
+Инвалидация по версиям: каждая запись увеличивает счётчик версии документа в Redis,
+а заполнение кэша после чтения из Firestore разрешено только если версия не изменилась
+с момента начала чтения (иначе в кэш мог бы попасть устаревший снимок).
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import redis
+from google.cloud import firestore
+
+import tracing
+from constants import DOC_CACHE_LOCAL_MAXSIZE, DOC_CACHE_LOCAL_TTL_SECONDS, DOC_CACHE_REDIS_TTL_SECONDS
+from redis_store import get_redis_client
+
+
+class LRUCache:
+    """Потокобезопасный LRU ограниченного размера с TTL на каждую запись."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LRUCache(DOC_CACHE_LOCAL_MAXSIZE, DOC_CACHE_LOCAL_TTL_SECONDS)
+
+# Кладёт снимок в Redis, только если версия документа всё ещё та, что была прочитана до Firestore
+STORE_IF_VERSION_SCRIPT = """
+local current = redis.call('GET', KEYS[1]) or '0'
+if current == ARGV[1] then
+    redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+def _doc_key(collection, doc_id):
+    return f"doccache:{collection}/{doc_id}"
+
+
+def _version_key(collection, doc_id):
+    return f"doccache:ver:{collection}/{doc_id}"
+
+
+def _get_redis():
+    try:
+        return get_redis_client()
+    except redis.RedisError as e:
+        print(f"[doc_cache] Redis unavailable: {e}")
+        return None
+
+
+def _get_db():
+    # Импорт внутри функции: tasks сам импортирует этот модуль
+    from tasks import get_db_client
+    return get_db_client()
+
+
+def resolve_sentinels(data):
+    """Заменяет SERVER_TIMESTAMP на локальное время, чтобы снимок можно было кэшировать."""
+    now = datetime.now(timezone.utc)
+    return {key: (now if value is firestore.SERVER_TIMESTAMP else value) for key, value in data.items()}
+
+
+def _remember(collection, doc_id, version, blob):
+    local_cache.set(_doc_key(collection, doc_id), (version, blob))
+    r = _get_redis()
+    if r is None:
+        return
+    try:
+        r.eval(STORE_IF_VERSION_SCRIPT, 2, _version_key(collection, doc_id), _doc_key(collection, doc_id),
+               version, blob, DOC_CACHE_REDIS_TTL_SECONDS)
+    except redis.RedisError as e:
+        print(f"[doc_cache] Could not store {collection}/{doc_id}: {e}")
+
+
+def _bump_version(collection, doc_id):
+    """Увеличивает версию документа и удаляет его снимки. Возвращает новую версию (или None)."""
+    local_cache.pop(_doc_key(collection, doc_id))
+    r = _get_redis()
+    if r is None:
+        return None
+    try:
+        pipe = r.pipeline(transaction=True)
+        pipe.incr(_version_key(collection, doc_id))
+        pipe.expire(_version_key(collection, doc_id), DOC_CACHE_REDIS_TTL_SECONDS * 2)
+        pipe.delete(_doc_key(collection, doc_id))
+        new_version = pipe.execute()[0]
+        return str(new_version)
+    except redis.RedisError as e:
+        print(f"[doc_cache] Could not invalidate {collection}/{doc_id}: {e}")
+        return None
+
+
+def get_documents(collection, doc_ids):
+    """
+    Читает несколько документов сразу: память процесса -> Redis (MGET) -> Firestore (get_all).
+    Снимок из памяти процесса отдаётся, только если его версия совпадает с версией в Redis
+    (она читается тем же MGET): запись из воркера сразу видна вебу.
+    Возвращает dict {doc_id: data}; несуществующих документов в нём нет.
+    Каждый вызов отдаёт свежие копии, их можно свободно изменять.
+    """
+    doc_ids = list(dict.fromkeys(doc_id for doc_id in doc_ids if doc_id))
+    local = {}
+    for doc_id in doc_ids:
+        entry = local_cache.get(_doc_key(collection, doc_id))
+        if entry is not None:
+            local[doc_id] = entry
+    missing = [doc_id for doc_id in doc_ids if doc_id not in local]
+
+    found = {}
+    versions = {doc_id: '0' for doc_id in doc_ids}
+    r = _get_redis()
+    if r is None:
+        # Без Redis версию не проверить: память процесса с коротким TTL — лучшее, что есть
+        found = {doc_id: pickle.loads(blob) for doc_id, (_, blob) in local.items()}
+    else:
+        try:
+            keys = [_version_key(collection, doc_id) for doc_id in doc_ids]
+            keys += [_doc_key(collection, doc_id) for doc_id in missing]
+            values = r.mget(keys)
+            for doc_id, version in zip(doc_ids, values):
+                versions[doc_id] = version.decode() if version else '0'
+            blobs = dict(zip(missing, values[len(doc_ids):]))
+            for doc_id, (version, blob) in local.items():
+                if version == versions[doc_id]:
+                    found[doc_id] = pickle.loads(blob)
+                else:
+                    missing.append(doc_id)  # документ изменился после заполнения памяти процесса
+            stale = [doc_id for doc_id in missing if doc_id not in blobs]
+            if stale:
+                blobs.update(zip(stale, r.mget([_doc_key(collection, doc_id) for doc_id in stale])))
+            still_missing = []
+            for doc_id in missing:
+                blob = blobs[doc_id]
+                if blob is not None:
+                    local_cache.set(_doc_key(collection, doc_id), (versions[doc_id], blob))
+                    found[doc_id] = pickle.loads(blob)
+                else:
+                    still_missing.append(doc_id)
+            missing = still_missing
+        except redis.RedisError as e:
+            print(f"[doc_cache] Redis read failed, falling back to Firestore: {e}")
+            missing = [doc_id for doc_id in doc_ids if doc_id not in found]
+    if not missing:
+        return found
+
+    db = _get_db()
+    refs = [db.collection(collection).document(doc_id) for doc_id in missing]
+    with tracing.span('firestore.get_all', {"firestore.collection": collection, "firestore.documents": len(refs)}):
+        for doc in db.get_all(refs):
+            if not doc.exists:
+                continue
+            data = doc.to_dict()
+            _remember(collection, doc.id, versions[doc.id], pickle.dumps(data))
+            found[doc.id] = data
+    return found
+
+
+def get_document(collection, doc_id):
+    """Читает один документ через кэш. Возвращает dict или None, если документа нет."""
+    return get_documents(collection, [doc_id]).get(doc_id)
+
+
+def set_document(collection, doc_id, data, merge=False):
+    """
+    Пишет документ в Firestore. Полная запись (merge=False) кладётся в кэш сразу
+    (write-through), частичная запись только инвалидирует закэшированный снимок.
+    """
+    with tracing.span('firestore.set', {"firestore.collection": collection, "firestore.merge": merge}):
+        _get_db().collection(collection).document(doc_id).set(data, merge=merge)
+    new_version = _bump_version(collection, doc_id)
+    if not merge:
+        _remember(collection, doc_id, new_version or '0', pickle.dumps(resolve_sentinels(data)))
+
+
+def update_document(collection, doc_id, data, full_document=None):
+    """
+    Выполняет update() в Firestore. Если вызывающий код знает итоговый документ целиком
+    (full_document), он кладётся в кэш; иначе снимок просто инвалидируется.
+    """
+    with tracing.span('firestore.update', {"firestore.collection": collection}):
+        _get_db().collection(collection).document(doc_id).update(data)
+    new_version = _bump_version(collection, doc_id)
+    if full_document is not None:
+        _remember(collection, doc_id, new_version or '0', pickle.dumps(resolve_sentinels(full_document)))
+
+
+def invalidate(collection, doc_id):
+    """Сбрасывает закэшированный снимок документа (после записи в обход этого модуля)."""
+    _bump_version(collection, doc_id)
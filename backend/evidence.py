@@ -0,0 +1,219 @@
+# backend/evidence.py
+"""
+Сбор доказательств для вердиктов: вместо коротких сниппетов Custom Search модель
+получает фрагменты самих страниц из выдачи, ближайшие к ключевым словам утверждения.
+
+  * Страницы скачиваются параллельно (не более EVIDENCE_MAX_CONCURRENCY одновременно),
+    читается не больше EVIDENCE_MAX_PAGE_BYTES, общий дедлайн — EVIDENCE_DEADLINE_SECONDS.
+  * Вежливость к сайтам: между запросами к одному домену со всех воркеров проходит
+    не меньше EVIDENCE_DOMAIN_INTERVAL_SECONDS (метка в Redis), страницы домена качаются по очереди.
+  * Извлечённый текст страницы кэшируется в Redis по URL на EVIDENCE_PAGE_CACHE_TTL_SECONDS,
+    неудачные загрузки — на EVIDENCE_FAILED_PAGE_TTL_SECONDS: популярные источники
+    цитируются в разных утверждениях и скачиваются один раз.
+
+Если страницу получить не удалось или в ней нет ключевых слов, остаётся сниппет.
+"""
+import hashlib
+import re
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+import redis
+import requests
+
+import search_index
+import tracing
+from constants import (EVIDENCE_MAX_CONCURRENCY, EVIDENCE_MAX_PAGE_BYTES, EVIDENCE_FETCH_TIMEOUT_SECONDS,
+                       EVIDENCE_DEADLINE_SECONDS, EVIDENCE_DOMAIN_INTERVAL_SECONDS, EVIDENCE_PAGE_CACHE_TTL_SECONDS,
+                       EVIDENCE_FAILED_PAGE_TTL_SECONDS, EVIDENCE_MAX_PAGE_TEXT_CHARS, EVIDENCE_PASSAGES_PER_PAGE,
+                       EVIDENCE_PASSAGE_CHARS)
+from redis_store import get_redis_client
+
+USER_AGENT = "Mozilla/5.0 (compatible; FactCheckBot/1.0)"
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+SENTENCE_RE = re.compile(r'(?<=[.!?。！？])\s+')
+FAILED = b''  # пометка неудачной загрузки в кэше
+
+
+def _cache_key(url):
+    # v2: тексты, закэшированные до исправления кодировки, могли быть испорчены
+    return f"evidence:page:v2:{hashlib.sha1(url.encode('utf-8')).hexdigest()}"
+
+
+def _domain_key(domain):
+    return f"evidence:domain:{domain}"
+
+
+def _cached_text(r, url):
+    try:
+        blob = r.get(_cache_key(url))
+    except redis.RedisError:
+        return None
+    if blob is None:
+        return None
+    return '' if blob == FAILED else zlib.decompress(blob).decode('utf-8')
+
+
+def _remember_text(r, url, text):
+    try:
+        if text:
+            r.set(_cache_key(url), zlib.compress(text.encode('utf-8')), ex=EVIDENCE_PAGE_CACHE_TTL_SECONDS)
+        else:
+            r.set(_cache_key(url), FAILED, ex=EVIDENCE_FAILED_PAGE_TTL_SECONDS)
+    except redis.RedisError:
+        pass
+
+
+def _wait_for_domain(r, domain, deadline):
+    """
+    Ждёт очереди к домену: не чаще раза в EVIDENCE_DOMAIN_INTERVAL_SECONDS со всех воркеров.
+    False — если очередь не подошла до дедлайна.
+    """
+    interval_ms = int(EVIDENCE_DOMAIN_INTERVAL_SECONDS * 1000)
+    while True:
+        try:
+            if r.set(_domain_key(domain), 1, px=interval_ms, nx=True):
+                return True
+            wait_ms = r.pttl(_domain_key(domain))
+        except redis.RedisError:
+            return True
+        if time.monotonic() + max(wait_ms, 50) / 1000 > deadline:
+            return False
+        time.sleep(max(wait_ms, 50) / 1000)
+
+
+def page_text(html):
+    """Читаемый текст HTML-страницы (без скриптов, навигации и подвалов)."""
+    import bs4
+    soup = bs4.BeautifulSoup(html, "html.parser")
+    for tag in soup(['script', 'style', 'noscript', 'header', 'footer', 'nav', 'aside', 'form']):
+        tag.decompose()
+    return soup.get_text(separator=' ', strip=True)[:EVIDENCE_MAX_PAGE_TEXT_CHARS]
+
+
+def _download(url):
+    """Скачивает не больше EVIDENCE_MAX_PAGE_BYTES и возвращает текст страницы ('' при неудаче)."""
+    try:
+        with requests.get(url, stream=True, timeout=EVIDENCE_FETCH_TIMEOUT_SECONDS,
+                          headers={"User-Agent": USER_AGENT}) as response:
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if response.status_code != 200 or (content_type and content_type not in HTML_CONTENT_TYPES):
+                return ''
+            body = bytearray()
+            for chunk in response.iter_content(chunk_size=16384):
+                body.extend(chunk)
+                if len(body) >= EVIDENCE_MAX_PAGE_BYTES:
+                    break
+            raw = bytes(body[:EVIDENCE_MAX_PAGE_BYTES])
+            # Без charset в заголовке requests считает text/* латиницей (ISO-8859-1).
+            # HTML отдаём BeautifulSoup байтами — кодировку он возьмёт из <meta charset>,
+            # для text/plain её определяет UnicodeDammit по содержимому.
+            if 'charset' in response.headers.get('Content-Type', '').lower():
+                content = raw.decode(response.encoding, errors='replace')
+            elif content_type == 'text/plain':
+                import bs4
+                content = bs4.UnicodeDammit(raw, ['utf-8']).unicode_markup or ''
+            else:
+                content = raw
+    except (requests.RequestException, LookupError) as e:
+        print(f"[evidence] Could not fetch {url}: {e}")
+        return ''
+    return page_text(content) if content_type != 'text/plain' else content[:EVIDENCE_MAX_PAGE_TEXT_CHARS]
+
+
+def fetch_pages(urls):
+    """
+    Тексты страниц {url: text} — из кэша или параллельной загрузкой. Разные домены
+    качаются параллельно, страницы одного домена — по очереди с паузой между запросами.
+    Страницы, не уложившиеся в дедлайн, в ответ не попадают (остаются сниппеты).
+    """
+    r = get_redis_client()
+    texts, by_domain = {}, {}
+    for url in dict.fromkeys(urls):
+        cached = _cached_text(r, url)
+        if cached is not None:
+            texts[url] = cached
+            continue
+        domain = urlparse(url).netloc.lower()
+        if domain:
+            by_domain.setdefault(domain, []).append(url)
+    if not by_domain:
+        return texts
+
+    deadline = time.monotonic() + EVIDENCE_DEADLINE_SECONDS
+    fetched = {}  # пишут потоки пула; ключи не пересекаются
+
+    def fetch_domain(domain, domain_urls):
+        for url in domain_urls:
+            if not _wait_for_domain(r, domain, deadline):
+                return
+            text = _download(url)
+            _remember_text(r, url, text)
+            fetched[url] = text
+
+    pool = ThreadPoolExecutor(max_workers=EVIDENCE_MAX_CONCURRENCY, thread_name_prefix='evidence')
+    futures = [pool.submit(tracing.bind(fetch_domain), domain, domain_urls) for domain, domain_urls in by_domain.items()]
+    _, not_done = wait(futures, timeout=EVIDENCE_DEADLINE_SECONDS)
+    pool.shutdown(wait=False, cancel_futures=True)  # опоздавшие загрузки сами допишут кэш
+    texts.update(dict(fetched))
+    if not_done:
+        print(f"[evidence] {len(not_done)} of {len(futures)} domains missed the {EVIDENCE_DEADLINE_SECONDS}s deadline")
+    return texts
+
+
+def extract_passages(text, terms, lang, limit=EVIDENCE_PASSAGES_PER_PAGE, max_chars=EVIDENCE_PASSAGE_CHARS):
+    """
+    Фрагменты текста вокруг ключевых слов: предложения с наибольшим числом различных
+    терминов утверждения (вместе с соседними), в порядке следования на странице.
+    """
+    if not text or not terms:
+        return []
+    terms = set(terms)
+    min_score = 2 if len(terms) >= 3 else 1  # одно общее слово — ещё не доказательство
+    sentences = [sentence for sentence in SENTENCE_RE.split(text) if sentence.strip()]
+    scored = []
+    for index, sentence in enumerate(sentences):
+        score = len(terms.intersection(search_index.tokenize(sentence, lang)))
+        if score >= min_score:
+            scored.append((score, index))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+
+    picked, used = [], set()
+    for score, index in scored:
+        if len(picked) >= limit:
+            break
+        if index in used:
+            continue
+        window = [i for i in (index - 1, index, index + 1) if 0 <= i < len(sentences) and i not in used]
+        used.update(window)
+        passage = ' '.join(sentences[i].strip() for i in window)
+        picked.append((index, passage[:max_chars]))
+    return [passage for _, passage in sorted(picked)]
+
+
+def attach_passages(claims, search_results_by_hash, lang):
+    """
+    Добавляет к результатам поиска поле "passages" — фрагменты страниц по ключевым словам
+    утверждения. claims — список {"hash", "text"}; результаты, уже имеющие "passages", не трогаются.
+    Все страницы всех утверждений скачиваются одним параллельным прогоном.
+    """
+    pending = [(claim, res) for claim in claims for res in search_results_by_hash.get(claim["hash"], [])
+               if res.get('link') and 'passages' not in res]
+    if not pending:
+        return
+    with tracing.span('evidence.fetch_pages', {"evidence.pages": len(pending)}):
+        texts = fetch_pages([res['link'] for _, res in pending])
+    for claim, res in pending:
+        terms = search_index.tokenize(claim["text"], lang)
+        res['passages'] = extract_passages(texts.get(res['link'], ''), terms, lang)
+
+
+def evidence_text(search_results):
+    """Контекст для промпта вердикта: фрагменты страниц, а где их нет — сниппеты."""
+    parts = []
+    for res in search_results:
+        passages = res.get('passages') or [res.get('snippet', '')]
+        parts.append(" … ".join(passage for passage in passages if passage))
+    return " ".join(part for part in parts if part)
@@ -0,0 +1,247 @@
+# backend/feeds.py
+"""
+Материализованные ленты завершённых отчётов по языку и типу ввода.
+
+Вместо общей ленты всех языков (get_analyses) посетитель /ru/ получает только отчёты
+на русском, одной выборкой из Redis. Ключи:
+  feed:{lang}:all          — sorted set: analysis_id -> created_at (мс), все типы ввода;
+  feed:{lang}:{input_type} — то же для youtube / url / text;
+  feed:card:{id}           — hash с полями карточки ленты (только то, что рисует список);
+  feed:built               — метка, что ленты заполнены.
+
+Пагинация по ключу: курсор "<created_at мс>:<id>" последнего элемента страницы,
+следующая страница — элементы строго после него (устойчиво к новым отчётам сверху).
+Размер страницы задаёт клиент (page_size) в пределах FEED_MIN/MAX_PAGE_SIZE.
+
+Ленты заполняет задача tasks.rebuild_feeds (под блокировкой): её ставит beat, а также
+веб-процесс, как только видит, что метки feed:built нет (первый запуск, Redis потерял ключи).
+Пока ленты строятся или Redis недоступен, страница собирается из Firestore: общая лента
+с фильтрацией по языку и типу, не больше FEED_FALLBACK_SCAN_LIMIT документов — на редком
+языке страница может оказаться короче или пустой до конца построения.
+Вручную: python feeds.py rebuild.
+"""
+import sys
+from datetime import datetime, timezone
+
+import redis
+
+from constants import (LANGUAGES, DEFAULT_LANGUAGE, FEED_INPUT_TYPES, FEED_PAGE_SIZE, FEED_MIN_PAGE_SIZE,
+                       FEED_MAX_PAGE_SIZE, FEED_MAX_ITEMS, FEED_FALLBACK_SCAN_LIMIT, FEED_REBUILD_LOCK_SECONDS,
+                       BACKGROUND_TASK_PRIORITY)
+from redis_store import get_redis_client
+
+BUILT_KEY = 'feed:built'
+REBUILD_LOCK_KEY = 'feed:rebuilding'
+REBUILD_REQUESTED_KEY = 'feed:rebuild_requested'
+ALL = 'all'
+# Элементы с тем же created_at, что у курсора, попадают в начало выборки — берём с запасом
+TIE_MARGIN = 20
+
+
+def _feed_key(lang, input_type=ALL):
+    return f"feed:{lang}:{input_type}"
+
+
+def _card_key(analysis_id):
+    return f"feed:card:{analysis_id}"
+
+
+def _millis(value):
+    if hasattr(value, 'timestamp'):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    return 0
+
+
+def _iso(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else (value or "")
+
+
+def normalize_lang(lang):
+    return lang if lang in LANGUAGES else DEFAULT_LANGUAGE
+
+
+def normalize_page_size(page_size):
+    """Согласованный размер страницы: запрошенный клиентом в допустимых пределах."""
+    try:
+        page_size = int(page_size)
+    except (TypeError, ValueError):
+        return FEED_PAGE_SIZE
+    return max(FEED_MIN_PAGE_SIZE, min(page_size, FEED_MAX_PAGE_SIZE))
+
+
+def parse_cursor(cursor):
+    """(created_at мс, id) или None для первой страницы; ValueError на испорченный курсор."""
+    if not cursor:
+        return None
+    millis, _, analysis_id = cursor.partition(':')
+    if not analysis_id:
+        raise ValueError(f"Invalid feed cursor: {cursor!r}")
+    return int(millis), analysis_id
+
+
+def make_cursor(millis, analysis_id):
+    return f"{millis}:{analysis_id}"
+
+
+def card(analysis_id, report):
+    """Поля карточки ленты из документа отчёта."""
+    return {
+        "id": analysis_id,
+        "video_title": report.get('video_title') or report.get('title') or "",
+        "thumbnail_url": report.get('thumbnail_url') or "",
+        "input_type": report.get('input_type') or "",
+        "confirmed_credibility": report.get('confirmed_credibility', 0),
+        "average_confidence": report.get('average_confidence', 0),
+        "created_at": _iso(report.get('created_at')),
+        "updated_at": _iso(report.get('updated_at')),
+    }
+
+
+def is_listed(report):
+    """В ленты попадают только завершённые отчёты с заголовком (как и в шаблоне ленты)."""
+    return report.get('status') == 'COMPLETED' and (report.get('video_title') or report.get('title')) != 'Title Not Found'
+
+
+def add_analysis(analysis_id, report):
+    """Добавляет (или обновляет) завершённый отчёт в ленты его языка и типа ввода."""
+    if not is_listed(report):
+        return False
+    lang = normalize_lang(report.get('target_lang'))
+    input_type = report.get('input_type')
+    score = _millis(report.get('created_at'))
+    r = get_redis_client()
+    pipe = r.pipeline()
+    pipe.hset(_card_key(analysis_id), mapping={field: str(value) for field, value in card(analysis_id, report).items()})
+    pipe.zadd(_feed_key(lang), {analysis_id: score})
+    if input_type in FEED_INPUT_TYPES:
+        pipe.zadd(_feed_key(lang, input_type), {analysis_id: score})
+    pipe.zrange(_feed_key(lang), 0, -(FEED_MAX_ITEMS + 1))
+    trimmed = [member.decode() for member in pipe.execute()[-1]]
+    if trimmed:
+        # Лента "all" языка — надмножество лент по типам: вытесненное из неё удаляем везде
+        pipe = r.pipeline()
+        for key in [_feed_key(lang)] + [_feed_key(lang, t) for t in FEED_INPUT_TYPES]:
+            pipe.zrem(key, *trimmed)
+        pipe.delete(*[_card_key(trimmed_id) for trimmed_id in trimmed])
+        pipe.execute()
+    return True
+
+
+def _decode_card(raw):
+    item = {key.decode(): value.decode() for key, value in raw.items()}
+    for field in ('confirmed_credibility', 'average_confidence'):
+        try:
+            item[field] = int(float(item.get(field) or 0))
+        except ValueError:
+            item[field] = 0
+    return item
+
+
+def _redis_page(r, lang, input_type, cursor, page_size):
+    key = _feed_key(lang, input_type)
+    if cursor is None:
+        entries = r.zrevrange(key, 0, page_size - 1, withscores=True)
+    else:
+        millis, last_id = cursor
+        entries = r.zrevrangebyscore(key, millis, '-inf', start=0, num=page_size + TIE_MARGIN, withscores=True)
+        # При равном created_at Redis упорядочивает id по убыванию: берём те, что идут после курсора
+        entries = [(member, score) for member, score in entries
+                   if score < millis or member.decode() < last_id][:page_size]
+    if not entries:
+        return [], None
+    pipe = r.pipeline()
+    for member, _ in entries:
+        pipe.hgetall(_card_key(member.decode()))
+    items = [_decode_card(raw) for raw in pipe.execute() if raw]
+    last_member, last_score = entries[-1]
+    next_cursor = make_cursor(int(last_score), last_member.decode()) if len(entries) == page_size else None
+    return items, next_cursor
+
+
+def _firestore_page(db, lang, input_type, cursor, page_size):
+    """Запасной путь: общая лента Firestore по created_at с фильтрацией на стороне приложения."""
+    from google.cloud.firestore_v1.query import Query
+    query = db.collection('analyses').order_by('created_at', direction=Query.DESCENDING)
+    if cursor is not None:
+        query = query.start_after({'created_at': datetime.fromtimestamp(cursor[0] / 1000, tz=timezone.utc)})
+    items, scanned, last_cursor = [], 0, None
+    for doc in query.limit(FEED_FALLBACK_SCAN_LIMIT).stream():
+        report = doc.to_dict()
+        scanned += 1
+        last_cursor = make_cursor(_millis(report.get('created_at')), doc.id)
+        if (not is_listed(report) or normalize_lang(report.get('target_lang')) != lang
+                or (input_type != ALL and report.get('input_type') != input_type)):
+            continue
+        items.append(card(doc.id, report))
+        if len(items) == page_size:
+            return items, last_cursor
+    # Страница не набралась: если просмотрели весь лимит, дальше ещё могут быть отчёты
+    return items, last_cursor if scanned == FEED_FALLBACK_SCAN_LIMIT else None
+
+
+def get_page(lang, input_type=ALL, cursor=None, page_size=FEED_PAGE_SIZE, db=None):
+    """
+    Страница ленты: {"items": [карточки], "next_cursor": str|None, "page_size": n}.
+    cursor — значение next_cursor предыдущей страницы.
+    """
+    lang = normalize_lang(lang)
+    if input_type not in FEED_INPUT_TYPES:
+        input_type = ALL
+    page_size = normalize_page_size(page_size)
+    parsed_cursor = parse_cursor(cursor)
+    try:
+        r = get_redis_client()
+        if r.exists(BUILT_KEY):
+            items, next_cursor = _redis_page(r, lang, input_type, parsed_cursor, page_size)
+            return {"items": items, "next_cursor": next_cursor, "page_size": page_size}
+        request_rebuild(r)
+    except redis.RedisError as e:
+        print(f"[feeds] Redis unavailable, falling back to Firestore: {e}")
+    if db is None:
+        from tasks import get_db_client
+        db = get_db_client()
+    items, next_cursor = _firestore_page(db, lang, input_type, parsed_cursor, page_size)
+    return {"items": items, "next_cursor": next_cursor, "page_size": page_size}
+
+
+def request_rebuild(r):
+    """Ставит tasks.rebuild_feeds не чаще раза в FEED_REBUILD_LOCK_SECONDS со всех процессов."""
+    if not r.set(REBUILD_REQUESTED_KEY, 1, nx=True, ex=FEED_REBUILD_LOCK_SECONDS):
+        return
+    from celery_init import celery
+    celery.send_task('tasks.rebuild_feeds', priority=BACKGROUND_TASK_PRIORITY)
+    print("[feeds] Feeds are not built yet, rebuild requested")
+
+
+def rebuild_if_missing(db):
+    """
+    Строит ленты, если метки feed:built нет и их не строит другой воркер.
+    Возвращает число добавленных отчётов или None, если строить не пришлось.
+    """
+    r = get_redis_client()
+    if r.exists(BUILT_KEY) or not r.set(REBUILD_LOCK_KEY, 1, nx=True, ex=FEED_REBUILD_LOCK_SECONDS):
+        return None
+    try:
+        return rebuild_all(db)
+    finally:
+        r.delete(REBUILD_LOCK_KEY)
+
+
+def rebuild_all(db):
+    """Заполняет ленты всеми завершёнными отчётами из Firestore и включает чтение из Redis."""
+    added = 0
+    for doc in db.collection('analyses').where('status', '==', 'COMPLETED').stream():
+        if add_analysis(doc.id, doc.to_dict()):
+            added += 1
+    get_redis_client().set(BUILT_KEY, 1)
+    return added
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['rebuild']:
+        print("Usage: python feeds.py rebuild")
+        sys.exit(1)
+    from tasks import get_db_client
+    print(f"Added {rebuild_all(get_db_client())} reports to the feeds")
@@ -0,0 +1,37 @@
+# backend/firestore_scan.py
+"""
+Инкрементальный обход коллекции Firestore по полю изменения (updated_at, last_checked_at)
+для периодических выгрузок (sitemaps.py, analytics.py).
+
+Курсор — пара (значение поля, id документа): запрос упорядочен по полю и по id документа,
+поэтому документы с одинаковым временем не теряются, если прошлый обход остановился
+посреди них (бюджет строк на запуск, падение). Курсор без id (сохранённый старым кодом)
+начинает обход с самого значения поля — документы с этим временем будут прочитаны повторно.
+"""
+
+DOCUMENT_ID = '__name__'  # FieldPath.document_id(): сортировка и курсор по id документа
+
+
+def walk_changed_documents(db, collection, order_field, fields, page_size, cursor=None):
+    """
+    Постранично обходит документы collection в порядке (order_field, id), начиная после
+    cursor = (значение order_field, id документа) последнего обработанного документа;
+    cursor=None — с начала коллекции. Документы без order_field в обход не попадают.
+    """
+    base_query = (db.collection(collection)
+                  .order_by(order_field)
+                  .order_by(DOCUMENT_ID)
+                  .select(fields)
+                  .limit(page_size))
+    if cursor is None:
+        query = base_query
+    else:
+        value, doc_id = cursor
+        query = base_query.start_after([value, doc_id]) if doc_id else base_query.start_at([value])
+    while True:
+        docs = list(query.stream())
+        for doc in docs:
+            yield doc
+        if len(docs) < page_size:
+            return
+        query = base_query.start_after(docs[-1])
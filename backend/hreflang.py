@@ -0,0 +1,47 @@
+# backend/hreflang.py
+"""
+Наборы hreflang-альтернатив для страниц с префиксом /<lang>/.
+
+Для каждого эндпоинта один раз строится шаблон пути с плейсхолдерами (через url_map),
+после чего все языковые версии получаются подстановкой строк, без url_for на каждый язык.
+Готовые наборы ссылок дополнительно мемоизируются: для конкретной страницы они одинаковы
+для всех посетителей.
+"""
+from functools import lru_cache
+from urllib.parse import quote
+
+from flask import current_app
+
+from constants import LANGUAGES, DEFAULT_LANGUAGE
+
+LANG_PLACEHOLDER = '__hreflang_lang__'
+# Те же безопасные символы, что экранирует стандартный конвертер werkzeug
+URL_SAFE_CHARS = "!$&'()*+,/:;=@"
+
+
+@lru_cache(maxsize=256)
+def _path_template(endpoint, arg_names):
+    """Путь эндпоинта с плейсхолдерами вместо lang и остальных аргументов + плейсхолдеры по порядку arg_names."""
+    placeholders = {name: f'__hreflang_arg_{i}__' for i, name in enumerate(arg_names)}
+    placeholders['lang'] = LANG_PLACEHOLDER
+    path = current_app.url_map.bind('localhost').build(endpoint, placeholders, append_unknown=False)
+    return path, tuple(placeholders[name] for name in arg_names)
+
+
+@lru_cache(maxsize=4096)
+def _build_links(endpoint, frozen_args, base_url):
+    template, tokens = _path_template(endpoint, tuple(name for name, _ in frozen_args))
+    path = template
+    for token, (_, value) in zip(tokens, frozen_args):
+        path = path.replace(token, quote(str(value), safe=URL_SAFE_CHARS))
+    links = tuple((lang_code, base_url + path.replace(LANG_PLACEHOLDER, lang_code)) for lang_code in LANGUAGES)
+    return links + (('x-default', dict(links)[DEFAULT_LANGUAGE]),)
+
+
+def hreflang_links(endpoint, view_args, base_url):
+    """
+    Возвращает кортеж пар (hreflang, абсолютный URL) для всех языков и x-default.
+    base_url — схема и хост без завершающего '/', например 'https://factchecking.pro'.
+    """
+    frozen_args = tuple(sorted((name, value) for name, value in (view_args or {}).items() if name != 'lang'))
+    return _build_links(endpoint, frozen_args, base_url.rstrip('/'))
@@ -0,0 +1,161 @@
+# backend/loadtest/app_factory.py
+"""
+Приложение для нагрузочных тестов: настоящий app.py поверх in-memory Firestore
+и локального Redis (fakeredis, либо реальный Redis из LOADTEST_REDIS_URL).
+Реальный Redis перед прогоном очищается (FLUSHDB), поэтому вместе с LOADTEST_REDIS_URL
+нужно явно задать LOADTEST_FLUSH=1 (python -m loadtest.run --flush) — иначе приложение не стартует.
+
+    gunicorn -k gthread --threads 8 'loadtest.app_factory:create_app()'   # из каталога backend/
+
+Celery работает с брокером memory:// и result backend cache+memory://: в каждый
+воркер gunicorn засеяны завершённые и выполняющиеся задачи для опроса /api/status.
+Служебные эндпоинты (обрабатываются до middleware приложения):
+  GET  /__loadtest/fixtures — id засеянных отчётов и задач;
+  GET  /__loadtest/stats    — вызовы Firestore по эндпоинтам (для этого процесса);
+  POST /__loadtest/reset    — обнулить счётчики.
+"""
+import json
+import os
+import random
+from datetime import datetime, timezone, timedelta
+
+from loadtest.fake_firestore import FakeFirestoreClient
+
+SEED = int(os.environ.get('LOADTEST_SEED', 42))
+COMPLETED_REPORTS = int(os.environ.get('LOADTEST_REPORTS', 200))
+PENDING_REPORTS = int(os.environ.get('LOADTEST_PENDING_REPORTS', 40))
+BLOG_ARTICLES = int(os.environ.get('LOADTEST_BLOG_ARTICLES', 20))
+RUNNING_TASKS = 20
+
+VERDICTS = ["True", "False", "Misleading", "Partly True", "Unverifiable"]
+WORDS = ("government economy election vaccine climate energy border inflation study report "
+         "president minister percent million billion record growth decline policy law court").split()
+
+
+def _sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def seed_firestore(db):
+    """Заполняет фейковый Firestore детерминированными отчётами, утверждениями и статьями блога."""
+    from tasks import get_claim_hash
+    rng = random.Random(SEED)
+    now = datetime.now(timezone.utc)
+    fixtures = {"completed": [], "pending": []}
+
+    for index in range(COMPLETED_REPORTS + PENDING_REPORTS):
+        completed = index < COMPLETED_REPORTS
+        analysis_id = f"loadtest_{index:05d}_en"
+        claims = [{"text": _sentence(rng)} for _ in range(rng.randint(5, 10))]
+        for claim in claims:
+            claim["hash"] = get_claim_hash(claim["text"])
+        created_at = now - timedelta(minutes=index * 7)
+        report = {
+            "status": "COMPLETED" if completed else "PENDING_SELECTION",
+            "input_type": rng.choice(["youtube", "url", "text"]),
+            "source_url": f"https://example.com/article/{index}",
+            "video_title": _sentence(rng, 6),
+            "thumbnail_url": "",
+            "extracted_claims": claims,
+            "target_lang": "en",
+            "created_at": created_at,
+        }
+        if completed:
+            results = []
+            for claim in claims:
+                result = {
+                    "claim": claim["text"],
+                    "verdict": rng.choice(VERDICTS),
+                    "confidence_percentage": rng.randint(40, 95),
+                    "explanation": " ".join(_sentence(rng) for _ in range(3)),
+                    "sources": [f"https://source{n}.example.org/{index}" for n in range(4)],
+                    "target_lang": "en",
+                    "last_checked_at": created_at,
+                }
+                results.append(result)
+                db.write('claims', claim["hash"], result)
+            report.update({
+                "summary_data": {"overall_verdict": "Mixed Veracity",
+                                 "overall_assessment": " ".join(_sentence(rng) for _ in range(4)),
+                                 "key_points": [_sentence(rng) for _ in range(3)]},
+                "verdict_counts": {verdict: sum(1 for r in results if r["verdict"] == verdict) for verdict in VERDICTS},
+                "average_confidence": 70,
+                "confirmed_credibility": 40,
+                "detailed_results": results,
+                "updated_at": created_at + timedelta(minutes=3),
+            })
+        db.write('analyses', analysis_id, report)
+        fixtures["completed" if completed else "pending"].append(analysis_id)
+
+    for index in range(BLOG_ARTICLES):
+        slug = f"loadtest-article-{index}"
+        db.write('blog_articles', slug, {
+            "title": _sentence(rng, 6), "slug": slug, "summary": _sentence(rng, 30),
+            "content": "".join(f"<p>{_sentence(rng, 40)}</p>" for _ in range(12)),
+            "published_at": now - timedelta(hours=index * 5),
+        })
+    return fixtures
+
+
+def seed_task_results(celery_app, fixtures):
+    """Готовые и «выполняющиеся» задачи в result backend для опроса /api/status."""
+    backend = celery_app.backend
+    fixtures["finished_tasks"] = []
+    for analysis_id in fixtures["completed"][:50]:
+        task_id = f"loadtest-done-{analysis_id}"
+        backend.store_result(task_id, {"id": analysis_id, "status": "COMPLETED",
+                                       "result_ref": f"analyses/{analysis_id}"}, 'SUCCESS')
+        fixtures["finished_tasks"].append(task_id)
+    fixtures["running_tasks"] = []
+    for index in range(RUNNING_TASKS):
+        task_id = f"loadtest-running-{index}"
+        backend.store_result(task_id, {"status_message": "Fact-checking 3 statements..."}, 'PROGRESS')
+        fixtures["running_tasks"].append(task_id)
+
+
+def _json_response(start_response, payload, status='200 OK'):
+    body = json.dumps(payload).encode('utf-8')
+    start_response(status, [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))])
+    return [body]
+
+
+def create_app():
+    """WSGI-приложение для gunicorn: app.app поверх фейков + служебные /__loadtest/ эндпоинты."""
+    import redis_store
+    redis_url = os.environ.get('LOADTEST_REDIS_URL')
+    if redis_url:
+        if os.environ.get('LOADTEST_FLUSH') != '1':
+            raise RuntimeError(f"LOADTEST_REDIS_URL={redis_url} would be flushed; "
+                               f"set LOADTEST_FLUSH=1 (or pass --flush) to confirm")
+        import redis
+        redis_store.redis_client = redis.Redis.from_url(redis_url, socket_timeout=2, socket_connect_timeout=2)
+        redis_store.redis_client.flushdb()
+    else:
+        import fakeredis
+        redis_store.redis_client = fakeredis.FakeRedis()
+
+    import tasks
+    db = FakeFirestoreClient()
+    tasks.db = db
+
+    from app import app, celery_app
+    celery_app.conf.update(broker_url='memory://', result_backend='cache+memory://')
+    fixtures = seed_firestore(db)
+    seed_task_results(celery_app, fixtures)
+    fixtures["blog"] = [f"loadtest-article-{index}" for index in range(BLOG_ARTICLES)]
+    # Число запросов по эндпоинтам — знаменатель для «вызовов Firestore на запрос»
+    app.before_request(lambda: db.record('request'))
+    db.reset_calls()
+
+    def loadtest_app(environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path == '/__loadtest/fixtures':
+            return _json_response(start_response, fixtures)
+        if path == '/__loadtest/stats':
+            return _json_response(start_response, {"pid": os.getpid(), "firestore": db.calls_by_endpoint()})
+        if path == '/__loadtest/reset':
+            db.reset_calls()
+            return _json_response(start_response, {"pid": os.getpid()})
+        return app(environ, start_response)
+
+    return loadtest_app
@@ -0,0 +1,193 @@
+# backend/loadtest/fake_firestore.py
+"""
+In-memory замена firestore.Client для нагрузочных тестов.
+
+Поддерживает ровно то, чем пользуется веб-слой: document().get/set/update,
+get_all, запросы order_by/where/start_after/start_at/limit/select/stream.
+Каждое обращение считается отдельно по эндпоинту Flask, который его сделал,
+чтобы отчёт мог показать число вызовов Firestore на запрос.
+"""
+import copy
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+from google.cloud import firestore
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _resolve(data):
+    return {key: (_now() if value is firestore.SERVER_TIMESTAMP else value) for key, value in data.items()}
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data, reference=None):
+        self.id = doc_id
+        self._data = data
+        self.reference = reference
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+
+class FakeDocumentReference:
+    def __init__(self, client, collection, doc_id):
+        self._client = client
+        self._collection = collection
+        self.id = doc_id
+
+    def get(self):
+        self._client.record('document.get')
+        return FakeSnapshot(self.id, self._client.read(self._collection, self.id), self)
+
+    def set(self, data, merge=False):
+        self._client.record('document.set')
+        self._client.write(self._collection, self.id, _resolve(data), merge=merge)
+
+    def update(self, data):
+        self._client.record('document.update')
+        if self._client.read(self._collection, self.id) is None:
+            raise KeyError(f"{self._collection}/{self.id} does not exist")
+        self._client.write(self._collection, self.id, _resolve(data), merge=True)
+
+
+class FakeQuery:
+    def __init__(self, client, collection, filters=(), order=(), cursor=None, limit=None):
+        self._client = client
+        self._collection = collection
+        self._filters = filters
+        self._order = order  # ((поле, по убыванию), ...); '__name__' — id документа
+        self._cursor = cursor  # (курсор, включая ли сам курсор)
+        self._limit = limit
+
+    def _clone(self, **changes):
+        state = dict(filters=self._filters, order=self._order, cursor=self._cursor, limit=self._limit)
+        state.update(changes)
+        return FakeQuery(self._client, self._collection, **state)
+
+    def document(self, doc_id):
+        return FakeDocumentReference(self._client, self._collection, doc_id)
+
+    def where(self, field, op, value):
+        if op != '==':
+            raise NotImplementedError(f"FakeQuery supports only '==' filters, got {op!r}")
+        return self._clone(filters=self._filters + ((field, value),))
+
+    def order_by(self, field, direction='ASCENDING'):
+        return self._clone(order=self._order + ((field, direction == firestore.Query.DESCENDING),))
+
+    def start_after(self, cursor):
+        return self._clone(cursor=(cursor, False))
+
+    def start_at(self, cursor):
+        return self._clone(cursor=(cursor, True))
+
+    def limit(self, count):
+        return self._clone(limit=count)
+
+    def select(self, fields):
+        return self  # проекция не влияет на число вызовов
+
+    @staticmethod
+    def _value(doc_id, data, field):
+        return doc_id if field == '__name__' else data.get(field)
+
+    def _cursor_values(self):
+        cursor, _ = self._cursor
+        if isinstance(cursor, FakeSnapshot):
+            return [self._value(cursor.id, cursor.to_dict(), field) for field, _ in self._order]
+        if isinstance(cursor, dict):
+            return [cursor[field] for field, _ in self._order if field in cursor]
+        return list(cursor)
+
+    def _compare(self, doc_id, data, values):
+        """-1/0/1: документ до, на или после курсора в порядке сортировки (по префиксу полей курсора)."""
+        for (field, descending), cursor_value in zip(self._order, values):
+            value = self._value(doc_id, data, field)
+            if value != cursor_value:
+                return (1 if value > cursor_value else -1) * (-1 if descending else 1)
+        return 0
+
+    def stream(self):
+        self._client.record('query.stream')
+        docs = [(doc_id, data) for doc_id, data in self._client.items(self._collection)
+                if all(data.get(field) == value for field, value in self._filters)]
+        if self._order:
+            docs = [item for item in docs
+                    if all(self._value(*item, field) is not None for field, _ in self._order)]
+            for field, descending in reversed(self._order):
+                docs.sort(key=lambda item: self._value(*item, field), reverse=descending)
+            if self._cursor is not None:
+                values, inclusive = self._cursor_values(), self._cursor[1]
+                docs = [item for item in docs if self._compare(*item, values) >= (0 if inclusive else 1)]
+        if self._limit is not None:
+            docs = docs[:self._limit]
+        return iter([FakeSnapshot(doc_id, copy.deepcopy(data)) for doc_id, data in docs])
+
+    def get(self):
+        return list(self.stream())
+
+
+class FakeFirestoreClient:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collections = {}
+        self.calls = Counter()
+
+    # --- учёт вызовов ---
+
+    def record(self, operation):
+        endpoint = (request.endpoint or request.path) if has_request_context() else '<background>'
+        with self._lock:
+            self.calls[(endpoint, operation)] += 1
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    def calls_by_endpoint(self):
+        with self._lock:
+            summary = {}
+            for (endpoint, operation), count in self.calls.items():
+                summary.setdefault(endpoint, {})[operation] = count
+            return summary
+
+    # --- хранилище ---
+
+    def read(self, collection, doc_id):
+        with self._lock:
+            data = self._collections.get(collection, {}).get(doc_id)
+            return copy.deepcopy(data) if data is not None else None
+
+    def write(self, collection, doc_id, data, merge=False):
+        with self._lock:
+            docs = self._collections.setdefault(collection, {})
+            if merge and doc_id in docs:
+                docs[doc_id].update(copy.deepcopy(data))
+            else:
+                docs[doc_id] = copy.deepcopy(data)
+
+    def items(self, collection):
+        with self._lock:
+            return list(self._collections.get(collection, {}).items())
+
+    # --- API firestore.Client ---
+
+    def collection(self, name):
+        return FakeQuery(self, name)
+
+    def get_all(self, references):
+        self.record('get_all')
+        for reference in references:
+            yield FakeSnapshot(reference.id, self.read(reference._collection, reference.id), reference)
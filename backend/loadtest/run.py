@@ -0,0 +1,250 @@
+# backend/loadtest/run.py
+"""
+Нагрузочный прогон веб-слоя: поднимает gunicorn с loadtest.app_factory:create_app()
+для каждого класса воркеров и гоняет смесь сценариев из нескольких потоков.
+
+    cd backend
+    pip install -r loadtest/requirements.txt
+    python -m loadtest.run --worker-classes sync gthread eventlet --users 32 --duration 30
+
+Сценарии (веса задаются --mix):
+  crawler  — бот заходит на /en/, проходит по hreflang-альтернативам и отчётам без префикса языка;
+  poller   — пользователь опрашивает /api/status выполняющейся задачи, затем завершённой;
+  viewer   — просмотр /en/report/<id> и /api/report/<id> (с повторным запросом по ETag);
+  redirect — редиректы middleware: '/' и неподдерживаемый язык в URL.
+
+По каждому шагу печатаются RPS, перцентили задержки, ошибки и число вызовов Firestore на запрос.
+"""
+import argparse
+import os
+import random
+import re
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_SPEC = 'loadtest.app_factory:create_app()'
+HREFLANG_RE = re.compile(r'<link rel="alternate" hreflang="([^"]+)" href="([^"]+)">')
+BOT_USER_AGENT = 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'
+DEFAULT_MIX = 'crawler=2,poller=5,viewer=3,redirect=1'
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def request(self, session, step, method, url, expected=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, allow_redirects=False, timeout=30, **kwargs)
+            ok = response.status_code in expected
+        except requests.RequestException:
+            response, ok = None, False
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies[step].append(elapsed)
+            if not ok:
+                self.errors[step] += 1
+        return response
+
+
+# --- Сценарии ---
+
+def crawler(session, base_url, fixtures, recorder, rng):
+    bot = {'headers': {'User-Agent': BOT_USER_AGENT}}
+    response = recorder.request(session, 'index', 'GET', f"{base_url}/en/", **bot)
+    if response is not None:
+        for hreflang, href in HREFLANG_RE.findall(response.text)[:3]:
+            recorder.request(session, 'index', 'GET', base_url + urlparse(href).path, **bot)
+    for analysis_id in rng.sample(fixtures['completed'], 3):
+        recorder.request(session, 'redirect', 'GET', f"{base_url}/report/{analysis_id}", expected=(302,), **bot)
+        recorder.request(session, 'report_page', 'GET', f"{base_url}/en/report/{analysis_id}", **bot)
+
+
+def poller(session, base_url, fixtures, recorder, rng):
+    running = rng.choice(fixtures['running_tasks'])
+    for _ in range(3):
+        recorder.request(session, 'status_running', 'GET', f"{base_url}/api/status/{running}?resolve=0")
+    finished = rng.choice(fixtures['finished_tasks'])
+    recorder.request(session, 'status_done', 'GET', f"{base_url}/api/status/{finished}")
+
+
+def viewer(session, base_url, fixtures, recorder, rng):
+    analysis_id = rng.choice(fixtures['completed'])
+    recorder.request(session, 'report_page', 'GET', f"{base_url}/en/report/{analysis_id}")
+    response = recorder.request(session, 'api_report', 'GET', f"{base_url}/api/report/{analysis_id}")
+    if response is not None and response.headers.get('ETag'):
+        recorder.request(session, 'api_report_304', 'GET', f"{base_url}/api/report/{analysis_id}",
+                         expected=(304,), headers={'If-None-Match': response.headers['ETag']})
+    pending_id = rng.choice(fixtures['pending'])
+    recorder.request(session, 'api_report', 'GET', f"{base_url}/api/report/{pending_id}")
+
+
+def redirect(session, base_url, fixtures, recorder, rng):
+    recorder.request(session, 'redirect', 'GET', f"{base_url}/", expected=(302,))
+    recorder.request(session, 'redirect', 'GET', f"{base_url}/xx/report/{rng.choice(fixtures['completed'])}",
+                     expected=(302,))
+
+
+SCENARIOS = {'crawler': crawler, 'poller': poller, 'viewer': viewer, 'redirect': redirect}
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# --- gunicorn ---
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(worker_class, workers, threads, port, verbose=False, flush=False):
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+               '--worker-class', worker_class, '--timeout', '0', '--log-level', 'warning']
+    if worker_class == 'gthread':
+        command += ['--threads', str(threads)]
+    elif worker_class in ('eventlet', 'gevent'):
+        command += ['--worker-connections', str(threads * 100)]
+    env = {**os.environ, 'PYTHONUNBUFFERED': '1'}
+    if flush:
+        env['LOADTEST_FLUSH'] = '1'
+    process = subprocess.Popen(command + [APP_SPEC], cwd=BACKEND_DIR, env=env,
+                               stdout=None if verbose else subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn ({worker_class}) exited with code {process.returncode}")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/__loadtest/fixtures", timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.3)
+    process.terminate()
+    raise RuntimeError(f"gunicorn ({worker_class}) did not start in time")
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def collect_firestore_calls(base_url, workers):
+    """
+    Счётчики живут в каждом воркере: опрашиваем, пока не увидим все процессы (или не кончатся попытки).
+    Возвращает ({endpoint: {operation: count}}, число увиденных процессов); операция 'request' — число запросов.
+    """
+    per_pid = {}
+    for _ in range(workers * 20):
+        stats = requests.get(f"{base_url}/__loadtest/stats", timeout=5).json()
+        per_pid[stats['pid']] = stats['firestore']
+        if len(per_pid) >= workers:
+            break
+    totals = defaultdict(lambda: defaultdict(int))
+    for endpoints in per_pid.values():
+        for endpoint, operations in endpoints.items():
+            for operation, count in operations.items():
+                totals[endpoint][operation] += count
+    return totals, len(per_pid)
+
+
+# --- прогон ---
+
+def run_load(base_url, fixtures, mix, users, duration, seed):
+    recorder = Recorder()
+    names, weights = zip(*mix.items())
+    deadline = time.monotonic() + duration
+
+    def user(user_index):
+        rng = random.Random(seed + user_index)
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            SCENARIOS[rng.choices(names, weights)[0]](session, base_url, fixtures, recorder, rng)
+
+    threads = [threading.Thread(target=user, args=(index,), daemon=True) for index in range(users)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.monotonic() - started
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def print_report(worker_class, recorder, elapsed, firestore_calls, workers_seen, workers):
+    total = sum(len(values) for values in recorder.latencies.values())
+    print(f"\n=== {worker_class}: {total} requests in {elapsed:.1f}s, {total / elapsed:.1f} req/s ===")
+    print(f"{'step':<16}{'count':>8}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for step in sorted(recorder.latencies):
+        values = sorted(recorder.latencies[step])
+        print(f"{step:<16}{len(values):>8}{len(values) / elapsed:>9.1f}"
+              f"{percentile(values, 0.5) * 1000:>9.1f}{percentile(values, 0.9) * 1000:>9.1f}"
+              f"{percentile(values, 0.99) * 1000:>9.1f}{recorder.errors[step]:>8}")
+
+    print(f"\nFirestore calls per request (from {workers_seen}/{workers} worker processes):")
+    for endpoint in sorted(firestore_calls):
+        operations = dict(firestore_calls[endpoint])
+        requests_served = operations.pop('request', 0)
+        calls = sum(operations.values())
+        per_request = f"{calls / requests_served:.2f}" if requests_served else '-'
+        print(f"  {endpoint:<28}{requests_served:>8} req {per_request:>7} calls/req  {operations}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Flask tier against in-memory backends.")
+    parser.add_argument('--worker-classes', nargs='+', default=['gthread'],
+                        choices=['sync', 'gthread', 'eventlet', 'gevent'])
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--users', type=int, default=16, help="concurrent virtual users")
+    parser.add_argument('--duration', type=float, default=20, help="seconds per worker class")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help="show the app's stdout")
+    parser.add_argument('--flush', action='store_true',
+                        help="allow flushing the Redis database in LOADTEST_REDIS_URL before the run")
+    args = parser.parse_args()
+
+    for worker_class in args.worker_classes:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        process = start_server(worker_class, args.workers, args.threads, port, args.verbose, args.flush)
+        try:
+            fixtures = requests.get(f"{base_url}/__loadtest/fixtures", timeout=5).json()
+            for _ in range(args.workers * 20):
+                requests.post(f"{base_url}/__loadtest/reset", timeout=5)
+            recorder, elapsed = run_load(base_url, fixtures, args.mix, args.users, args.duration, args.seed)
+            firestore_calls, workers_seen = collect_firestore_calls(base_url, args.workers)
+            print_report(worker_class, recorder, elapsed, firestore_calls, workers_seen, args.workers)
+        finally:
+            stop_server(process)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+# backend/model_eval.py
+"""
+Офлайн-сравнение моделей на записанных промптах (см. GEMINI_RECORD_PROMPTS_DIR в models.py).
+
+    python model_eval.py recordings/ --models gemini-1.5-flash gemini-1.5-pro
+    python model_eval.py recordings/ --kinds moderation verdict --limit 50
+
+Каждый записанный промпт повторно отправляется в каждую модель-кандидат. Для каждого
+вида промпта и модели печатаются задержка (p50/p90), число ошибок и согласие с записанным
+ответом (модель, на которой промпт был записан, считается эталоном):
+  moderation — совпадает OK/BLOCKED;
+  extraction — сходство списков утверждений (Жаккар по нормализованным строкам);
+  verdict    — совпадают вердикты (одиночный объект или массив по id);
+  summary    — совпадает overall_verdict;
+  blog       — согласие не считается, только задержка.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import models
+
+CLAIM_NUMBER_RE = re.compile(r'^\d+\.\s*')
+
+
+def _json_fragment(text, pattern):
+    match = re.search(pattern, text or '', re.DOTALL)
+    return json.loads(match.group(0)) if match else None
+
+
+def _verdicts(text):
+    text = text or ''
+    array_start, object_start = text.find('['), text.find('{')
+    is_array = array_start != -1 and (object_start == -1 or array_start < object_start)
+    try:
+        parsed = _json_fragment(text, r'\[.*\]' if is_array else r'\{.*\}')
+    except json.JSONDecodeError:
+        return None
+    if isinstance(parsed, list):
+        return {item.get('id'): item.get('verdict') for item in parsed if isinstance(item, dict)}
+    if isinstance(parsed, dict):
+        return {None: parsed.get('verdict')}
+    return None
+
+
+def _claims(text):
+    return {CLAIM_NUMBER_RE.sub('', line).strip().casefold() for line in (text or '').splitlines() if line.strip()}
+
+
+def _overall_verdict(text):
+    try:
+        parsed = _json_fragment(text, r'\{.*\}')
+    except json.JSONDecodeError:
+        return None
+    return parsed.get('overall_verdict') if isinstance(parsed, dict) else None
+
+
+def agreement(kind, reference, candidate):
+    """Согласие ответа кандидата с эталоном от 0 до 1 (None — для вида не определено)."""
+    if kind == 'moderation':
+        return float(reference.strip().upper() == candidate.strip().upper())
+    if kind == 'extraction':
+        expected, actual = _claims(reference), _claims(candidate)
+        return len(expected & actual) / len(expected | actual) if expected | actual else 1.0
+    if kind == 'verdict':
+        expected, actual = _verdicts(reference), _verdicts(candidate)
+        if not expected:
+            return None
+        actual = actual or {}
+        return sum(1 for key, verdict in expected.items() if actual.get(key) == verdict) / len(expected)
+    if kind == 'summary':
+        expected = _overall_verdict(reference)
+        return None if expected is None else float(expected == _overall_verdict(candidate))
+    return None
+
+
+def load_recordings(directory, kinds, limit):
+    recordings = {}
+    for kind in kinds:
+        path = os.path.join(directory, f"{kind}.jsonl")
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        recordings[kind] = records[-limit:] if limit else records
+    return recordings
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))] if values else 0.0
+
+
+def evaluate(recordings, model_names):
+    print(f"{'kind':<12}{'model':<26}{'n':>5}{'p50 s':>8}{'p90 s':>8}{'errors':>8}{'agreement':>11}")
+    for kind, records in recordings.items():
+        recorded_latencies = [record['latency'] for record in records]
+        recorded_model = records[0]['model'] if records else '-'
+        print(f"{kind:<12}{recorded_model + ' (recorded)':<26}{len(records):>5}"
+              f"{percentile(recorded_latencies, 0.5):>8.2f}{percentile(recorded_latencies, 0.9):>8.2f}"
+              f"{0:>8}{'1.000':>11}")
+        for model_name in model_names:
+            latencies, scores, errors = [], [], 0
+            for record in records:
+                started = time.monotonic()
+                try:
+                    candidate = models.get_model_by_name(model_name).generate_content(record['prompt']).text
+                except Exception as e:
+                    errors += 1
+                    print(f"  {model_name}: {e}", file=sys.stderr)
+                    continue
+                latencies.append(time.monotonic() - started)
+                score = agreement(kind, record['response'], candidate)
+                if score is not None:
+                    scores.append(score)
+            agreement_text = f"{sum(scores) / len(scores):.3f}" if scores else '-'
+            print(f"{kind:<12}{model_name:<26}{len(latencies):>5}{percentile(latencies, 0.5):>8.2f}"
+                  f"{percentile(latencies, 0.9):>8.2f}{errors:>8}{agreement_text:>11}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay recorded prompts against candidate Gemini models.")
+    parser.add_argument('directory', help="GEMINI_RECORD_PROMPTS_DIR with <kind>.jsonl files")
+    parser.add_argument('--models', nargs='+', help="candidate models (default: the configured model of each kind)")
+    parser.add_argument('--kinds', nargs='+', choices=models.PROMPT_KINDS, default=list(models.PROMPT_KINDS))
+    parser.add_argument('--limit', type=int, default=100, help="most recent prompts per kind (0 = all)")
+    args = parser.parse_args()
+
+    recordings = load_recordings(args.directory, args.kinds, args.limit)
+    if not recordings:
+        print(f"No recordings found in {args.directory}")
+        sys.exit(1)
+    candidate_models = args.models or sorted({models.model_name_for(kind) for kind in recordings})
+    evaluate(recordings, candidate_models)
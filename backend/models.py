@@ -0,0 +1,106 @@
+# backend/models.py
+"""
+Реестр моделей Gemini по видам промптов.
+
+Каждый вид промпта (moderation, extraction, verdict, summary, blog) привязан к своей
+модели в GEMINI_MODELS; переопределение — переменной окружения GEMINI_MODEL_<KIND>
+(например, GEMINI_MODEL_VERDICT=gemini-1.5-pro). Клиенты GenerativeModel кэшируются
+по имени модели, так что виды с одной моделью делят один клиент.
+
+Если задан GEMINI_RECORD_PROMPTS_DIR, каждый вызов generate_content дописывается
+в <dir>/<kind>.jsonl (промпт, ответ, модель, задержка) — это вход для model_eval.py.
+"""
+import json
+import os
+import threading
+import time
+
+import resilience
+from constants import GEMINI_MODELS, DEFAULT_GEMINI_MODEL, GEMINI_TIMEOUT_SECONDS
+
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+RECORD_PROMPTS_DIR = os.environ.get('GEMINI_RECORD_PROMPTS_DIR')
+
+PROMPT_KINDS = tuple(GEMINI_MODELS)
+
+_clients = {}
+_clients_lock = threading.Lock()
+_record_lock = threading.Lock()
+
+
+def model_name_for(kind):
+    """Имя модели для вида промпта с учётом переопределения из окружения."""
+    return os.environ.get(f'GEMINI_MODEL_{kind.upper()}') or GEMINI_MODELS.get(kind, DEFAULT_GEMINI_MODEL)
+
+
+def get_model_by_name(model_name):
+    """Кэшированный клиент GenerativeModel для конкретной модели."""
+    client = _clients.get(model_name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(model_name)
+            if client is None:
+                if not GEMINI_API_KEY:
+                    raise ValueError("GEMINI_API_KEY is not configured.")
+                # SDK Gemini импортируется лениво: веб-процесс (app.py импортирует tasks) его не вызывает
+                import google.generativeai as genai
+                genai.configure(api_key=GEMINI_API_KEY)
+                client = genai.GenerativeModel(model_name)
+                _clients[model_name] = client
+    return client
+
+
+def get_model(kind):
+    return get_model_by_name(model_name_for(kind))
+
+
+def _record(kind, model_name, prompt, response_text, latency):
+    record = {"kind": kind, "model": model_name, "prompt": prompt, "response": response_text,
+              "latency": round(latency, 3), "recorded_at": time.time()}
+    with _record_lock:
+        os.makedirs(RECORD_PROMPTS_DIR, exist_ok=True)
+        with open(os.path.join(RECORD_PROMPTS_DIR, f"{kind}.jsonl"), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def stream_content(kind, prompt):
+    """
+    Потоковая генерация: отдаёт текст фрагментами по мере ответа модели.
+    Сбой провайдера посреди потока (сеть, таймаут, 5xx/429) засчитывается размыкателю.
+    """
+    model_name = model_name_for(kind)
+    started = time.monotonic()
+    client = get_model_by_name(model_name)
+    response = resilience.call('gemini', lambda: client.generate_content(
+        prompt, stream=True, request_options={'timeout': GEMINI_TIMEOUT_SECONDS}), hedge=False, kind=kind)
+    parts = []
+    try:
+        for chunk in response:
+            text = chunk.text
+            parts.append(text)
+            yield text
+    except Exception as e:
+        if resilience.is_provider_failure(e):
+            resilience.record_failure('gemini')
+        raise
+    if RECORD_PROMPTS_DIR:
+        try:
+            _record(kind, model_name, prompt, ''.join(parts), time.monotonic() - started)
+        except (OSError, ValueError) as e:
+            print(f"[models] Could not record {kind} prompt: {e}")
+
+
+def generate_content(kind, prompt):
+    """generate_content модели, назначенной виду промпта. Возвращает ответ SDK как есть."""
+    model_name = model_name_for(kind)
+    started = time.monotonic()
+    client = get_model_by_name(model_name)
+    # Таймаут, хеджирование медленных ответов и circuit breaker — в resilience.py
+    response = resilience.call('gemini', lambda: client.generate_content(
+        prompt, request_options={'timeout': GEMINI_TIMEOUT_SECONDS}), kind=kind)
+    if RECORD_PROMPTS_DIR:
+        try:
+            _record(kind, model_name, prompt, response.text, time.monotonic() - started)
+        except (OSError, ValueError) as e:
+            print(f"[models] Could not record {kind} prompt: {e}")
+    return response
@@ -0,0 +1,17 @@
+# backend/redis_store.py
+import os
+
+import redis
+
+# Тот же Redis, что используется брокером и result backend Celery (см. app.py)
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
+redis_client = None
+
+
+def get_redis_client():
+    """Возвращает общий (ленивый) клиент Redis для кэшей и служебных структур."""
+    global redis_client
+    if redis_client is None:
+        redis_client = redis.Redis.from_url(REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+    return redis_client
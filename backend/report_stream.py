@@ -0,0 +1,106 @@
+# backend/report_stream.py
+"""
+Поток событий проверки утверждений для страницы отчёта (Server-Sent Events).
+
+Задача fact_check_selected пишет события в Redis Stream своей задачи
+(report_stream:<task_id>), веб-процесс отдаёт их браузеру через /api/status/<task_id>/stream:
+  claim   — готова карточка вердикта ({"hash", "claim", "verdict", ...});
+  summary — частичное саммари по мере генерации ({"overall_verdict", "overall_assessment"});
+  done    — итоговый отчёт записан в 'analyses' ({"id"});
+  failed  — задача завершилась ошибкой ({"message"}).
+Поток привязан к id задачи: повторы той же задачи дописывают его, а новая проверка
+того же анализа начинает новый. Итоговый документ по-прежнему пишется одной записью.
+"""
+import json
+import re
+
+import redis
+
+from constants import REPORT_STREAM_TTL_SECONDS, REPORT_STREAM_MAXLEN
+from redis_store import get_redis_client
+
+EVENTS = ('claim', 'summary', 'done', 'failed')
+FINAL_EVENTS = ('done', 'failed')
+
+
+def _key(task_id):
+    return f"report_stream:{task_id}"
+
+
+def publish(task_id, event, data):
+    """Дописывает событие в поток задачи. Ошибки Redis не должны ронять проверку."""
+    if not task_id:
+        return
+    try:
+        pipe = get_redis_client().pipeline()
+        pipe.xadd(_key(task_id), {'event': event, 'data': json.dumps(data, ensure_ascii=False, default=str)},
+                  maxlen=REPORT_STREAM_MAXLEN, approximate=True)
+        pipe.expire(_key(task_id), REPORT_STREAM_TTL_SECONDS)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"[report_stream] Could not publish {event} for {task_id}: {e}")
+
+
+def read(task_id, last_id='0', block_ms=1500):
+    """
+    События после last_id: список (stream_id, event, data_json). Ждёт до block_ms,
+    если новых нет (block_ms меньше socket_timeout клиента Redis).
+    """
+    response = get_redis_client().xread({_key(task_id): last_id}, block=block_ms, count=100)
+    events = []
+    for _, entries in response or []:
+        for stream_id, fields in entries:
+            events.append((stream_id.decode(), fields[b'event'].decode(), fields[b'data'].decode()))
+    return events
+
+
+# --- Разбор JSON саммари по мере генерации ---
+
+def _partial_string(buffer, key):
+    """
+    Значение строкового поля key из недописанного JSON: (текст, дописано ли поле).
+    None, если поле ещё не началось.
+    """
+    match = re.search(r'"%s"\s*:\s*"' % re.escape(key), buffer)
+    if not match:
+        return None
+    position, chars = match.end(), []
+    while position < len(buffer):
+        char = buffer[position]
+        if char == '"':
+            return ''.join(chars), True
+        if char == '\\':
+            length = 6 if buffer[position + 1:position + 2] == 'u' else 2
+            escape = buffer[position:position + length]
+            if len(escape) < length:
+                break  # экранирование обрезано концом буфера — дождёмся следующего фрагмента
+            try:
+                chars.append(json.loads(f'"{escape}"'))
+            except json.JSONDecodeError:
+                chars.append(escape[1:])
+            position += len(escape)
+            continue
+        chars.append(char)
+        position += 1
+    return ''.join(chars), False
+
+
+class SummaryStream:
+    """Накапливает фрагменты ответа модели и отдаёт частичное саммари, когда оно изменилось."""
+
+    def __init__(self):
+        self.buffer = ''
+        self.last = None
+
+    def feed(self, text):
+        self.buffer += text
+        verdict = _partial_string(self.buffer, 'overall_verdict')
+        assessment = _partial_string(self.buffer, 'overall_assessment')
+        partial = {
+            "overall_verdict": verdict[0] if verdict and verdict[1] else None,
+            "overall_assessment": assessment[0] if assessment else '',
+        }
+        if partial == self.last or not (partial["overall_verdict"] or partial["overall_assessment"]):
+            return None
+        self.last = partial
+        return partial
@@ -0,0 +1,235 @@
+# backend/resilience.py
+"""
+Защита от медленных и деградировавших провайдеров (Gemini, SearchAPI, Google Custom Search).
+
+  * Хеджирование: если вызов не завершился за p{HEDGE_PERCENTILE} недавних задержек
+    этого провайдера для того же вида запроса (kind: вид промпта Gemini), параллельно
+    отправляется дубликат; берётся первый успешный ответ.
+  * Circuit breaker: после BREAKER_FAILURE_THRESHOLD сбоев (сеть, таймаут, 5xx, 429) за BREAKER_WINDOW_SECONDS
+    провайдер считается недоступным на BREAKER_COOLDOWN_SECONDS — вызовы сразу падают
+    с CircuitOpenError, а /api/analyze отвечает 503 вместо постановки задачи в очередь.
+    После паузы действует испытательный срок: первая же ошибка снова размыкает цепь.
+
+Состояние размыкателей хранится в Redis, поэтому его видят все воркеры и веб-процесс.
+Задержки для порога хеджирования считаются в памяти процесса, отдельно по (провайдер, вид запроса):
+короткие вердикты не должны задавать порог для длинных и дорогих извлечений утверждений.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import redis
+import requests
+
+import tracing
+from constants import (RESILIENCE_PROVIDERS, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES, HEDGE_MIN_DELAY_SECONDS,
+                       HEDGE_POOL_SIZE, BREAKER_FAILURE_THRESHOLD, BREAKER_WINDOW_SECONDS,
+                       BREAKER_COOLDOWN_SECONDS, BREAKER_PROBATION_SECONDS)
+from redis_store import get_redis_client
+
+LATENCY_SAMPLES = 200
+
+
+class CircuitOpenError(Exception):
+    """Провайдер временно отключён размыкателем."""
+
+    def __init__(self, provider, retry_after):
+        super().__init__(f"{provider} is temporarily unavailable, retry in {retry_after}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class ProviderError(Exception):
+    """Ответ провайдера, который считается сбоем (5xx, 429)."""
+
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    GOOGLE_PROVIDER_ERRORS = (google_exceptions.ServerError, google_exceptions.ServiceUnavailable,
+                              google_exceptions.DeadlineExceeded, google_exceptions.TooManyRequests)
+except ImportError:
+    GOOGLE_PROVIDER_ERRORS = ()
+
+# Размыкатель учитывает только сбои самого провайдера: сеть, таймауты, 5xx и 429.
+# Ошибки запроса (InvalidArgument на слишком длинный промпт, 4xx) говорят о конкретном входе,
+# и несколько таких входов не должны отключать провайдера для всех пользователей.
+PROVIDER_FAILURES = (ProviderError, requests.ConnectionError, requests.Timeout, TimeoutError) + GOOGLE_PROVIDER_ERRORS
+
+
+def is_provider_failure(error):
+    return isinstance(error, PROVIDER_FAILURES)
+
+
+_latencies = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES))  # (provider, kind) -> задержки
+_latencies_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+# Запросов в пуле одновременно, включая брошенные (проигравшие хедж, но ещё не завершённые)
+_pool_slots = threading.BoundedSemaphore(HEDGE_POOL_SIZE)
+
+
+def _get_executor():
+    # Пул создаётся лениво: в prefork-воркере Celery — уже после fork
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=HEDGE_POOL_SIZE, thread_name_prefix='hedge')
+    return _executor
+
+
+def _submit(provider, kind, fn):
+    """
+    Запрос в пул хеджирования, если в нём есть свободный поток, иначе None.
+    Когда провайдер деградирует, потоки заняты брошенными медленными запросами —
+    новые вызовы не должны вставать за ними в очередь пула.
+    """
+    if not _pool_slots.acquire(blocking=False):
+        return None
+    future = _get_executor().submit(_timed, provider, kind, fn)
+    future.add_done_callback(lambda _: _pool_slots.release())
+    return future
+
+
+def _key(provider, name):
+    return f"breaker:{provider}:{name}"
+
+
+# --- Circuit breaker ---
+
+def breaker_retry_after(provider):
+    """Секунды до повторной попытки, если цепь разомкнута, иначе 0."""
+    try:
+        ttl = get_redis_client().ttl(_key(provider, 'open'))
+    except redis.RedisError:
+        return 0  # без Redis не блокируем вызовы
+    return max(ttl, 1) if ttl and ttl > 0 else 0
+
+
+def unavailable_providers(providers):
+    """Список (provider, retry_after) для разомкнутых цепей из providers."""
+    unavailable = []
+    for provider in providers:
+        retry_after = breaker_retry_after(provider)
+        if retry_after:
+            unavailable.append((provider, retry_after))
+    return unavailable
+
+
+def record_success(provider):
+    try:
+        pipe = get_redis_client().pipeline()
+        pipe.delete(_key(provider, 'failures'))
+        pipe.delete(_key(provider, 'probation'))
+        pipe.execute()
+    except redis.RedisError:
+        pass
+
+
+def record_failure(provider):
+    try:
+        r = get_redis_client()
+        pipe = r.pipeline()
+        pipe.set(_key(provider, 'failures'), 0, ex=BREAKER_WINDOW_SECONDS, nx=True)  # окно считается от первой ошибки
+        pipe.incr(_key(provider, 'failures'))
+        pipe.exists(_key(provider, 'probation'))
+        _, failures, on_probation = pipe.execute()
+        if failures >= BREAKER_FAILURE_THRESHOLD or on_probation:
+            pipe = r.pipeline()
+            pipe.set(_key(provider, 'open'), 1, ex=BREAKER_COOLDOWN_SECONDS)
+            pipe.set(_key(provider, 'probation'), 1, ex=BREAKER_COOLDOWN_SECONDS + BREAKER_PROBATION_SECONDS)
+            pipe.delete(_key(provider, 'failures'))
+            pipe.execute()
+            print(f"[resilience] Circuit for {provider} opened for {BREAKER_COOLDOWN_SECONDS}s")
+    except redis.RedisError as e:
+        print(f"[resilience] Could not record failure for {provider}: {e}")
+
+
+# --- Хеджирование ---
+
+def hedge_delay(provider, kind=None):
+    """Через сколько секунд отправлять дубликат: процентиль недавних задержек провайдера для этого вида запроса."""
+    with _latencies_lock:
+        samples = sorted(_latencies.get((provider, kind), ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return RESILIENCE_PROVIDERS[provider]['initial_hedge_delay']
+    return max(samples[int(HEDGE_PERCENTILE * (len(samples) - 1))], HEDGE_MIN_DELAY_SECONDS)
+
+
+def _timed(provider, kind, fn):
+    started = time.monotonic()
+    result = fn()
+    with _latencies_lock:
+        _latencies[(provider, kind)].append(time.monotonic() - started)
+    return result
+
+
+def call(provider, fn, hedge=True, kind=None):
+    """
+    Выполняет fn() — вызов провайдера — через размыкатель и с хеджированием.
+    fn должна бросать исключение на сбой (в том числе ProviderError для 5xx/429); размыкателю
+    засчитываются только сбои провайдера (PROVIDER_FAILURES), а не ошибки конкретного запроса.
+    hedge=False — только размыкатель; задержка такого вызова не учитывается в порогах
+    хеджирования (например, потоковый ответ модели, который возвращается после первого фрагмента).
+    kind — вид запроса (вид промпта Gemini): у каждого свой порог хеджирования.
+    """
+    with tracing.span(f"provider.{provider}", {"provider": provider, "provider.kind": kind or ''}):
+        # Запросы в пуле хеджирования — дочерние спаны этого вызова
+        return _call(provider, kind, tracing.bind(fn), hedge)
+
+
+def _call(provider, kind, fn, hedge):
+    retry_after = breaker_retry_after(provider)
+    if retry_after:
+        tracing.set_attribute("provider.circuit_open", True)
+        raise CircuitOpenError(provider, retry_after)
+
+    if not hedge or not RESILIENCE_PROVIDERS[provider]['hedge']:
+        return _call_direct(provider, kind, fn, timed=hedge)
+
+    first = _submit(provider, kind, fn)
+    if first is None:
+        # Пул занят: вызываем в своём потоке, без хеджирования
+        tracing.set_attribute("provider.hedge_skipped", True)
+        return _call_direct(provider, kind, fn, timed=True)
+    done, pending = wait({first}, timeout=hedge_delay(provider, kind))
+    if not done:
+        hedge_future = _submit(provider, kind, fn)  # хедж: дубликат медленного запроса
+        if hedge_future is not None:
+            pending.add(hedge_future)
+            tracing.set_attribute("provider.hedged", True)
+        else:
+            tracing.set_attribute("provider.hedge_skipped", True)
+
+    last_error = None
+    while True:
+        for future in done:
+            if future.exception() is None:
+                record_success(provider)
+                return future.result()  # оставшийся запрос дорабатывает в пуле, его результат не нужен
+            last_error = future.exception()
+        if not pending:
+            break
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+    if is_provider_failure(last_error):
+        record_failure(provider)
+    raise last_error
+
+
+def _call_direct(provider, kind, fn, timed):
+    try:
+        result = _timed(provider, kind, fn) if timed else fn()
+    except Exception as e:
+        if is_provider_failure(e):
+            record_failure(provider)
+        raise
+    record_success(provider)
+    return result
+
+
+def raise_for_provider_status(response):
+    """Для requests.Response: 5xx и 429 считаются сбоем провайдера."""
+    if response.status_code >= 500 or response.status_code == 429:
+        raise ProviderError(f"{response.url.split('?')[0]} returned HTTP {response.status_code}")
+    return response
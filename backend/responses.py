@@ -0,0 +1,104 @@
+# backend/responses.py
+"""
+Слой ответов веб-процесса:
+  * FastJSONProvider — сериализация через orjson, если он установлен (иначе стандартная
+    из Flask); формат вывода тот же: ключи отсортированы, даты в формате HTTP-date;
+  * compress_response — gzip/brotli для текстовых ответов больше COMPRESSION_MIN_BYTES;
+  * analysis_etag / conditional_json — ETag от updated_at анализа и ответ 304 на If-None-Match.
+"""
+import gzip
+import hashlib
+
+from flask import jsonify, make_response, request
+from flask.json.provider import DefaultJSONProvider
+
+from constants import COMPRESSION_MIN_BYTES, GZIP_COMPRESS_LEVEL, BROTLI_QUALITY
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = frozenset({
+    'application/json', 'text/html', 'text/plain', 'text/css', 'text/xml',
+    'application/xml', 'application/javascript',
+})
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider с orjson в dumps/loads для обычного (компактного) случая."""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.get('indent') is not None:
+            return super().dumps(obj, **kwargs)
+        # Даты и прочие нестандартные типы — через тот же default, что и у Flask
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            options |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=options).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def _negotiate_encoding():
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """after_request: сжимает крупные текстовые ответы алгоритмом, который принимает клиент."""
+    response.vary.add('Accept-Encoding')
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_BYTES:
+        return response
+    encoding = _negotiate_encoding()
+    if encoding is None:
+        return response
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=GZIP_COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def analysis_etag(analysis_id, data):
+    """Слабый ETag документа анализа: меняется при каждой записи (updated_at) и смене статуса."""
+    changed_at = data.get('updated_at') or data.get('created_at')
+    stamp = changed_at.isoformat() if hasattr(changed_at, 'isoformat') else str(changed_at)
+    return f"{analysis_id}:{data.get('status', '')}:{stamp}"
+
+
+def list_etag(items):
+    """ETag для списка анализов: по id и меткам времени каждого элемента."""
+    digest = hashlib.sha1()
+    for item in items:
+        digest.update(f"{item.get('id')}|{item.get('updated_at') or item.get('created_at')}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def conditional_json(payload, etag):
+    """jsonify с ETag; на совпавший If-None-Match возвращает 304 без тела (и без сериализации)."""
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
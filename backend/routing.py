@@ -0,0 +1,114 @@
+# backend/routing.py
+"""
+Предвычисленная маршрутизация по языку.
+
+Редиректы со старого домена и на URL с языковым префиксом выполняются тонким
+WSGI-middleware ещё до Flask: краулеры, которые в основном и получают эти редиректы,
+не платят за контекст запроса, before_request-хуки и Babel.
+"""
+import re
+from functools import lru_cache
+
+from werkzeug.datastructures import LanguageAccept
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_accept_header
+from werkzeug.routing import RequestRedirect
+from werkzeug.utils import redirect
+from werkzeug.wrappers import Request
+
+from constants import LANGUAGES, DEFAULT_LANGUAGE, SITE_DOMAIN
+
+SUPPORTED_LANGUAGES = tuple(LANGUAGES)
+LANGUAGE_LOOKUP = frozenset(SUPPORTED_LANGUAGES)
+
+LEGACY_DOMAIN = 'propacondom.com'
+
+BOT_KEYWORDS = (
+    'googlebot', 'bingbot', 'slurp', 'duckduckbot', 'baiduspider',
+    'yandexbot', 'sogou', 'exabot', 'facebot', 'facebookexternalhit',  # facebook
+    'twitterbot', 'linkedinbot', 'applebot', 'pinterest'
+)
+BOT_USER_AGENT_RE = re.compile('|'.join(map(re.escape, BOT_KEYWORDS)), re.IGNORECASE)
+
+# Пути и эндпоинты, которые живут без языкового префикса
+UNPREFIXED_PATHS = frozenset({'/robots.txt', '/sitemap.xml', '/favicon.ico'})
+UNPREFIXED_PATH_PREFIXES = ('/api/', '/static/', '/assets/', '/sitemaps/')
+UNPREFIXED_ENDPOINTS = frozenset({'static', 'assets', 'set_language', 'sitemap', 'sitemap_shard', 'robots_txt'})
+
+
+def is_bot_user_agent(user_agent):
+    return bool(user_agent) and BOT_USER_AGENT_RE.search(user_agent) is not None
+
+
+@lru_cache(maxsize=1024)
+def resolve_accept_language(header):
+    """Лучший поддерживаемый язык для заголовка Accept-Language (результат кэшируется)."""
+    if not header:
+        return None
+    return parse_accept_header(header, LanguageAccept).best_match(SUPPORTED_LANGUAGES)
+
+
+def preferred_language(cookie_lang, accept_language):
+    """Язык для пользователя без префикса в URL: cookie 'lang', затем Accept-Language, затем язык по умолчанию."""
+    if cookie_lang in LANGUAGE_LOOKUP:
+        return cookie_lang
+    return resolve_accept_language(accept_language) or DEFAULT_LANGUAGE
+
+
+class LocaleRoutingMiddleware:
+    """
+    WSGI-обёртка над Flask-приложением:
+      1. propacondom.com/* -> 301 на factchecking.pro;
+      2. /                 -> 302 на /<lang>/ (боты всегда на язык по умолчанию);
+      3. /xx/...           -> 302 на /<default>/..., если xx — неподдерживаемый язык;
+      4. /report/<id> и другие страницы без префикса -> 302 на /<lang>/...
+    Всё остальное (включая 404) передаётся во Flask без изменений.
+    """
+
+    def __init__(self, wsgi_app, url_map):
+        self.wsgi_app = wsgi_app
+        self.url_map = url_map
+
+    def __call__(self, environ, start_response):
+        target = self.redirect_target(Request(environ))
+        if target is None:
+            return self.wsgi_app(environ, start_response)
+        location, code = target
+        return redirect(location, code=code)(environ, start_response)
+
+    def redirect_target(self, request):
+        if request.host.startswith(LEGACY_DOMAIN):
+            new_url = f"https://{SITE_DOMAIN}{request.full_path}"
+            return (new_url[:-1] if new_url.endswith('?') else new_url), 301
+
+        path = request.path
+        if path in UNPREFIXED_PATHS or path.startswith(UNPREFIXED_PATH_PREFIXES):
+            return None
+        first_segment = path.lstrip('/').split('/', 1)[0]
+        if first_segment in LANGUAGE_LOOKUP:
+            return None
+
+        query = f"?{request.query_string.decode('utf-8')}" if request.query_string else ""
+        if path == '/':
+            if is_bot_user_agent(request.user_agent.string):
+                lang = DEFAULT_LANGUAGE
+            else:
+                lang = preferred_language(request.cookies.get('lang'), request.headers.get('Accept-Language'))
+            return f"/{lang}/{query}", 302
+
+        try:
+            endpoint, view_args = self.url_map.bind_to_environ(request.environ).match(path, method=request.method)
+        except RequestRedirect:
+            return None
+        except HTTPException:
+            return None  # 404 / 405 отдаст сам Flask
+        if endpoint in UNPREFIXED_ENDPOINTS:
+            return None
+        if 'lang' in view_args:
+            # Неподдерживаемый язык в URL (например, /xx/report/123) — заменяем его языком по умолчанию
+            rest = path.lstrip('/').split('/', 1)
+            new_path = f"/{DEFAULT_LANGUAGE}/{rest[1] if len(rest) > 1 else ''}"
+        else:
+            lang = preferred_language(request.cookies.get('lang'), request.headers.get('Accept-Language'))
+            new_path = f"/{lang}{path}"
+        return f"{new_path}{query}", 302
@@ -0,0 +1,203 @@
+# backend/search_index.py
+"""
+Полнотекстовый поиск по завершённым отчётам (инвертированный индекс в Redis).
+
+Индексируются заголовок, ключевые выводы (summary_data.key_points) и тексты утверждений
+с весами TITLE_WEIGHT / KEY_POINT_WEIGHT / CLAIM_WEIGHT. Отчёт попадает в индекс
+отдельного языка (target_lang), запросы выполняются в пределах одного языка.
+
+Ключи:
+  search:{lang}:term:{term} — sorted set: analysis_id -> вес термина в отчёте;
+  search:{lang}:docs        — множество проиндексированных отчётов языка (для idf);
+  search:doc:{id}           — карточка отчёта для выдачи;
+  search:doc_terms:{id}     — термины отчёта (чтобы при переиндексации убрать старые).
+
+Индекс дополняется в конце fact_check_selected; для существующих отчётов:
+    python search_index.py reindex
+"""
+import json
+import math
+import re
+import sys
+import unicodedata
+import uuid
+from collections import Counter
+
+from constants import (LANGUAGES, DEFAULT_LANGUAGE, SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE,
+                       SEARCH_MAX_QUERY_TERMS)
+from redis_store import get_redis_client
+
+TITLE_WEIGHT = 3
+KEY_POINT_WEIGHT = 2
+CLAIM_WEIGHT = 1
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+CJK_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+ARABIC_DIACRITICS_RE = re.compile(r'[\u064b-\u065f\u0670\u0640]')  # огласовки и татвиль
+ARABIC_ALEF_RE = re.compile(r'[\u0622\u0623\u0625]')
+
+# Короткие списки служебных слов для языков с пробелами между словами
+STOPWORDS = {
+    'en': {'the', 'and', 'of', 'to', 'in', 'on', 'at', 'by', 'as', 'is', 'it', 'an', 'or', 'be', 'for', 'that', 'with', 'this', 'from', 'are', 'was', 'were', 'has', 'have', 'had',
+           'not', 'but', 'its', 'his', 'her', 'they', 'their', 'which', 'been', 'will', 'into', 'than', 'about'},
+    'es': {'el', 'la', 'los', 'las', 'de', 'del', 'que', 'en', 'un', 'una', 'por', 'con', 'para', 'se', 'su',
+           'sus', 'al', 'lo', 'es', 'como', 'más', 'pero', 'fue', 'son'},
+    'fr': {'le', 'la', 'les', 'de', 'des', 'du', 'un', 'une', 'et', 'en', 'que', 'qui', 'dans', 'pour', 'par',
+           'sur', 'est', 'au', 'aux', 'pas', 'plus', 'ce', 'ces', 'sont', 'avec'},
+    'pt': {'o', 'a', 'os', 'as', 'de', 'do', 'da', 'dos', 'das', 'que', 'em', 'um', 'uma', 'para', 'por',
+           'com', 'no', 'na', 'nos', 'nas', 'se', 'foi', 'são', 'mais', 'ao'},
+    'de': {'der', 'die', 'das', 'den', 'dem', 'des', 'und', 'ein', 'eine', 'einer', 'ist', 'sind', 'war', 'von',
+           'mit', 'für', 'auf', 'im', 'in', 'zu', 'nicht', 'sich', 'auch', 'als', 'wurde', 'dass'},
+    'ru': {'и', 'в', 'во', 'не', 'что', 'на', 'с', 'со', 'как', 'по', 'из', 'за', 'от', 'до', 'для', 'это',
+           'был', 'была', 'были', 'его', 'ее', 'её', 'их', 'но', 'а', 'к', 'о', 'об', 'же', 'то', 'также'},
+    'uk': {'і', 'й', 'та', 'в', 'у', 'не', 'що', 'на', 'з', 'із', 'як', 'по', 'до', 'для', 'це', 'був',
+           'була', 'були', 'його', 'її', 'їх', 'але', 'а', 'к', 'про', 'також'},
+    'hi': {'का', 'के', 'की', 'है', 'हैं', 'में', 'से', 'को', 'और', 'पर', 'यह', 'था', 'थे', 'थी', 'एक', 'ने'},
+    'bn': {'এবং', 'এই', 'যে', 'করে', 'হয়', 'ছিল', 'একটি', 'থেকে', 'জন্য', 'সঙ্গে', 'তার', 'না'},
+    'ar': {'في', 'من', 'على', 'الى', 'إلى', 'عن', 'ان', 'أن', 'هذا', 'هذه', 'التي', 'الذي', 'كان', 'و', 'مع'},
+    'zh': set(),
+}
+
+
+def _key(lang, name):
+    return f"search:{lang}:{name}"
+
+
+def tokenize(text, lang=DEFAULT_LANGUAGE):
+    """
+    Нормализует и разбивает текст на термины с учётом языка:
+    китайский — биграммы иероглифов, арабский — без огласовок и с единой формой алифа,
+    остальные — слова без служебных слов и односимвольных токенов.
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKC', str(text)).casefold()
+    terms = []
+    if lang == 'zh':
+        for run in CJK_RE.findall(text):
+            terms.extend(run if len(run) == 1 else (run[i:i + 2] for i in range(len(run) - 1)))
+        text = CJK_RE.sub(' ', text)
+    elif lang == 'ar':
+        text = ARABIC_ALEF_RE.sub('\u0627', ARABIC_DIACRITICS_RE.sub('', text))
+    stopwords = STOPWORDS.get(lang, set())
+    for word in WORD_RE.findall(text):
+        if word.isdigit():
+            if len(word) == 4:  # из чисел оставляем только похожие на годы
+                terms.append(word)
+        elif len(word) > 1 and word not in stopwords:
+            terms.append(word)
+    return terms
+
+
+def document_terms(report, lang):
+    """Взвешенная частота терминов отчёта."""
+    weights = Counter()
+    for term in tokenize(report.get('video_title') or report.get('title'), lang):
+        weights[term] += TITLE_WEIGHT
+    for point in (report.get('summary_data') or {}).get('key_points') or []:
+        for term in tokenize(point, lang):
+            weights[term] += KEY_POINT_WEIGHT
+    for claim in report.get('extracted_claims') or []:
+        for term in tokenize(claim.get('text'), lang):
+            weights[term] += CLAIM_WEIGHT
+    return weights
+
+
+def _card(analysis_id, report):
+    updated_at = report.get('updated_at')
+    return {
+        "id": analysis_id,
+        "video_title": report.get('video_title') or report.get('title') or "",
+        "thumbnail_url": report.get('thumbnail_url', ""),
+        "input_type": report.get('input_type', ""),
+        "source_url": report.get('source_url', ""),
+        "overall_verdict": (report.get('summary_data') or {}).get('overall_verdict', ""),
+        "updated_at": updated_at.isoformat() if hasattr(updated_at, 'isoformat') else (updated_at or ""),
+    }
+
+
+def index_analysis(analysis_id, report):
+    """Добавляет (или переиндексирует) завершённый отчёт."""
+    if report.get('status') != 'COMPLETED':
+        return 0
+    lang = report.get('target_lang') or DEFAULT_LANGUAGE
+    if lang not in LANGUAGES:
+        lang = DEFAULT_LANGUAGE
+    r = get_redis_client()
+    weights = document_terms(report, lang)
+    old_terms = [term.decode() for term in r.smembers(f"search:doc_terms:{analysis_id}")]
+
+    pipe = r.pipeline()
+    for term in old_terms:
+        if term not in weights:
+            pipe.zrem(_key(lang, f"term:{term}"), analysis_id)
+    for term, weight in weights.items():
+        pipe.zadd(_key(lang, f"term:{term}"), {analysis_id: weight})
+    pipe.delete(f"search:doc_terms:{analysis_id}")
+    if weights:
+        pipe.sadd(f"search:doc_terms:{analysis_id}", *weights)
+    pipe.sadd(_key(lang, 'docs'), analysis_id)
+    pipe.set(f"search:doc:{analysis_id}", json.dumps(_card(analysis_id, report), ensure_ascii=False))
+    pipe.execute()
+    return len(weights)
+
+
+def search(query, lang=DEFAULT_LANGUAGE, page=1, page_size=SEARCH_PAGE_SIZE):
+    """
+    Ранжированный поиск: сумма весов совпавших терминов, умноженных на idf.
+    Возвращает dict с results (карточки отчётов), total, page, page_size.
+    """
+    if lang not in LANGUAGES:
+        lang = DEFAULT_LANGUAGE
+    page = max(int(page), 1)
+    page_size = min(max(int(page_size), 1), SEARCH_MAX_PAGE_SIZE)
+    terms = list(dict.fromkeys(tokenize(query, lang)))[:SEARCH_MAX_QUERY_TERMS]
+    empty = {"results": [], "total": 0, "page": page, "page_size": page_size}
+    if not terms:
+        return empty
+
+    r = get_redis_client()
+    term_keys = [_key(lang, f"term:{term}") for term in terms]
+    pipe = r.pipeline()
+    pipe.scard(_key(lang, 'docs'))
+    for term_key in term_keys:
+        pipe.zcard(term_key)
+    total_docs, *doc_freqs = pipe.execute()
+    weights = {term_key: math.log(1 + total_docs / doc_freq)
+               for term_key, doc_freq in zip(term_keys, doc_freqs) if doc_freq}
+    if not weights:
+        return empty
+
+    result_key = _key(lang, f"query:{uuid.uuid4().hex}")
+    start = (page - 1) * page_size
+    pipe = r.pipeline()
+    pipe.zunionstore(result_key, weights)
+    pipe.zrevrange(result_key, start, start + page_size - 1)
+    pipe.zcard(result_key)
+    pipe.delete(result_key)
+    _, analysis_ids, total, _ = pipe.execute()
+
+    cards = r.mget([f"search:doc:{analysis_id.decode()}" for analysis_id in analysis_ids]) if analysis_ids else []
+    return {
+        "results": [json.loads(card) for card in cards if card],
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+    }
+
+
+def reindex_all(db):
+    """Полная переиндексация всех завершённых отчётов из Firestore."""
+    indexed = 0
+    for doc in db.collection('analyses').where('status', '==', 'COMPLETED').stream():
+        index_analysis(doc.id, doc.to_dict())
+        indexed += 1
+    return indexed
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['reindex']:
+        print("Usage: python search_index.py reindex")
+        sys.exit(1)
+    from tasks import get_db_client
+    print(f"Indexed {reindex_all(get_db_client())} reports")
@@ -0,0 +1,191 @@
+# backend/sitemaps.py
+"""
+Генерация sitemap: отчёты (analyses со статусом COMPLETED), статьи блога и главные страницы.
+Результат — gzip-шарды по SITEMAP_ENTRIES_PER_SHARD записей плюс sitemap index,
+сложенные в blob_store; веб отдаёт их как готовые байты.
+
+Генерация инкрементальная: для каждой коллекции в Redis хранится водяной знак
+(последний обработанный updated_at/published_at) и раскладка документов по шардам,
+поэтому при очередном запуске читаются только новые документы и пересобираются
+только затронутые шарды.
+"""
+import gzip
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape, quoteattr
+
+from flask import current_app
+
+import firestore_scan
+from blob_store import put_blob
+from constants import SITE_DOMAIN, SITEMAP_FIRESTORE_PAGE_SIZE, SITEMAP_ENTRIES_PER_SHARD
+from hreflang import hreflang_links
+from redis_store import get_redis_client
+
+SITEMAP_INDEX_BLOB = 'sitemaps/index.xml'
+SITE_URL = f"https://{SITE_DOMAIN}"
+
+# Коллекции, по которым строятся шарды: откуда читать и на какую страницу ссылаться
+SHARD_SOURCES = {
+    'reports': {
+        'collection': 'analyses',
+        'order_field': 'updated_at',
+        'endpoint': 'serve_report',
+        'id_arg': 'analysis_id',
+    },
+    'blog': {
+        'collection': 'blog_articles',
+        'order_field': 'published_at',
+        'endpoint': 'blog.article_detail',
+        'id_arg': 'slug',
+    },
+}
+
+# Страницы без идентификатора, которые есть на каждом языке
+STATIC_PAGES = [
+    ('serve_index', {}),
+    ('blog.blog_index', {}),
+]
+
+
+def get_url_adapter():
+    """URL-адаптер для построения абсолютных https-ссылок вне контекста запроса."""
+    return current_app.url_map.bind(SITE_DOMAIN, url_scheme='https')
+
+
+def format_lastmod(value):
+    if not value:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S+00:00')
+
+
+def render_urlset(pages, base_url=SITE_URL):
+    """
+    pages — итерируемое из (endpoint, view_args, lastmod).
+    Для каждой страницы выводится по <url> на язык со всеми hreflang-альтернативами и x-default.
+    """
+    xml_parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"',
+        '        xmlns:xhtml="http://www.w3.org/1999/xhtml">'
+    ]
+    for endpoint, view_args, lastmod in pages:
+        links = hreflang_links(endpoint, view_args, base_url)
+        alternate_links = [
+            f'    <xhtml:link rel="alternate" hreflang="{hreflang}" href={quoteattr(url)}/>'
+            for hreflang, url in links
+        ]
+        for hreflang, url in links:
+            if hreflang == 'x-default':
+                continue
+            xml_parts.append('  <url>')
+            xml_parts.append(f'    <loc>{escape(url)}</loc>')
+            if lastmod:
+                xml_parts.append(f'    <lastmod>{lastmod}</lastmod>')
+            xml_parts.extend(alternate_links)
+            xml_parts.append('  </url>')
+    xml_parts.append('</urlset>')
+    return "\n".join(xml_parts)
+
+
+def render_index(url_adapter, shards):
+    """shards — список (имя файла шарда, lastmod)."""
+    xml_parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    ]
+    for name, lastmod in shards:
+        shard_url = url_adapter.build('sitemap_shard', {'name': name}, force_external=True)
+        xml_parts.append('  <sitemap>')
+        xml_parts.append(f'    <loc>{escape(shard_url)}</loc>')
+        if lastmod:
+            xml_parts.append(f'    <lastmod>{lastmod}</lastmod>')
+        xml_parts.append('  </sitemap>')
+    xml_parts.append('</sitemapindex>')
+    return "\n".join(xml_parts)
+
+
+def static_pages():
+    return [(endpoint, view_args, None) for endpoint, view_args in STATIC_PAGES]
+
+
+def _shard_name(kind, number):
+    return f"{kind}-{number}.xml.gz"
+
+
+def _collect_updates(db, r, kind, source):
+    """Раскладывает новые/обновлённые документы по шардам. Возвращает номера затронутых шардов."""
+    watermark_key = f"sitemap:{kind}:watermark"
+    watermark_id_key = f"sitemap:{kind}:watermark_id"  # id документа: курсор не пропускает документы с тем же временем
+    shard_of_key = f"sitemap:{kind}:shard_of"
+    shard_count_key = f"sitemap:{kind}:shards"
+
+    raw_watermark, raw_watermark_id = r.mget(watermark_key, watermark_id_key)
+    watermark = ((datetime.fromisoformat(raw_watermark.decode()), (raw_watermark_id or b'').decode())
+                 if raw_watermark else None)
+    shard_count = int(r.get(shard_count_key) or 0)
+    last_shard_size = r.hlen(f"sitemap:{kind}:entries:{shard_count - 1}") if shard_count else 0
+
+    dirty_shards = set()
+    for doc in firestore_scan.walk_changed_documents(db, source['collection'], source['order_field'],
+                                                     [source['order_field'], 'status'],
+                                                     SITEMAP_FIRESTORE_PAGE_SIZE, watermark):
+        data = doc.to_dict()
+        changed_at = data.get(source['order_field'])
+        if not changed_at:
+            continue
+        watermark = (changed_at, doc.id)
+        if kind == 'reports' and data.get('status') != 'COMPLETED':
+            continue
+
+        shard = r.hget(shard_of_key, doc.id)
+        if shard is None:
+            if shard_count == 0 or last_shard_size >= SITEMAP_ENTRIES_PER_SHARD:
+                shard_count += 1
+                last_shard_size = 0
+            shard = shard_count - 1
+            last_shard_size += 1
+            r.hset(shard_of_key, doc.id, shard)
+        shard = int(shard)
+        r.hset(f"sitemap:{kind}:entries:{shard}", doc.id, format_lastmod(changed_at))
+        dirty_shards.add(shard)
+
+    r.set(shard_count_key, shard_count)
+    if watermark:
+        r.mset({watermark_key: watermark[0].isoformat(), watermark_id_key: watermark[1] or ''})
+    return dirty_shards
+
+
+def regenerate(db):
+    """
+    Точка входа для периодической задачи: дочитывает изменения из Firestore,
+    пересобирает затронутые шарды и индекс. Возвращает число пересобранных шардов.
+    """
+    r = get_redis_client()
+    url_adapter = get_url_adapter()
+    rebuilt = 0
+
+    for kind, source in SHARD_SOURCES.items():
+        for shard in sorted(_collect_updates(db, r, kind, source)):
+            entries = {
+                doc_id.decode(): lastmod.decode()
+                for doc_id, lastmod in r.hgetall(f"sitemap:{kind}:entries:{shard}").items()
+            }
+            pages = [(source['endpoint'], {source['id_arg']: doc_id}, lastmod)
+                     for doc_id, lastmod in sorted(entries.items())]
+            xml = render_urlset(pages)
+            name = _shard_name(kind, shard)
+            put_blob(f"sitemaps/{name}", gzip.compress(xml.encode('utf-8'), mtime=0))
+            r.hset("sitemap:lastmod", name, max(entries.values()))
+            rebuilt += 1
+
+    # Главные страницы дешёвые — пересобираем всегда
+    pages_name = _shard_name('pages', 0)
+    pages_xml = render_urlset(static_pages())
+    put_blob(f"sitemaps/{pages_name}", gzip.compress(pages_xml.encode('utf-8'), mtime=0))
+    r.hset("sitemap:lastmod", pages_name, format_lastmod(datetime.now(timezone.utc)))
+
+    shards = sorted((name.decode(), lastmod.decode()) for name, lastmod in r.hgetall("sitemap:lastmod").items())
+    put_blob(SITEMAP_INDEX_BLOB, render_index(url_adapter, shards).encode('utf-8'))
+    return rebuilt + 1
@@ -0,0 +1,85 @@
+# backend/speculative.py
+"""
+Спекулятивная проверка утверждений, пока пользователь выбирает их на экране выбора.
+
+Сразу после извлечения низкоприоритетная задача заранее выполняет поиск
+(и, в режиме 'verdicts', выносит вердикт) для первых SPECULATIVE_CLAIMS_BUDGET
+некэшированных утверждений. Результаты лежат в Redis-хеше анализа и не попадают
+в коллекцию 'claims', пока пользователь их не выбрал:
+fact_check_selected забирает готовое для выбранных утверждений, ставит флаг отмены
+(фоновая задача останавливается перед следующим утверждением) и удаляет остальное.
+
+Режим задаётся SPECULATIVE_FACT_CHECK_MODE или переменной окружения SPECULATIVE_FACT_CHECK:
+  off      — выключено (по умолчанию);
+  search   — только результаты Custom Search;
+  verdicts — поиск и вердикт.
+"""
+import json
+import os
+
+import redis
+
+from constants import SPECULATIVE_FACT_CHECK_MODE, SPECULATIVE_CLAIMS_BUDGET, SPECULATIVE_RESULT_TTL_SECONDS
+from redis_store import get_redis_client
+
+MODE = os.getenv('SPECULATIVE_FACT_CHECK', SPECULATIVE_FACT_CHECK_MODE).lower()
+MODES = ('off', 'search', 'verdicts')
+
+
+def _results_key(analysis_id):
+    return f"speculative:{analysis_id}"
+
+
+def _cancel_key(analysis_id):
+    return f"speculative:{analysis_id}:cancelled"
+
+
+def is_enabled():
+    return MODE in MODES and MODE != 'off'
+
+
+def prefetch_verdicts():
+    return MODE == 'verdicts'
+
+
+def pick_claims(claims_for_selection, budget=SPECULATIVE_CLAIMS_BUDGET):
+    """Первые budget некэшированных утверждений: модель перечисляет их по убыванию важности."""
+    return [{"hash": claim["hash"], "text": claim["text"]}
+            for claim in claims_for_selection if not claim.get("is_cached")][:budget]
+
+
+def is_cancelled(analysis_id):
+    try:
+        return bool(get_redis_client().exists(_cancel_key(analysis_id)))
+    except redis.RedisError:
+        return True  # без Redis результаты всё равно некуда положить
+
+
+def store_result(analysis_id, claim_hash, search_results, result_item=None):
+    """Сохраняет заготовку для утверждения, если пользователь ещё не отправил выбор."""
+    if is_cancelled(analysis_id):
+        return False
+    payload = json.dumps({"search_results": search_results, "result_item": result_item}, ensure_ascii=False)
+    pipe = get_redis_client().pipeline()
+    pipe.hset(_results_key(analysis_id), claim_hash, payload)
+    pipe.expire(_results_key(analysis_id), SPECULATIVE_RESULT_TTL_SECONDS)
+    pipe.execute()
+    return True
+
+
+def consume(analysis_id):
+    """
+    Вызывается в начале fact_check_selected: отменяет фоновую задачу и забирает все заготовки.
+    Возвращает dict claim_hash -> {"search_results": [...], "result_item": dict|None};
+    заготовки для невыбранных утверждений просто не используются и удаляются вместе с хешем.
+    """
+    try:
+        pipe = get_redis_client().pipeline()
+        pipe.set(_cancel_key(analysis_id), 1, ex=SPECULATIVE_RESULT_TTL_SECONDS)
+        pipe.hgetall(_results_key(analysis_id))
+        pipe.delete(_results_key(analysis_id))
+        _, raw_results, _ = pipe.execute()
+    except redis.RedisError as e:
+        print(f"[speculative] Could not read prefetched results for {analysis_id}: {e}")
+        return {}
+    return {claim_hash.decode(): json.loads(payload) for claim_hash, payload in raw_results.items()}
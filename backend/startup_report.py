@@ -0,0 +1,66 @@
+# backend/startup_report.py
+"""
+Отчёт о времени импорта при старте веб-процесса и воркера.
+
+    python startup_report.py            # оба профиля
+    python startup_report.py web --top 30
+
+Запускает `python -X importtime -c "import <module>"` в отдельном процессе, печатает
+самые тяжёлые модули по накопленному времени и проверяет, что веб-процесс не тянет
+модули, нужные только воркеру. Код возврата 1, если такие модули попали в веб-профиль.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PROFILES = {
+    # gunicorn app:app
+    'web': 'import app',
+    # celery -A app.celery_app worker: тот же app плюс то, что дочерний процесс загружает в init_worker_process
+    'worker': 'import app, tasks, google.generativeai',
+}
+
+# Модули, которые веб-процесс не должен импортировать при старте
+WORKER_ONLY_MODULES = ('google.generativeai', 'markdown2', 'bs4', 'pyarrow')
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure(statement):
+    """Возвращает список (модуль, self_us, cumulative_us) в порядке импорта."""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                               cwd=BACKEND_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else 'import failed')
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def report(profile, top):
+    modules = measure(PROFILES[profile])
+    total_us = sum(self_us for _, self_us, _ in modules)
+    print(f"=== {profile}: {len(modules)} modules, {total_us / 1000:.0f} ms total import time ===")
+    for name, _, cumulative_us in sorted(modules, key=lambda m: m[2], reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:9.1f} ms  {name}")
+
+    imported = {name for name, _, _ in modules}
+    leaked = [name for name in WORKER_ONLY_MODULES if name in imported]
+    if profile == 'web' and leaked:
+        print(f"!!! web process imports worker-only modules: {', '.join(leaked)}")
+        return False
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('profiles', nargs='*', choices=sorted(PROFILES), default=sorted(PROFILES))
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+    ok = all([report(profile, args.top) for profile in args.profiles])
+    sys.exit(0 if ok else 1)
@@ -4,10 +4,14 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // Получаем analysisId из url
     const analysisId = window.location.pathname.split('/').pop();
+    // ?task=<id> — проверка уже запущена со стартовой страницы, следим за ней здесь
+    const runningTaskId = new URLSearchParams(window.location.search).get('task');
     fetch(`/api/report/${analysisId}`)
         .then(res => res.json())
         .then(data => {
-            if (data.status === "PENDING_SELECTION") {
+            if (runningTaskId && data.status === "PENDING_SELECTION") {
+                followFactCheck(runningTaskId, analysisId);
+            } else if (data.status === "PENDING_SELECTION") {
                 renderClaimSelectionUI(data); // Показать выбор клеймов прямо в report
             } else {
                 displayResults(data); // Обычный отчёт
@@ -85,6 +89,9 @@ function renderClaimSelectionUI(analysisData) {
             } else {
                 verdictText = window.translations.already_checked || 'Already checked';
             }
+            if (cached_data && cached_data.refreshing) {
+                verdictText += `, ${window.translations.refreshing || 'refreshing'}…`;
+            }
             claimsHTML += `
                 <div class="claim-checkbox-item cached">
                     <input type="checkbox" id="claim-${index}" value="${hash}" checked disabled>
@@ -127,6 +134,54 @@ function renderClaimSelectionUI(analysisData) {
     });
 }
 
+// Все типы вердиктов и ключи их переводов
+const VERDICT_ORDER = [
+    { key: 'True', icon: '✅', translation_key: 'true_label', default_label: 'Confirmed' },
+    { key: 'Mostly True', icon: '✔️', translation_key: 'mostly_true', default_label: 'Mostly True' },
+    { key: 'Partly True', icon: '🟡', translation_key: 'partly_true_label', default_label: 'Partly True' },
+    { key: 'Mixed Veracity', icon: '🔄', translation_key: 'mixed_veracity', default_label: 'Mixed Veracity' },
+    { key: 'Misleading', icon: '⚠️', translation_key: 'misleading_label', default_label: 'Misleading' },
+    { key: 'False', icon: '❌', translation_key: 'false_label', default_label: 'Refuted' },
+    { key: 'Mostly False', icon: '✖️', translation_key: 'mostly_false', default_label: 'Mostly False' },
+    { key: 'Unverifiable', icon: '❓', translation_key: 'unverifiable_label', default_label: 'Unverifiable' },
+    { key: 'Largely Unverifiable', icon: '❔', translation_key: 'largely_unverifiable', default_label: 'Largely Unverifiable' }
+];
+
+function translateVerdict(verdict) {
+    const details = VERDICT_ORDER.find(v => v.key === verdict);
+    return details ? (window.translations[details.translation_key] || details.default_label) : verdict;
+}
+
+// Карточка одного проверенного утверждения (общая для готового отчёта и потока)
+function claimItemHTML(claim) {
+    const verdictClass = (claim.verdict || 'No-data').replace(/[\s/]+/g, '-');
+    const displayVerdict = translateVerdict(claim.verdict) || (window.translations.no_verdict || 'No verdict');
+
+    let html = `
+        <div class="claim-item verdict-${verdictClass}">
+            <p class="claim-text">${claim.claim || (window.translations.claim_text_missing || 'Claim text missing')}
+                <span class="claim-verdict">${displayVerdict}</span>
+            </p>
+            <div class="claim-explanation"><p>${claim.explanation || ''}</p></div>
+    `;
+
+    if (claim.sources && claim.sources.length > 0) {
+        html += `<div class="claim-sources"><strong>${window.translations.sources}</strong><br>`;
+        claim.sources.forEach(source => {
+            let domain = '';
+            try {
+                domain = (new URL(source)).hostname.replace(/^www\./, '');
+            } catch (e) { domain = ''; }
+
+            html += `<div class="source-item">
+                <a href="${source}" target="_blank" rel="noopener noreferrer">${domain || source}</a>
+            </div>`;
+        });
+        html += `</div>`;
+    }
+    return html + `</div>`;
+}
+
 // --- Обычный отчёт ---
 function displayResults(data) {
     const reportWrapper = document.querySelector('.report-wrapper');
@@ -145,24 +200,12 @@ function displayResults(data) {
     }
 
     const { verdict_counts, detailed_results, summary_data } = data;
+    const verdictOrder = VERDICT_ORDER;
     const totalClaims = detailed_results.length;
     let totalClaimsHTML = `<div class="checked-claims-total" style="font-size:1.05rem;color:#6c757d;margin-bottom:0.35em;">
         ${window.translations.checked_claims_total || 'Checked claims'}: <strong>${totalClaims}</strong>
     </div>`;
 
-    // Expanded verdictOrder to include all types and their translation keys
-    const verdictOrder = [
-        { key: 'True', icon: '✅', translation_key: 'true_label', default_label: 'Confirmed' },
-        { key: 'Mostly True', icon: '✔️', translation_key: 'mostly_true', default_label: 'Mostly True' },
-        { key: 'Partly True', icon: '🟡', translation_key: 'partly_true_label', default_label: 'Partly True' },
-        { key: 'Mixed Veracity', icon: '🔄', translation_key: 'mixed_veracity', default_label: 'Mixed Veracity' },
-        { key: 'Misleading', icon: '⚠️', translation_key: 'misleading_label', default_label: 'Misleading' },
-        { key: 'False', icon: '❌', translation_key: 'false_label', default_label: 'Refuted' },
-        { key: 'Mostly False', icon: '✖️', translation_key: 'mostly_false', default_label: 'Mostly False' },
-        { key: 'Unverifiable', icon: '❓', translation_key: 'unverifiable_label', default_label: 'Unverifiable' },
-        { key: 'Largely Unverifiable', icon: '❔', translation_key: 'largely_unverifiable', default_label: 'Largely Unverifiable' }
-    ];
-
     let iconsSummary = '';
     verdictOrder.forEach(v => {
         if (verdict_counts[v.key] && verdict_counts[v.key] > 0) {
@@ -172,13 +215,7 @@ function displayResults(data) {
     });
 
     // Translate the overall_verdict from summary_data
-    let translatedOverallVerdict = summary_data.overall_verdict || '';
-    if (summary_data.overall_verdict) {
-        const overallVerdictDetails = verdictOrder.find(v => v.key === summary_data.overall_verdict);
-        if (overallVerdictDetails) {
-            translatedOverallVerdict = window.translations[overallVerdictDetails.translation_key] || overallVerdictDetails.default_label;
-        }
-    }
+    const translatedOverallVerdict = translateVerdict(summary_data.overall_verdict) || '';
 
     let showText = '';
     if (data.input_type === 'text' && data.user_text) {
@@ -215,36 +252,7 @@ function displayResults(data) {
     `;
 
     detailed_results.forEach(claim => {
-        const verdictClass = (claim.verdict || 'No-data').replace(/[\s/]+/g, '-');
-        // Find the verdict details from our expanded verdictOrder
-        const verdictDetails = verdictOrder.find(v => v.key === claim.verdict);
-        const displayVerdict = verdictDetails
-            ? (window.translations[verdictDetails.translation_key] || verdictDetails.default_label)
-            : (claim.verdict || (window.translations.no_verdict || 'No verdict'));
-
-        reportHTML += `
-            <div class="claim-item verdict-${verdictClass}">
-                <p class="claim-text">${claim.claim || (window.translations.claim_text_missing || 'Claim text missing')}
-                    <span class="claim-verdict">${displayVerdict}</span>
-                </p>
-                <div class="claim-explanation"><p>${claim.explanation || ''}</p></div>
-        `;
-
-        if (claim.sources && claim.sources.length > 0) {
-            reportHTML += `<div class="claim-sources"><strong>${window.translations.sources}</strong><br>`;
-            claim.sources.forEach(source => {
-                let domain = '';
-                try {
-                    domain = (new URL(source)).hostname.replace(/^www\./, '');
-                } catch (e) { domain = ''; }
-
-                reportHTML += `<div class="source-item">
-                    <a href="${source}" target="_blank" rel="noopener noreferrer">${domain || source}</a>
-                </div>`;
-            });
-            reportHTML += `</div>`;
-        }
-        reportHTML += `</div>`;
+        reportHTML += claimItemHTML(claim);
     });
     reportHTML += `</div></div>`;
     reportContainer.innerHTML = reportHTML;
@@ -356,9 +364,8 @@ function startSelectedFactCheck(analysisId, claimsData) {
         return response.json();
     })
     .then(data => {
-        // После завершения анализа — перегрузи страницу, чтобы получить готовый отчёт
         if (data.task_id) {
-            pollStatus(data.task_id, analysisId);
+            followFactCheck(data.task_id, analysisId);
         }
     })
     .catch(error => {
@@ -366,16 +373,107 @@ function startSelectedFactCheck(analysisId, claimsData) {
     });
 }
 
+// Следим за проверкой через SSE: карточки вердиктов и саммари показываются по мере готовности.
+// Без EventSource или при постоянных ошибках соединения — обычный опрос /api/status.
+function followFactCheck(taskId, analysisId) {
+    if (!window.EventSource) {
+        pollStatus(taskId, analysisId);
+        return;
+    }
+    const reportContainer = document.getElementById('report-container');
+    reportContainer.innerHTML = `
+        <div id="report-summary">
+            <h2 id="stream-verdict"></h2>
+            <p id="stream-assessment" class="stream-pending">${window.translations.generating_report || 'Checking the selected claims...'}</p>
+        </div>
+        <div class="claim-list" id="stream-claims"></div>
+    `;
+    const claimsContainer = document.getElementById('stream-claims');
+    const cards = {};
+    let failedConnections = 0;
+    let finished = false;
+
+    const source = new EventSource(`/api/status/${taskId}/stream`);
+    const finish = () => { finished = true; source.close(); };
+
+    source.addEventListener('claim', event => {
+        const claim = JSON.parse(event.data);
+        const wrapper = document.createElement('div');
+        wrapper.innerHTML = claimItemHTML(claim).trim();
+        const card = wrapper.firstElementChild;
+        if (cards[claim.hash]) {
+            cards[claim.hash].replaceWith(card);
+        } else {
+            claimsContainer.appendChild(card);
+        }
+        cards[claim.hash] = card;
+    });
+    source.addEventListener('summary', event => {
+        const summary = JSON.parse(event.data);
+        const assessment = document.getElementById('stream-assessment');
+        if (summary.overall_verdict) {
+            document.getElementById('stream-verdict').textContent = translateVerdict(summary.overall_verdict);
+        }
+        if (summary.overall_assessment) {
+            assessment.classList.remove('stream-pending');
+            assessment.textContent = summary.overall_assessment;
+        }
+    });
+    source.addEventListener('done', () => {
+        finish();
+        loadFinalReport(analysisId);
+    });
+    source.addEventListener('failed', event => {
+        finish();
+        const message = JSON.parse(event.data).message;
+        reportContainer.innerHTML = `<p style="color:red;">${message || 'Fact-check failed.'}</p>`;
+    });
+    source.onerror = () => {
+        if (finished) return;
+        // Сервер закрывает поток через ~25 с, EventSource переподключается сам.
+        // Соединения считаются без сброса: каждое занимает поток gunicorn, поэтому после
+        // нескольких переподключений (или ответа 204 — лимит потоков занят) переходим на опрос.
+        // Заодно сверяемся со статусом задачи: поток мог истечь раньше, чем мы его дочитали.
+        failedConnections += 1;
+        if (source.readyState === EventSource.CLOSED) {
+            finish();
+            pollStatus(taskId, analysisId);
+            return;
+        }
+        fetch(`/api/status/${taskId}?resolve=0`)
+            .then(res => res.json())
+            .then(data => {
+                if (finished) return;
+                if (data.status === 'SUCCESS') {
+                    finish();
+                    loadFinalReport(analysisId);
+                } else if (data.status === 'FAILURE' || failedConnections >= 3) {
+                    finish();
+                    pollStatus(taskId, analysisId);
+                }
+            })
+            .catch(() => {});
+    };
+}
+
+function loadFinalReport(analysisId) {
+    // Убираем ?task= из адреса, чтобы перезагрузка показывала готовый отчёт
+    window.history.replaceState(null, '', window.location.pathname);
+    fetch(`/api/report/${analysisId}`)
+        .then(res => res.json())
+        .then(data => displayResults(data))
+        .catch(() => window.location.reload());
+}
+
 // Poll статус выполнения fact_check_selected и показывай репорт после завершения
 function pollStatus(taskId, analysisId) {
     const interval = setInterval(() => {
-        fetch(`/api/status/${taskId}`)
+        fetch(`/api/status/${taskId}?resolve=0`)
             .then(res => res.json())
             .then(data => {
                 if (data.status === 'SUCCESS') {
                     clearInterval(interval);
-                    // Просто перегрузи страницу для показа готового отчёта
-                    window.location.reload();
+                    loadFinalReport(analysisId);
                 }
                 if (data.status === 'FAILURE') {
                     clearInterval(interval);
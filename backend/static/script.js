@@ -59,7 +59,7 @@ document.addEventListener('DOMContentLoaded', () => {
     function pollStatus(taskId, currentStage) {
         pollingInterval = setInterval(async () => {
             try {
-                const statusResponse = await fetch(`/api/status/${taskId}`);
+                const statusResponse = await fetch(`/api/status/${taskId}?resolve=0`);
                 if (!statusResponse.ok) throw new Error('Server returned an error when checking status.');
 
                 const data = await statusResponse.json();
@@ -140,6 +140,9 @@ document.addEventListener('DOMContentLoaded', () => {
 				} else {
 					verdictText = window.translations.already_checked || 'Already checked';
 				}
+				if (cached_data && cached_data.refreshing) {
+					verdictText += `, ${window.translations.refreshing || 'refreshing'}…`;
+				}
 				claimsHTML += `
 					<div class="claim-checkbox-item cached">
 						<input type="checkbox" id="claim-${index}" value="${hash}" checked disabled>
@@ -202,7 +205,8 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(errData.error || errData.result || (window.translations.error_starting || 'Error starting analysis.'));
             }
             const data = await response.json();
-            pollStatus(data.task_id, 'fact_check_selected'); // Отслеживаем задачу №2
+            // Задачу №2 отслеживает страница отчёта: карточки и саммари приходят туда потоком
+            window.location.href = `/report/${analysisId}?task=${encodeURIComponent(data.task_id)}`;
         } catch (error) {
             statusLog.innerHTML += `<p style="color:red;">Error: ${error.message}</p>`;
         }
@@ -217,12 +221,23 @@ document.addEventListener('DOMContentLoaded', () => {
     let isLoading = false;
     let totalLoadedCount = feedContainer.children.length;
     const MAX_ITEMS = 50;
+    const FEED_ITEM_HEIGHT_ESTIMATE = 90;
+    // Лента языка страницы (/api/feed), курсор следующей страницы отдаёт сервер
+    const feedLang = document.documentElement.lang || 'en';
+
+    // Размер страницы — сколько карточек помещается в окно (с запасом); сервер его ограничивает и возвращает
+    const feedPageSize = () => {
+        const firstItem = feedContainer.querySelector('.feed-item');
+        const itemHeight = (firstItem && firstItem.offsetHeight) || FEED_ITEM_HEIGHT_ESTIMATE;
+        const missingHeight = Math.max(window.innerHeight - feedContainer.getBoundingClientRect().bottom, 0);
+        return Math.ceil((missingHeight + window.innerHeight) / itemHeight) + 2;
+    };
 
     const loadMoreAnalyses = async () => {
         if (isLoading || totalLoadedCount >= MAX_ITEMS) return;
 
-        const lastItem = feedContainer.querySelector('.feed-item:last-child');
-        if (!lastItem) {
+        const cursor = feedContainer.dataset.nextCursor;
+        if (!cursor) {
             if (loader) loader.style.display = 'none';
             return;
         }
@@ -231,16 +246,17 @@ document.addEventListener('DOMContentLoaded', () => {
         if (loader) loader.textContent = window.translations.loading_more;
         if (loader) loader.style.display = 'block';
 
-        const lastTimestamp = lastItem.dataset.timestamp;
-
         try {
-            const response = await fetch(`/api/get_recent_analyses?last_timestamp=${encodeURIComponent(lastTimestamp)}`);
+            const params = new URLSearchParams({ lang: feedLang, cursor: cursor, page_size: feedPageSize() });
+            const response = await fetch(`/api/feed?${params}`);
             if (!response.ok) throw new Error(`Server responded with status: ${response.status}`);
 
-            const newAnalyses = await response.json();
+            const page = await response.json();
+            const newAnalyses = page.items || [];
+            feedContainer.dataset.nextCursor = page.next_cursor || '';
             if (newAnalyses.length > 0) {
                 newAnalyses.forEach(analysis => {
-                    if (totalLoadedCount < MAX_ITEMS && analysis.video_title !== 'Title Not Found') {
+                    if (totalLoadedCount < MAX_ITEMS) {
                         let thumbnail = analysis.thumbnail_url;
                         if (analysis.input_type === 'text') thumbnail = "/static/text-placeholder.png";
                         if (analysis.input_type === 'url' && !thumbnail) thumbnail = "/static/url-placeholder.png";
@@ -266,7 +282,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 });
             }
 
-            if (newAnalyses.length === 0 || totalLoadedCount >= MAX_ITEMS) {
+            if (!page.next_cursor || totalLoadedCount >= MAX_ITEMS) {
                 window.removeEventListener('scroll', handleScroll);
                 if (loader) loader.textContent = window.translations.no_more_results;
             }
@@ -283,10 +299,10 @@ document.addEventListener('DOMContentLoaded', () => {
     };
 
     const fillScreen = async () => {
-        if (document.body.scrollHeight <= window.innerHeight && totalLoadedCount < MAX_ITEMS && totalLoadedCount > 0) {
+        if (document.body.scrollHeight <= window.innerHeight && totalLoadedCount < MAX_ITEMS && feedContainer.dataset.nextCursor) {
+            // Размер страницы рассчитан на всё окно, так что обычно хватает одного запроса
             await loadMoreAnalyses();
-            // Recursive call if still not filling screen
-            if (document.body.scrollHeight <= window.innerHeight) {
+            if (document.body.scrollHeight <= window.innerHeight && feedContainer.dataset.nextCursor) {
                 setTimeout(fillScreen, 500);
             }
         }
@@ -314,7 +330,7 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     window.addEventListener('scroll', handleScroll);
-    if(feedContainer.children.length > 0){
+    if (feedContainer.dataset.nextCursor) {
         setTimeout(fillScreen, 100);
     }
 	const langDropdown = document.querySelector('.lang-dropdown');
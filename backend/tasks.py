@@ -8,26 +8,44 @@ import hashlib
 import requests
 from datetime import datetime, timezone, timedelta
 
-import google.generativeai as genai
-from celery import Celery
 from google.cloud import firestore
 import random
-import markdown2
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from celery.signals import worker_process_init
+from celery.exceptions import SoftTimeLimitExceeded
 
 # Предполагается, что эти константы определены в файле constants.py
 from constants import (MAX_CLAIMS_EXTRACTED, MAX_CLAIMS_TO_CHECK, CACHE_EXPIRATION_DAYS,
-                       WORDS_PER_SECTION, SUMMARY_WORD_COUNT, BLOG_SECTIONS_PER_ARTICLE, PROMO_LINKS)
+                       WORDS_PER_SECTION, SUMMARY_WORD_COUNT, BLOG_SECTIONS_PER_ARTICLE, PROMO_LINKS,
+                       BLOG_OUTLINE_FIRST, BACKGROUND_TASK_PRIORITY, CLAIM_REFRESH_BUDGET,
+                       WORKER_EAGER_INIT, VERDICT_BATCH_SIZE, PROVIDER_TIMEOUT_SECONDS,
+                       FACT_CHECK_TIME_LIMIT_SECONDS, FACT_CHECK_SOFT_TIME_LIMIT_SECONDS,
+                       FACT_CHECK_MAX_RETRIES, FACT_CHECK_MAX_REDELIVERIES, BULK_AUTO_SELECT_CLAIMS)
 
 from celery_init import celery
+import doc_cache
+import sitemaps
+import topic_queue
+import claim_refresh
+import speculative
+import batches
+import search_index
+import models
+import resilience
+import evidence
+import report_stream
+import feeds
+import tracing
+from redis_store import get_redis_client
 
 # --- Конфигурация API и глобальные переменные ---
-GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 SEARCHAPI_KEY = os.environ.get('SEARCHAPI_KEY')
 GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY')
 SEARCH_ENGINE_ID = os.environ.get('SEARCH_ENGINE_ID')
 
 db = None
-model = None
 
 # --- Вспомогательные функции ---
 
@@ -37,14 +55,39 @@ def get_db_client():
         db = firestore.Client()
     return db
 
-def get_gemini_model():
-    global model
-    if model is None:
-        if not GEMINI_API_KEY:
-            raise ValueError("GEMINI_API_KEY is not configured.")
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-1.5-pro')
-    return model
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """
+    Каждый дочерний процесс Celery создаёт клиентов сразу после fork, а не на первой
+    задаче пользователя. Сетевой прогрев идёт в фоновом потоке: Celery убивает дочерний
+    процесс, не доложивший о готовности за worker_proc_alive_timeout (4 с по умолчанию).
+    """
+    if not WORKER_EAGER_INIT:
+        return
+    db_client = get_db_client()
+    redis_client = get_redis_client()
+    gemini_models = {name: models.get_model_by_name(name)
+                     for name in sorted({models.model_name_for(kind) for kind in models.PROMPT_KINDS})}
+    threading.Thread(target=_warm_up_connections, args=(db_client, redis_client, gemini_models),
+                     name='warmup', daemon=True).start()
+
+def _warm_up_connections(db_client, redis_client, gemini_models):
+    """Прогревает соединения дешёвыми запросами (gRPC-канал, авторизация, пул Redis)."""
+    started = time.monotonic()
+    try:
+        db_client.collection('analyses').limit(1).get(timeout=PROVIDER_TIMEOUT_SECONDS)
+    except Exception as e:
+        print(f"[warmup] Firestore warmup failed: {e}")
+    try:
+        redis_client.ping()
+    except Exception as e:
+        print(f"[warmup] Redis warmup failed: {e}")
+    for model_name, model in gemini_models.items():
+        try:
+            model.count_tokens("warmup", request_options={"timeout": PROVIDER_TIMEOUT_SECONDS})
+        except Exception as e:
+            print(f"[warmup] Gemini warmup failed for {model_name}: {e}")
+    print(f"[warmup] Worker process {os.getpid()} warmed up in {time.monotonic() - started:.2f}s")
 
 def get_claim_hash(text):
     """Возвращает стабильный sha256-хеш для уникальной идентификации утверждения."""
@@ -67,6 +110,56 @@ def get_video_id(url):
     return match.group(1) if match else None
 
 
+def build_claims_for_selection(extracted_claims, target_lang=None):
+    """
+    Собирает список утверждений для экрана выбора: для каждого помечает,
+    есть ли свежий вердикт в коллекции 'claims' (одно пакетное чтение через кэш).
+    Просроченный вердикт отдаётся с пометкой "refreshing", а перепроверка ставится в фон.
+    """
+    cached_claims = doc_cache.get_documents('claims', [claim["hash"] for claim in extracted_claims])
+    claims_for_selection = []
+    for claim in extracted_claims:
+        claim_info = {"hash": claim["hash"], "text": claim["text"], "is_cached": False}
+        cached_data = cached_claims.get(claim["hash"])
+        if cached_data:
+            last_checked = cached_data.get('last_checked_at')
+            # Проверяем, что проверка свежая (или что устаревший вердикт можно показать на время перепроверки)
+            if claim_refresh.is_fresh(last_checked):
+                claim_info["is_cached"] = True
+                claim_info["cached_data"] = {
+                    "verdict": cached_data.get("verdict", ""),
+                    "last_checked_at": str(last_checked)
+                }
+            elif claim_refresh.can_serve_stale(last_checked) and cached_data.get("claim"):
+                if claim_refresh.mark_refreshing(claim["hash"]):
+                    try:
+                        refresh_claim.apply_async(args=[claim["hash"], target_lang], priority=BACKGROUND_TASK_PRIORITY)
+                    except Exception as e:
+                        # Брокер недоступен: отдаём устаревший вердикт, метку снимаем, чтобы повторить позже
+                        print(f"[claim_refresh] Could not enqueue refresh of {claim['hash']}: {e}")
+                        claim_refresh.clear_refreshing(claim["hash"])
+                claim_info["is_cached"] = True
+                claim_info["cached_data"] = {
+                    "verdict": cached_data.get("verdict", ""),
+                    "last_checked_at": str(last_checked),
+                    "refreshing": True
+                }
+        claims_for_selection.append(claim_info)
+    return claims_for_selection
+
+
+def build_existing_analysis_result(analysis_id, report_data):
+    """Ответ первого этапа для анализа, который уже есть в БД."""
+    return {
+        "id": analysis_id,
+        "claims_for_selection": build_claims_for_selection(report_data.get("extracted_claims", []),
+                                                           report_data.get("target_lang")),
+        "video_title": report_data.get("video_title") or report_data.get("title") or "",
+        "thumbnail_url": report_data.get("thumbnail_url", ""),
+        "source_url": report_data.get("source_url", "")
+    }
+
+
 # --- Основные задачи Celery ---
 
 @celery.task(bind=True, name='tasks.extract_claims', time_limit=300)
@@ -84,6 +177,12 @@ def extract_claims(self, user_input, target_lang='en'):
         return analyze_free_text(self, user_input, target_lang, user_text=user_input, input_type="text")
 
 
+def searchapi_get(params):
+    """GET к SearchAPI с таймаутом, хеджированием и circuit breaker (см. resilience.py)."""
+    return resilience.call('searchapi', lambda: resilience.raise_for_provider_status(
+        requests.get('https://www.searchapi.io/api/v1/search', params=params, timeout=PROVIDER_TIMEOUT_SECONDS)))
+
+
 def analyze_youtube_video(self, video_url, target_lang='en'):
     """Получает и обрабатывает данные с YouTube."""
 
@@ -95,50 +194,14 @@ def analyze_youtube_video(self, video_url, target_lang='en'):
         raise ValueError(f"Could not extract video ID from URL: {video_url}")
 
     analysis_id = f"{video_id}_{target_lang}"
-    local_db = get_db_client()
-    analysis_doc_ref = local_db.collection('analyses').document(analysis_id)
-    analysis_doc = analysis_doc_ref.get()
-    if analysis_doc.exists:
+    existing_report = doc_cache.get_document('analyses', analysis_id)
+    if existing_report is not None:
         # Если анализ уже был — сразу возвращаем клеймы из БД
-        report_data = analysis_doc.to_dict()
-        claims_ref = local_db.collection('claims')
-        cache_expiry_date = datetime.now(timezone.utc) - timedelta(days=CACHE_EXPIRATION_DAYS)
-        claims_for_selection = []
-        for claim in report_data.get("extracted_claims", []):
-            claim_hash = claim["hash"]
-            claim_text = claim["text"]
-            claim_doc = claims_ref.document(claim_hash).get()
-            claim_info = {
-                "hash": claim_hash,
-                "text": claim_text
-            }
-            if claim_doc.exists:
-                cached_data = claim_doc.to_dict()
-                last_checked = cached_data.get('last_checked_at')
-                # Проверяем, что проверка свежая
-                if last_checked and last_checked.replace(tzinfo=timezone.utc) > cache_expiry_date:
-                    claim_info["is_cached"] = True
-                    claim_info["cached_data"] = {
-                        "verdict": cached_data.get("verdict", ""),
-                        "last_checked_at": str(last_checked)
-                    }
-                else:
-                    claim_info["is_cached"] = False
-            else:
-                claim_info["is_cached"] = False
-            claims_for_selection.append(claim_info)
-
-        return {
-            "id": analysis_id,
-            "claims_for_selection": claims_for_selection,
-            "video_title": report_data.get("video_title") or report_data.get("title") or "",
-            "thumbnail_url": report_data.get("thumbnail_url", ""),
-            "source_url": report_data.get("source_url", "")
-        }
+        return build_existing_analysis_result(analysis_id, existing_report)
 
     self.update_state(state='PROGRESS', meta={'status_message': 'Fetching video details...'})
     params_details = {'engine': 'youtube_video', 'video_id': video_id, 'api_key': SEARCHAPI_KEY}
-    details_response = requests.get('https://www.searchapi.io/api/v1/search', params=params_details)
+    details_response = searchapi_get(params_details)
     details_response.raise_for_status()
     details_data = details_response.json().get('video', {})
     video_title = details_data.get('title', 'Title Not Found')
@@ -152,7 +215,7 @@ def analyze_youtube_video(self, video_url, target_lang='en'):
         'video_id': video_id,
         'api_key': SEARCHAPI_KEY
     }
-    metadata = requests.get('https://www.searchapi.io/api/v1/search', params=params_list_langs).json()
+    metadata = searchapi_get(params_list_langs).json()
     available_langs = [lang.get('lang') for lang in metadata.get('available_languages', []) if lang.get('lang')]
 
     # Выбираем язык: сначала target_lang, потом английский, потом любой доступный
@@ -171,7 +234,7 @@ def analyze_youtube_video(self, video_url, target_lang='en'):
         'lang': detected_lang,
         'api_key': SEARCHAPI_KEY
     }
-    transcript_data = requests.get('https://www.searchapi.io/api/v1/search', params=params_get_transcript).json()
+    transcript_data = searchapi_get(params_get_transcript).json()
     if not transcript_data.get('transcripts'):
         raise ValueError(f"API did not return subtitles for '{detected_lang}'.")
 
@@ -213,46 +276,10 @@ def analyze_web_url(self, url, target_lang='en'):
 
         title = soup.title.string.strip() if soup.title and soup.title.string else url
         analysis_id = f"url_{get_text_hash(text)}_{target_lang}"
-        local_db = get_db_client()
-        analysis_doc_ref = local_db.collection('analyses').document(analysis_id)
-        analysis_doc = analysis_doc_ref.get()
-        if analysis_doc.exists:
+        existing_report = doc_cache.get_document('analyses', analysis_id)
+        if existing_report is not None:
             # Если анализ уже был — сразу возвращаем клеймы из БД
-            report_data = analysis_doc.to_dict()
-            claims_ref = local_db.collection('claims')
-            cache_expiry_date = datetime.now(timezone.utc) - timedelta(days=CACHE_EXPIRATION_DAYS)
-            claims_for_selection = []
-            for claim in report_data.get("extracted_claims", []):
-                claim_hash = claim["hash"]
-                claim_text = claim["text"]
-                claim_doc = claims_ref.document(claim_hash).get()
-                claim_info = {
-                    "hash": claim_hash,
-                    "text": claim_text
-                }
-                if claim_doc.exists:
-                    cached_data = claim_doc.to_dict()
-                    last_checked = cached_data.get('last_checked_at')
-                    # Проверяем, что проверка свежая
-                    if last_checked and last_checked.replace(tzinfo=timezone.utc) > cache_expiry_date:
-                        claim_info["is_cached"] = True
-                        claim_info["cached_data"] = {
-                            "verdict": cached_data.get("verdict", ""),
-                            "last_checked_at": str(last_checked)
-                        }
-                    else:
-                        claim_info["is_cached"] = False
-                else:
-                    claim_info["is_cached"] = False
-                claims_for_selection.append(claim_info)
-
-            return {
-                "id": analysis_id,
-                "claims_for_selection": claims_for_selection,
-                "video_title": report_data.get("video_title") or report_data.get("title") or "",
-                "thumbnail_url": report_data.get("thumbnail_url", ""),
-                "source_url": report_data.get("source_url", "")
-            }
+            return build_existing_analysis_result(analysis_id, existing_report)
 
         return analyze_free_text(self, text[:15000], target_lang, title=title, source_url=url,
                                  analysis_id=analysis_id, input_type="url")
@@ -266,52 +293,14 @@ def analyze_free_text(self, text, target_lang='en', title=None, thumbnail_url=No
     Ядро первого этапа: извлекает утверждения, проверяет кэш для каждого
     и сохраняет промежуточный результат.
     """
-    local_db = get_db_client()
-    gemini_model = get_gemini_model()
-
     # Если ID не был создан ранее (для случая с простым текстом)
     if not analysis_id:
         analysis_id = f"text_{get_text_hash(text)}_{target_lang}"
 
-    analysis_doc_ref = local_db.collection('analyses').document(analysis_id)
-    analysis_doc = analysis_doc_ref.get()
-    if analysis_doc.exists:
+    existing_report = doc_cache.get_document('analyses', analysis_id)
+    if existing_report is not None:
         # Если анализ уже был — возвращаем клеймы из БД
-        report_data = analysis_doc.to_dict()
-        claims_ref = local_db.collection('claims')
-        cache_expiry_date = datetime.now(timezone.utc) - timedelta(days=CACHE_EXPIRATION_DAYS)
-        claims_for_selection = []
-        for claim in report_data.get("extracted_claims", []):
-            claim_hash = claim["hash"]
-            claim_text = claim["text"]
-            claim_doc = claims_ref.document(claim_hash).get()
-            claim_info = {
-                "hash": claim_hash,
-                "text": claim_text
-            }
-            if claim_doc.exists:
-                cached_data = claim_doc.to_dict()
-                last_checked = cached_data.get('last_checked_at')
-                # Проверяем, что проверка свежая
-                if last_checked and last_checked.replace(tzinfo=timezone.utc) > cache_expiry_date:
-                    claim_info["is_cached"] = True
-                    claim_info["cached_data"] = {
-                        "verdict": cached_data.get("verdict", ""),
-                        "last_checked_at": str(last_checked)
-                    }
-                else:
-                    claim_info["is_cached"] = False
-            else:
-                claim_info["is_cached"] = False
-            claims_for_selection.append(claim_info)
-
-        return {
-            "id": analysis_id,
-            "claims_for_selection": claims_for_selection,
-            "video_title": report_data.get("video_title") or report_data.get("title") or "",
-            "thumbnail_url": report_data.get("thumbnail_url", ""),
-            "source_url": report_data.get("source_url", "")
-        }
+        return build_existing_analysis_result(analysis_id, existing_report)
     # --- AI moderation step: фильтруем запрещённый контент ---
     
     # --- AI moderation step: фильтруем запрещённый контент ---
@@ -338,7 +327,7 @@ def analyze_free_text(self, text, target_lang='en', title=None, thumbnail_url=No
     ---
     """
 
-    moderation_response = gemini_model.generate_content(moderation_prompt)
+    moderation_response = models.generate_content('moderation', moderation_prompt)
     moderation_result = moderation_response.text.strip().upper()
     if moderation_result != "OK":
         self.update_state(
@@ -376,40 +365,15 @@ def analyze_free_text(self, text, target_lang='en', title=None, thumbnail_url=No
     """
 
 
-    response_claims = gemini_model.generate_content(prompt_claims)
+    response_claims = models.generate_content('extraction', prompt_claims)
     claims_list_text = [re.sub(r'^\d+\.\s*', '', line).strip() for line in response_claims.text.strip().split('\n') if line.strip()]
     if not claims_list_text:
         raise ValueError("AI was unable to extract any claims from the provided content.")
         
     self.update_state(state='PROGRESS', meta={'status_message': f'Extracted {len(claims_list_text)} statements. Checking cache...'})
-
     # --- Новая логика кэширования на уровне утверждений ---
-    claims_ref = local_db.collection('claims')
-    cache_expiry_date = datetime.now(timezone.utc) - timedelta(days=CACHE_EXPIRATION_DAYS)
-    
-    claims_for_frontend = []
-    claims_for_db = []
-
-    for claim_text in claims_list_text:
-        claim_hash = get_claim_hash(claim_text)
-        claim_doc_ref = claims_ref.document(claim_hash)
-        claim_doc = claim_doc_ref.get()
-        
-        claim_data_for_db = {"hash": claim_hash, "text": claim_text}
-        claims_for_db.append(claim_data_for_db)
-        
-        if claim_doc.exists:
-            cached_data = claim_doc.to_dict()
-            last_checked = cached_data.get('last_checked_at')
-            if last_checked and last_checked.replace(tzinfo=timezone.utc) > cache_expiry_date:
-                claims_for_frontend.append({
-                    "hash": claim_hash,
-                    "text": claim_text,
-                    "is_cached": True,
-                    "cached_data": cached_data
-                })
-                continue
-        claims_for_frontend.append({"hash": claim_hash, "text": claim_text, "is_cached": False})
+    claims_for_db = [{"hash": get_claim_hash(claim_text), "text": claim_text} for claim_text in claims_list_text]
+    claims_for_frontend = build_claims_for_selection(claims_for_db, target_lang)
 
     analysis_data = {
         "status": "PENDING_SELECTION",
@@ -424,8 +388,14 @@ def analyze_free_text(self, text, target_lang='en', title=None, thumbnail_url=No
     if input_type == "text":
         analysis_data["user_text"] = user_text
 
-    analysis_doc_ref.set(analysis_data)
-    
+    doc_cache.set_document('analyses', analysis_id, analysis_data)
+
+    if speculative.is_enabled():
+        speculative_claims = speculative.pick_claims(claims_for_frontend)
+        if speculative_claims:
+            prefetch_claims.apply_async(args=[analysis_id, speculative_claims, target_lang],
+                                        priority=BACKGROUND_TASK_PRIORITY)
+
     return {
         "id": analysis_id,
         "claims_for_selection": claims_for_frontend,
@@ -435,77 +405,270 @@ def analyze_free_text(self, text, target_lang='en', title=None, thumbnail_url=No
     }
 
 
-@celery.task(bind=True, name='tasks.fact_check_selected', time_limit=600)
+def search_claim(claim_text):
+    """Ищет подтверждения утверждения через Google Custom Search. Возвращает список результатов."""
+    search_params = {'q': claim_text, 'key': GOOGLE_API_KEY, 'cx': SEARCH_ENGINE_ID, 'num': 4}
+    search_response = resilience.call('google_search', lambda: resilience.raise_for_provider_status(
+        requests.get("https://www.googleapis.com/customsearch/v1", params=search_params, timeout=PROVIDER_TIMEOUT_SECONDS)))
+    return search_response.json().get('items', [])
+
+
+def verify_claim(claim_text, target_lang, search_results):
+    """Выносит вердикт по утверждению на основе результатов поиска. Возвращает result_item."""
+    search_context = evidence.evidence_text(search_results)
+    sources = [res.get('link') for res in search_results]
+
+    prompt_fc = f"""
+    Based on the provided web search results, fact-check the following claim.
+    Claim: "{claim_text}"
+    Web Search Evidence (passages from the result pages): "{search_context}"
+    Your task is to return a single JSON object with these keys: "verdict", "confidence_percentage", "explanation".
+    - The "verdict" MUST be one of: "True", "False", "Misleading", "Partly True", "Unverifiable".
+    - The "explanation" MUST be a concise, neutral summary, written STRICTLY in the following language: {target_lang}.
+    - Your entire response must be ONLY a single JSON object.
+    """
+    fc_response = models.generate_content('verdict', prompt_fc)
+    try:
+        result_item = json.loads(re.search(r'\{.*\}', fc_response.text, re.DOTALL).group(0))
+        result_item['sources'] = sources # Добавляем источники
+        result_item['claim'] = claim_text # Добавляем текст утверждения
+    except (AttributeError, json.JSONDecodeError):
+        result_item = {"claim": claim_text, "verdict": "Unverifiable", "confidence_percentage": 0, "explanation": FAILED_ANALYSIS_EXPLANATION, "sources": []}
+    return result_item
+
+
+FAILED_ANALYSIS_EXPLANATION = "AI failed to provide a valid analysis."
+VALID_VERDICTS = ("True", "False", "Misleading", "Partly True", "Unverifiable")
+
+
+def validate_verdict_item(item):
+    """Проверяет один элемент ответа модели. Возвращает нормализованный dict или None."""
+    if not isinstance(item, dict) or item.get("verdict") not in VALID_VERDICTS:
+        return None
+    explanation = item.get("explanation")
+    confidence = item.get("confidence_percentage")
+    if not isinstance(explanation, str) or not explanation.strip():
+        return None
+    if isinstance(confidence, str) and confidence.strip().rstrip('%').isdigit():
+        confidence = int(confidence.strip().rstrip('%'))
+    if not isinstance(confidence, int) or not 0 <= confidence <= 100:
+        return None
+    return {"verdict": item["verdict"], "confidence_percentage": confidence, "explanation": explanation.strip()}
+
+
+def verify_claims_batch(claims, target_lang, search_results_by_hash):
+    """
+    Выносит вердикты сразу по нескольким утверждениям одним запросом к модели.
+    claims — список {"hash", "text"}. Возвращает dict claim_hash -> result_item;
+    элементы, не прошедшие валидацию, перепроверяются по одному через verify_claim.
+    """
+    if len(claims) == 1:
+        claim = claims[0]
+        return {claim["hash"]: verify_claim(claim["text"], target_lang, search_results_by_hash[claim["hash"]])}
+
+    claims_block = "\n".join(
+        json.dumps({
+            "id": claim["hash"],
+            "claim": claim["text"],
+            "evidence": evidence.evidence_text(search_results_by_hash[claim["hash"]]),
+        }, ensure_ascii=False)
+        for claim in claims
+    )
+    prompt_fc = f"""
+    Based on the provided web search results, fact-check each of the following claims independently.
+    Each line below is a JSON object with the claim "id", the "claim" text and "evidence" (passages from the web search result pages):
+    {claims_block}
+    Your task is to return a single JSON array with one object per claim, with these keys: "id", "verdict", "confidence_percentage", "explanation".
+    - "id" MUST be copied exactly from the input.
+    - The "verdict" MUST be one of: "True", "False", "Misleading", "Partly True", "Unverifiable".
+    - "confidence_percentage" MUST be an integer from 0 to 100.
+    - The "explanation" MUST be a concise, neutral summary, written STRICTLY in the following language: {target_lang}.
+    - Your entire response must be ONLY a single JSON array.
+    """
+    parsed_items = {}
+    try:
+        fc_response = models.generate_content('verdict', prompt_fc)
+        response_items = json.loads(re.search(r'\[.*\]', fc_response.text, re.DOTALL).group(0))
+        for item in response_items if isinstance(response_items, list) else []:
+            if isinstance(item, dict) and item.get("id") in search_results_by_hash:
+                parsed_items[item["id"]] = validate_verdict_item(item)
+    except (AttributeError, json.JSONDecodeError, ValueError) as e:
+        print(f"Batched verdict response could not be parsed, falling back to per-claim prompts: {e}")
+
+    results = {}
+    for claim in claims:
+        search_results = search_results_by_hash[claim["hash"]]
+        result_item = parsed_items.get(claim["hash"])
+        if result_item is None:
+            results[claim["hash"]] = verify_claim(claim["text"], target_lang, search_results)
+            continue
+        result_item['sources'] = [res.get('link') for res in search_results]
+        result_item['claim'] = claim["text"]
+        results[claim["hash"]] = result_item
+    return results
+
+
+def store_claim_verdict(claim_hash, result_item, target_lang):
+    """Сохраняет результат в коллекцию 'claims' для кэширования."""
+    claim_to_cache = result_item.copy()
+    claim_to_cache['target_lang'] = target_lang
+    claim_to_cache['last_checked_at'] = firestore.SERVER_TIMESTAMP
+    doc_cache.set_document('claims', claim_hash, claim_to_cache, merge=True)
+
+
+def start_fact_check_checkpoint(analysis_id, report_data, task_id, retries):
+    """
+    Чекпойнт проверки хранится в поле fact_check_checkpoint отчёта:
+    {"task_id", "retries", "redeliveries", "completed": [хэши проверенных утверждений], "stage"}.
+    Повторный запуск той же задачи (self.retry или повторная доставка после падения воркера)
+    продолжает её чекпойнт; новая задача наследует проверенные утверждения незавершённого прогона.
+    """
+    checkpoint = report_data.get('fact_check_checkpoint') or {}
+    if checkpoint.get('task_id') == task_id:
+        if checkpoint.get('stage') == 'completed':
+            return checkpoint
+        if checkpoint.get('retries') == retries:
+            # Тот же запуск пришёл ещё раз: воркер упал, не подтвердив сообщение
+            checkpoint['redeliveries'] = checkpoint.get('redeliveries', 0) + 1
+            if checkpoint['redeliveries'] > FACT_CHECK_MAX_REDELIVERIES:
+                raise RuntimeError(f"Fact-check of {analysis_id} was interrupted {checkpoint['redeliveries']} times, giving up.")
+        checkpoint['retries'] = retries
+    else:
+        inherited = checkpoint.get('completed', []) if checkpoint.get('stage') != 'completed' else []
+        checkpoint = {"task_id": task_id, "retries": retries, "redeliveries": 0,
+                      "completed": inherited, "stage": "verifying"}
+    doc_cache.update_document('analyses', analysis_id, {"fact_check_checkpoint": checkpoint})
+    return checkpoint
+
+
+def checkpoint_claims(analysis_id, checkpoint, claim_hashes):
+    """Отмечает утверждения проверенными: их вердикты уже сохранены в 'claims'."""
+    if not claim_hashes:
+        return
+    doc_cache.update_document('analyses', analysis_id,
+                              {"fact_check_checkpoint.completed": firestore.ArrayUnion(list(claim_hashes))})
+    checkpoint['completed'] = checkpoint['completed'] + [h for h in claim_hashes if h not in checkpoint['completed']]
+
+
+CARD_FIELDS = ("claim", "verdict", "confidence_percentage", "explanation", "sources")
+
+
+def publish_claim_card(task_id, claim_hash, result_item):
+    """Карточка вердикта для страницы отчёта — сразу, как вердикт готов (см. report_stream.py)."""
+    card = {field: result_item.get(field) for field in CARD_FIELDS}
+    card["hash"] = claim_hash
+    report_stream.publish(task_id, 'claim', card)
+
+
+def fact_check_result(analysis_id, summary_data, verdict_counts):
+    # В result backend кладём только ссылку на документ и краткую сводку:
+    # полный отчёт уже лежит в 'analyses', /api/status достаёт его по ссылке.
+    return {
+        "id": analysis_id,
+        "status": "COMPLETED",
+        "result_ref": f"analyses/{analysis_id}",
+        "overall_verdict": (summary_data or {}).get("overall_verdict"),
+        "verdict_counts": verdict_counts,
+    }
+
+
+@celery.task(bind=True, name='tasks.fact_check_selected', time_limit=FACT_CHECK_TIME_LIMIT_SECONDS,
+             soft_time_limit=FACT_CHECK_SOFT_TIME_LIMIT_SECONDS, max_retries=FACT_CHECK_MAX_RETRIES,
+             acks_late=True, reject_on_worker_lost=True)
 def fact_check_selected_claims(self, analysis_id, selected_claims_data):
     """
     Ядро второго этапа: получает выбранные пользователем утверждения,
     проверяет их и формирует итоговый отчет.
+
+    Задача подтверждается брокеру только после выполнения (acks_late), поэтому после падения
+    воркера она будет доставлена снова. Повтор идемпотентен: уже проверенные утверждения
+    берутся из чекпойнта, и если проверены все, задача сразу переходит к итоговому саммари.
     """
     if not isinstance(selected_claims_data, list) or not MAX_CLAIMS_TO_CHECK >= len(selected_claims_data) > 0:
         raise ValueError("Invalid selection of claims.")
 
-    local_db = get_db_client()
-    gemini_model = get_gemini_model()
-    
-    analysis_doc_ref = local_db.collection('analyses').document(analysis_id)
-    analysis_doc = analysis_doc_ref.get()
-    if not analysis_doc.exists:
+    report_data = doc_cache.get_document('analyses', analysis_id)
+    if report_data is None:
         raise ValueError(f"Analysis ID {analysis_id} not found.")
 
-    report_data = analysis_doc.to_dict()
+    checkpoint = start_fact_check_checkpoint(analysis_id, report_data, self.request.id, self.request.retries)
+    if checkpoint.get('stage') == 'completed' and report_data.get('status') == 'COMPLETED':
+        # Сообщение доставлено повторно уже после записи отчёта
+        return fact_check_result(analysis_id, report_data.get('summary_data'), report_data.get('verdict_counts'))
+
+    try:
+        return run_fact_check(self, analysis_id, report_data, selected_claims_data, checkpoint)
+    except (SoftTimeLimitExceeded, resilience.CircuitOpenError, resilience.ProviderError, requests.RequestException) as e:
+        # Проверенные утверждения уже в чекпойнте — повтор продолжит с того же места
+        countdown = e.retry_after if isinstance(e, resilience.CircuitOpenError) else 5
+        print(f"Fact-check of {analysis_id} interrupted ({type(e).__name__}: {e}), "
+              f"{len(checkpoint['completed'])} claims checkpointed, retrying in {countdown}s")
+        if self.request.retries >= self.max_retries:
+            report_stream.publish(self.request.id, 'failed', {"message": str(e)})
+        raise self.retry(exc=e, countdown=countdown)
+    except Exception as e:
+        report_stream.publish(self.request.id, 'failed', {"message": str(e)})
+        raise
+
+
+def run_fact_check(self, analysis_id, report_data, selected_claims_data, checkpoint):
+    task_id = self.request.id
     target_lang = report_data.get('target_lang', 'en')
-    claims_ref = local_db.collection('claims')
+    completed = set(checkpoint['completed'])
+    remaining = [claim_data for claim_data in selected_claims_data if claim_data.get('hash') not in completed]
 
-    self.update_state(state='PROGRESS', meta={'status_message': f'Fact-checking {len(selected_claims_data)} statements...'})
+    if len(remaining) < len(selected_claims_data):
+        self.update_state(state='PROGRESS', meta={'status_message': f'Resuming: {len(selected_claims_data) - len(remaining)} of {len(selected_claims_data)} statements already checked...'})
+    else:
+        self.update_state(state='PROGRESS', meta={'status_message': f'Fact-checking {len(selected_claims_data)} statements...'})
+        claim_refresh.record_claim_requests([claim_data.get('hash') for claim_data in selected_claims_data])
+
+    # Заготовки спекулятивной проверки; для невыбранных утверждений они отбрасываются
+    prefetched = speculative.consume(analysis_id) if speculative.is_enabled() and remaining else {}
 
     # --- 1. Проверяем только выбранные НОВЫЕ утверждения ---
-    for claim_data in selected_claims_data:
+    claims_to_verify = []
+    search_results_by_hash = {}
+    prefetched_hashes = []
+    for claim_data in remaining:
         claim_hash = claim_data.get('hash')
         claim_text = claim_data.get('text')
         if not claim_hash or not claim_text: continue
 
-        search_params = {'q': claim_text, 'key': GOOGLE_API_KEY, 'cx': SEARCH_ENGINE_ID, 'num': 4}
-        search_response = requests.get("https://www.googleapis.com/customsearch/v1", params=search_params)
-        search_results = search_response.json().get('items', [])
-        
-        search_context = " ".join([res.get('snippet', '') for res in search_results])
-        sources = [res.get('link') for res in search_results]
-
-        prompt_fc = f"""
-        Based on the provided web search results, fact-check the following claim.
-        Claim: "{claim_text}"
-        Web Search Results Snippets: "{search_context}"
-        Your task is to return a single JSON object with these keys: "verdict", "confidence_percentage", "explanation".
-        - The "verdict" MUST be one of: "True", "False", "Misleading", "Partly True", "Unverifiable".
-        - The "explanation" MUST be a concise, neutral summary, written STRICTLY in the following language: {target_lang}.
-        - Your entire response must be ONLY a single JSON object.
-        """
-        fc_response = gemini_model.generate_content(prompt_fc)
-        try:
-            result_item = json.loads(re.search(r'\{.*\}', fc_response.text, re.DOTALL).group(0))
-            result_item['sources'] = sources # Добавляем источники
-            result_item['claim'] = claim_text # Добавляем текст утверждения
-        except (AttributeError, json.JSONDecodeError):
-            result_item = {"claim": claim_text, "verdict": "Unverifiable", "confidence_percentage": 0, "explanation": "AI failed to provide a valid analysis.", "sources": []}
-        
-        # Сохраняем результат в коллекцию 'claims' для кэширования
-        claim_to_cache = result_item.copy()
-        claim_to_cache['last_checked_at'] = firestore.SERVER_TIMESTAMP
-        claims_ref.document(claim_hash).set(claim_to_cache, merge=True)
+        prepared = prefetched.get(claim_hash) or {}
+        if prepared.get('result_item'):
+            store_claim_verdict(claim_hash, prepared['result_item'], target_lang)
+            publish_claim_card(task_id, claim_hash, prepared['result_item'])
+            prefetched_hashes.append(claim_hash)
+            continue
+        search_results = prepared.get('search_results')
+        search_results_by_hash[claim_hash] = search_claim(claim_text) if search_results is None else search_results
+        claims_to_verify.append({"hash": claim_hash, "text": claim_text})
+    checkpoint_claims(analysis_id, checkpoint, prefetched_hashes)
+    # Фрагменты страниц из выдачи для всех утверждений — одним параллельным прогоном
+    evidence.attach_passages(claims_to_verify, search_results_by_hash, target_lang)
+
+    # Вердикты пачками по VERDICT_BATCH_SIZE утверждений в одном запросе к модели;
+    # после каждой пачки — чекпойнт, чтобы повтор не платил за них ещё раз
+    batch_size = max(VERDICT_BATCH_SIZE, 1)
+    for start in range(0, len(claims_to_verify), batch_size):
+        batch = claims_to_verify[start:start + batch_size]
+        for claim_hash, result_item in verify_claims_batch(batch, target_lang, search_results_by_hash).items():
+            store_claim_verdict(claim_hash, result_item, target_lang)
+            publish_claim_card(task_id, claim_hash, result_item)
+        checkpoint_claims(analysis_id, checkpoint, [claim["hash"] for claim in batch])
 
     self.update_state(state='PROGRESS', meta={'status_message': 'Generating final report...'})
 
     # --- 2. Собираем ВСЕ утверждения (новые и кэшированные) для финального отчета ---
     all_claim_hashes = [item['hash'] for item in report_data.get('extracted_claims', [])]
-    
-    # Firestore 'in' query limited to 30, so we may need to batch for larger lists
-    all_results = []
-    for i in range(0, len(all_claim_hashes), 30):
-        batch_hashes = all_claim_hashes[i:i+30]
-        for claim_hash in batch_hashes:
-            doc = claims_ref.document(claim_hash).get()
-            if doc.exists:
-                all_results.append(doc.to_dict())
+    cached_claims = doc_cache.get_documents('claims', all_claim_hashes)
+    all_results = [cached_claims[claim_hash] for claim_hash in all_claim_hashes if claim_hash in cached_claims]
+    # Остальные карточки (проверенные раньше или до повтора задачи); браузер различает их по hash
+    published = {claim["hash"] for claim in claims_to_verify}.union(prefetched_hashes)
+    for claim_hash in all_claim_hashes:
+        if claim_hash in cached_claims and claim_hash not in published:
+            publish_claim_card(task_id, claim_hash, cached_claims[claim_hash])
     
     # --- 3. Генерируем финальное саммари и статистику (код без изменений) ---
     verdict_counts = {"True": 0, "False": 0, "Misleading": 0, "Partly True": 0, "Unverifiable": 0}
@@ -528,9 +691,14 @@ It must have these keys: "overall_verdict", "overall_assessment", and "key_point
 - "key_points" must be a JSON array of simple STRINGS, and each string must be written STRICTLY in the following language: {target_lang}.
 Data: {json.dumps(summary_context, ensure_ascii=False)}
 """
-    final_report_response = gemini_model.generate_content(summary_prompt)
+    # Саммари генерируется потоком: частичный overall_assessment сразу уходит на страницу отчёта
+    summary_stream = report_stream.SummaryStream()
+    for text in models.stream_content('summary', summary_prompt):
+        partial = summary_stream.feed(text)
+        if partial:
+            report_stream.publish(task_id, 'summary', partial)
     try:
-        summary_data = json.loads(re.search(r'\{.*\}', final_report_response.text, re.DOTALL).group(0))
+        summary_data = json.loads(re.search(r'\{.*\}', summary_stream.buffer, re.DOTALL).group(0))
     except (AttributeError, json.JSONDecodeError):
         summary_data = {"overall_verdict": "Analysis Incomplete", "overall_assessment": "Could not generate a final summary.", "key_points": []}
 
@@ -542,82 +710,203 @@ Data: {json.dumps(summary_context, ensure_ascii=False)}
         "average_confidence": average_confidence,
         "confirmed_credibility": confirmed_credibility,
         "detailed_results": all_results,
+        "fact_check_checkpoint": {**checkpoint, "stage": "completed"},
         "updated_at": firestore.SERVER_TIMESTAMP
     }
     
-    analysis_doc_ref.update(final_data_to_update)
-
-    data_to_return = report_data 
+    data_to_return = report_data
     data_to_return.update(final_data_to_update)
-    data_to_return["id"] = analysis_doc_ref.id
-    if 'created_at' in data_to_return and hasattr(data_to_return['created_at'], 'isoformat'):
-        data_to_return['created_at'] = data_to_return['created_at'].isoformat()
-    # Ensure updated_at is a string for JSON serialization
-    data_to_return["updated_at"] = datetime.now(timezone.utc).isoformat()
-    
-    return data_to_return
+    doc_cache.update_document('analyses', analysis_id, final_data_to_update, full_document=data_to_return)
+    # В индексы — снимок с настоящим временем вместо SERVER_TIMESTAMP
+    indexed_data = doc_cache.resolve_sentinels(data_to_return)
+    try:
+        search_index.index_analysis(analysis_id, indexed_data)
+    except Exception as e:
+        print(f"Could not add {analysis_id} to the search index: {e}")
+    try:
+        feeds.add_analysis(analysis_id, indexed_data)
+    except Exception as e:
+        print(f"Could not add {analysis_id} to the feeds: {e}")
 
+    report_stream.publish(task_id, 'done', {"id": analysis_id})
+    return fact_check_result(analysis_id, summary_data, verdict_counts)
 
 
 
 
+@celery.task(name='tasks.prefetch_claims', time_limit=300)
+def prefetch_claims(analysis_id, claims, target_lang='en'):
+    """
+    Спекулятивно готовит поиск (и вердикты) для утверждений, пока пользователь их выбирает.
+    Останавливается, как только пользователь отправил выбор.
+    """
+    prepared = 0
+    for claim in claims:
+        if speculative.is_cancelled(analysis_id):
+            break
+        search_results = search_claim(claim['text'])
+        result_item = None
+        if speculative.prefetch_verdicts() and not speculative.is_cancelled(analysis_id):
+            evidence.attach_passages([claim], {claim['hash']: search_results}, target_lang)
+            result_item = verify_claim(claim['text'], target_lang, search_results)
+        if not speculative.store_result(analysis_id, claim['hash'], search_results, result_item):
+            break
+        prepared += 1
+    return prepared
+
+
+# --- Колбэки пакетного анализа (batches.py) ---
+
+@celery.task(name='tasks.batch_item_extracted')
+def batch_item_extracted(result, batch_id, index):
+    """Извлечение для элемента пакета завершилось: при автопроверке запускаем второй этап."""
+    analysis_id = (result or {}).get('id')
+    if not analysis_id:
+        batches.update_item(batch_id, index, stage=batches.FAILED, error=(result or {}).get('error', 'No claims extracted.'))
+        batches.dispatch_next(batch_id)
+        return
+    meta = batches.get_meta(batch_id) or {}
+    # Тот же выбор, что у спекулятивной проверки: первые некэшированные утверждения
+    selected_claims = speculative.pick_claims(result.get('claims_for_selection', []),
+                                              min(BULK_AUTO_SELECT_CLAIMS, MAX_CLAIMS_TO_CHECK))
+    if meta.get('auto_fact_check') and selected_claims:
+        batches.update_item(batch_id, index, analysis_id=analysis_id)
+        batches.start_fact_check(batch_id, index, analysis_id, selected_claims)
+        return
+    report_data = doc_cache.get_document('analyses', analysis_id) or {}
+    stage = batches.COMPLETED if report_data.get('status') == 'COMPLETED' else batches.PENDING_SELECTION
+    batches.update_item(batch_id, index, analysis_id=analysis_id, stage=stage)
+    batches.dispatch_next(batch_id)
+
+@celery.task(name='tasks.batch_item_checked')
+def batch_item_checked(result, batch_id, index):
+    batches.update_item(batch_id, index, stage=batches.COMPLETED)
+    batches.dispatch_next(batch_id)
+
+@celery.task(name='tasks.batch_item_failed')
+def batch_item_failed(request, exc, traceback, batch_id, index):
+    batches.update_item(batch_id, index, stage=batches.FAILED, error=str(exc))
+    batches.dispatch_next(batch_id)
+
+
+# --- Фоновая перепроверка устаревающих вердиктов (stale-while-revalidate) ---
+
+def refresh_claim_verdict(claim_hash, claim_doc, target_lang=None):
+    """
+    Перепроверяет одно утверждение вне интерактивного пути и снимает метку "refreshing".
+    Невалидный ответ модели не заменяет прежний вердикт. Возвращает True, если вердикт обновлён.
+    """
+    try:
+        claim_text = claim_doc['claim']
+        target_lang = claim_doc.get('target_lang') or target_lang or 'en'
+        search_results = search_claim(claim_text)
+        evidence.attach_passages([{"hash": claim_hash, "text": claim_text}], {claim_hash: search_results}, target_lang)
+        result_item = verify_claim(claim_text, target_lang, search_results)
+        validated = validate_verdict_item(result_item)
+        if validated is None or validated["explanation"] == FAILED_ANALYSIS_EXPLANATION:
+            print(f"[claim_refresh] Invalid verdict for {claim_hash}, keeping the previous one")
+            return False
+        store_claim_verdict(claim_hash, {**result_item, **validated}, target_lang)
+        return True
+    finally:
+        claim_refresh.clear_refreshing(claim_hash)
+
+@celery.task(name='tasks.refresh_claim', time_limit=120)
+def refresh_claim(claim_hash, target_lang=None):
+    """Фоновая перепроверка утверждения, чей просроченный вердикт только что был показан пользователю."""
+    claim_doc = doc_cache.get_document('claims', claim_hash)
+    if not claim_doc or not claim_doc.get('claim'):
+        claim_refresh.clear_refreshing(claim_hash)
+        return None
+    refresh_claim_verdict(claim_hash, claim_doc, target_lang)
+    return claim_hash
+
+@celery.task(name='tasks.refresh_expiring_claims', time_limit=1800)
+def refresh_expiring_claims(budget=CLAIM_REFRESH_BUDGET):
+    """
+    Периодическая задача: заранее перепроверяет популярные утверждения, срок кэша которых
+    скоро истечёт, не больше budget штук за запуск.
+    """
+    claim_refresh.decay_popularity()
+    refreshed = 0
+    for claim_hash, claim_doc in claim_refresh.select_refresh_candidates(budget):
+        if not claim_refresh.mark_refreshing(claim_hash):
+            continue  # уже перепроверяется
+        try:
+            if refresh_claim_verdict(claim_hash, claim_doc):
+                refreshed += 1
+        except Exception as e:
+            print(f"Could not refresh claim {claim_hash}: {e}")
+    print(f"🔄 Перепроверено утверждений: {refreshed}")
+    return refreshed
+
+
 # ===================================================================
 # ===               КОД ДЛЯ АВТОМАТИЧЕСКОГО БЛОГА                 ===
 # ===================================================================
 
 def generate_with_gemini(prompt_text):
     """
-    Обертка для вызова API Gemini с использованием существующей модели.
+    Обертка для вызова API Gemini для текстов блога (модель вида 'blog').
     """
-    gemini_model = get_gemini_model()
     try:
-        response = gemini_model.generate_content(prompt_text)
+        response = models.generate_content('blog', prompt_text)
         return response.text.strip()
     except Exception as e:
         print(f"Error calling Gemini API: {e}")
         # В случае ошибки возвращаем None, чтобы вызывающая функция могла это обработать
         return None
 
-@celery.task(name="tasks.generate_and_publish_article")
-def generate_and_publish_article():
+MARKDOWN_EXTRAS = ["fenced-code-blocks", "tables", "nofollow"]
+
+def generate_article_outline(topic):
     """
-    Периодическая задача Celery для генерации и публикации новой статьи в блоге.
+    Outline-first: один вызов Gemini возвращает заголовок статьи и заголовки всех секций.
+    Возвращает (title, headings) или None, если ответ не удалось разобрать.
     """
-    print("🚀 Запуск задачи по генерации статьи для блога...")
-    db = get_db_client()
-
-    # --- Шаг 1: Выбор темы из файла ---
+    outline_prompt = f"""
+    You are an expert copywriter planning a blog post on the topic: '{topic}'.
+    Return a single JSON object with these keys: "title", "sections".
+    - "title" must be an engaging, SEO-friendly H1 title.
+    - "sections" must be a JSON array of exactly {BLOG_SECTIONS_PER_ARTICLE} distinct H2 section headings (plain strings) that form a logical progression.
+    - Your entire response must be ONLY a single JSON object.
+    """
+    outline_text = generate_with_gemini(outline_prompt)
+    if not outline_text:
+        return None
     try:
-        with open('topics.txt', 'r+') as f:
-            topics = [line for line in f if line.strip()]
-            if not topics:
-                print("Темы для статей закончились.")
-                return "Темы для статей закончились."
-            selected_topic = random.choice(topics).strip()
-            # Удаляем использованную тему из файла
-            f.seek(0)
-            f.writelines(line for line in topics if line.strip() != selected_topic)
-            f.truncate()
-    except FileNotFoundError:
-        return "Файл topics.txt не найден."
-
-    print(f"Выбрана тема: '{selected_topic}'")
-
-    # --- Шаг 2: Генерация контента ---
-    # Заголовок
-    title_prompt = f"Generate an engaging, SEO-friendly H1 title for a blog post on the topic: '{selected_topic}'. Return only the title text."
-    generated_title = generate_with_gemini(title_prompt)
-    if not generated_title:
-        return f"Не удалось сгенерировать заголовок для темы: {selected_topic}"
+        outline = json.loads(re.search(r'\{.*\}', outline_text, re.DOTALL).group(0))
+    except (AttributeError, json.JSONDecodeError):
+        return None
+    title = str(outline.get("title") or "").strip()
+    headings = [str(heading).strip().lstrip('#').strip() for heading in outline.get("sections") or [] if str(heading).strip()]
+    if not title or not headings:
+        return None
+    return title, headings[:BLOG_SECTIONS_PER_ARTICLE]
+
+def generate_section_from_outline(title, headings, index):
+    """Пишет одну секцию по готовому плану; секции независимы и могут генерироваться параллельно."""
+    outline_list = "\n".join(f"{i + 1}. {heading}" for i, heading in enumerate(headings))
+    section_prompt = f"""
+    You are an expert copywriter writing a blog post titled '{title}'.
+    The full outline of the post is:
+    {outline_list}
+    Your task is to write ONLY section {index + 1}: '{headings[index]}'. Do not repeat the content of the other sections.
+    The section must start with the H2 heading "## {headings[index]}" and be approximately {WORDS_PER_SECTION} words long.
+    Use rich Markdown formatting (paragraphs, bold, lists).
+    Naturally incorporate this link: {random.choice(PROMO_LINKS)}
+    Output ONLY the Markdown for this section.
+    """
+    return generate_with_gemini(section_prompt)
 
-    # Секции статьи
-    html_parts = [f"<h1>{generated_title}</h1>"]
+def generate_sections_sequentially(title):
+    """Прежний режим: секции по очереди, каждой передаются заголовки предыдущих."""
     markdown_parts, previous_headings = [], []
     for i in range(BLOG_SECTIONS_PER_ARTICLE):
-        context_prompt = f"You are an expert copywriter writing a blog post titled '{generated_title}'.\n"
+        context_prompt = f"You are an expert copywriter writing a blog post titled '{title}'.\n"
         if previous_headings:
             context_prompt += "Headings of previous sections (for context): " + ", ".join(previous_headings)
-        
+
         section_prompt = f"""
         {context_prompt}
         Your task is to write the *next section* of this blog post.
@@ -629,16 +918,86 @@ def generate_and_publish_article():
         markdown_section = generate_with_gemini(section_prompt)
         if markdown_section:
             markdown_parts.append(markdown_section)
-            html_parts.append(markdown2.markdown(markdown_section, extras=["fenced-code-blocks", "tables", "nofollow"]))
             try:
                 current_heading = next(line for line in markdown_section.split('\n') if line.startswith('## ')).replace('## ', '').strip()
                 previous_headings.append(f"'{current_heading}'")
             except StopIteration:
                 pass # Если не удалось извлечь заголовок, просто продолжаем
+    return markdown_parts
+
+def build_summary_prompt(title):
+    return f"Based on the article titled '{title}', write a compelling summary of no more than {SUMMARY_WORD_COUNT} words. Return ONLY the summary text."
+
+@celery.task(name="tasks.generate_and_publish_article")
+def generate_and_publish_article(count=1):
+    """
+    Периодическая задача Celery для генерации и публикации новых статей в блоге.
+    count > 1 — пакетный запуск (например, при бэкфилле): несколько тем подряд из очереди.
+    """
+    print("🚀 Запуск задачи по генерации статьи для блога...")
 
-    # --- Шаг 3: Генерация саммари ---
-    summary_prompt = f"Based on the article titled '{generated_title}', write a compelling summary of no more than {SUMMARY_WORD_COUNT} words. Return ONLY the summary text."
-    generated_summary = generate_with_gemini(summary_prompt) or "A detailed look at " + selected_topic
+    # --- Шаг 1: Выбор темы из очереди ---
+    topic_queue.requeue_stale_claims()
+    topic_queue.seed_from_file()
+
+    messages = []
+    for _ in range(count):
+        selected_topic = topic_queue.claim_topic()
+        if selected_topic is None:
+            print("Темы для статей закончились.")
+            messages.append("Темы для статей закончились.")
+            break
+        print(f"Выбрана тема: '{selected_topic}'")
+        try:
+            published, message = publish_article_for_topic(selected_topic)
+        except Exception:
+            topic_queue.requeue_topic(selected_topic)
+            raise
+        if published:
+            topic_queue.ack_topic(selected_topic)
+        else:
+            topic_queue.requeue_topic(selected_topic)
+        messages.append(message)
+    return "\n".join(messages)
+
+@celery.task(name="tasks.import_blog_topics")
+def import_blog_topics(topics):
+    """Массовый импорт списка тем в очередь блога. Возвращает число новых тем."""
+    added = topic_queue.import_topics(topics)
+    print(f"В очередь блога добавлено тем: {added}")
+    return added
+
+def publish_article_for_topic(selected_topic):
+    """Генерирует и сохраняет одну статью. Возвращает (опубликована ли, сообщение)."""
+    db = get_db_client()
+
+    # --- Шаг 2: Генерация контента ---
+    outline = generate_article_outline(selected_topic) if BLOG_OUTLINE_FIRST else None
+    if outline:
+        # План готов: все секции и саммари генерируются одновременно
+        generated_title, headings = outline
+        with ThreadPoolExecutor(max_workers=len(headings) + 1) as pool:
+            section_futures = [pool.submit(tracing.bind(generate_section_from_outline), generated_title, headings, i)
+                               for i in range(len(headings))]
+            summary_future = pool.submit(tracing.bind(generate_with_gemini), build_summary_prompt(generated_title))
+            markdown_parts = [future.result() for future in section_futures]
+            generated_summary = summary_future.result()
+        markdown_parts = [section for section in markdown_parts if section]
+    else:
+        # Заголовок
+        title_prompt = f"Generate an engaging, SEO-friendly H1 title for a blog post on the topic: '{selected_topic}'. Return only the title text."
+        generated_title = generate_with_gemini(title_prompt)
+        if not generated_title:
+            return False, f"Не удалось сгенерировать заголовок для темы: {selected_topic}"
+        # Секции статьи
+        markdown_parts = generate_sections_sequentially(generated_title)
+        # --- Шаг 3: Генерация саммари ---
+        generated_summary = generate_with_gemini(build_summary_prompt(generated_title))
+
+    generated_summary = generated_summary or "A detailed look at " + selected_topic
+    html_parts = [f"<h1>{generated_title}</h1>"]
+    import markdown2
+    html_parts.extend(markdown2.markdown(section, extras=MARKDOWN_EXTRAS) for section in markdown_parts)
 
     # --- Шаг 4: Генерация URL изображения (плейсхолдер) ---
     slug = generated_title.lower().replace(' ', '-').replace('?', '').replace(':', '').replace("'", "")
@@ -656,4 +1015,55 @@ def generate_and_publish_article():
     })
 
     print(f"✅ Статья '{generated_title}' успешно создана и сохранена в Firestore.")
-    return f"Статья '{generated_title}' успешно создана."
\ No newline at end of file
+
+    # --- Шаг 6: Статические страницы статьи и индекса блога для всех языков ---
+    try:
+        from flask import current_app
+        from blog import prerender
+        # Перечитываем документ: published_at проставлен сервером Firestore
+        stored = prerender.prerender(current_app._get_current_object(), db, doc_ref.get().to_dict())
+        print(f"📄 Пререндер блога: сохранено страниц: {stored}")
+    except Exception as e:
+        # Страницы отрендерятся при первом запросе — публикацию не откатываем
+        print(f"⚠️ Не удалось пререндерить страницы статьи '{slug}': {e}")
+    return True, f"Статья '{generated_title}' успешно создана."
+
+
+@celery.task(name="tasks.regenerate_sitemaps")
+def regenerate_sitemaps():
+    """
+    Периодическая задача: инкрементально пересобирает sitemap-шарды и индекс (см. sitemaps.py).
+    """
+    rebuilt = sitemaps.regenerate(get_db_client())
+    print(f"🗺️ Sitemap обновлён, пересобрано шардов: {rebuilt}")
+    return rebuilt
+
+
+@celery.task(name="tasks.rebuild_feeds")
+def rebuild_feeds():
+    """
+    Заполняет ленты из Firestore, если их ещё нет (первый запуск или Redis потерял ключи).
+    Ставится beat'ом и веб-процессом при чтении ленты из Firestore; см. feeds.py.
+    """
+    added = feeds.rebuild_if_missing(get_db_client())
+    if added is not None:
+        print(f"📰 Ленты отчётов построены: {added} отчётов")
+    return added
+
+
+@celery.task(name="tasks.export_analytics")
+def export_analytics():
+    """
+    Периодическая задача: дописывает новые и изменённые утверждения и отчёты
+    в Parquet-файлы для аналитики (см. analytics.py).
+    """
+    # Водяные знаки лежат рядом с файлами: в эфемерном каталоге контейнера они терялись бы
+    # при каждом деплое, и всё выгружалось бы заново
+    if not os.environ.get('ANALYTICS_EXPORT_DIR'):
+        print("[analytics] ANALYTICS_EXPORT_DIR is not set, export skipped")
+        return None
+    # analytics тянет pyarrow — импортируем лениво, веб-процессу он не нужен
+    import analytics
+    exported = analytics.export(get_db_client())
+    print(f"📊 Выгрузка для аналитики: {exported}")
+    return exported
@@ -0,0 +1,136 @@
+# backend/topic_queue.py
+"""
+Очередь тем для автоблога в Redis (вместо перезаписи topics.txt).
+
+  pending     — темы, ожидающие генерации (FIFO; при импорте порядок перемешивается);
+  processing  — темы, взятые в работу; переносятся из pending вместе с отметкой claimed_at
+                одним Lua-скриптом;
+  claimed_at  — когда тема была взята: зависшие (упавший воркер) возвращаются в очередь,
+                как и темы в processing без отметки (взятые до перехода на скрипт).
+
+После успешной публикации тема подтверждается (ack), при ошибке — возвращается
+в начало очереди, пока не исчерпан лимит попыток.
+"""
+import os
+import random
+import sys
+import time
+
+from constants import TOPIC_CLAIM_TIMEOUT_SECONDS, TOPIC_MAX_ATTEMPTS
+from redis_store import get_redis_client
+
+PENDING_KEY = "blog:topics:pending"
+PROCESSING_KEY = "blog:topics:processing"
+CLAIMED_AT_KEY = "blog:topics:claimed_at"
+ATTEMPTS_KEY = "blog:topics:attempts"
+KNOWN_KEY = "blog:topics:known"
+SEEDED_KEY = "blog:topics:seeded"
+
+# Перенос темы в processing, отметка времени и счётчик попыток — одной командой:
+# воркер, упавший между ними, не должен оставить тему в processing без claimed_at
+CLAIM_SCRIPT = """
+local topic = redis.call('RPOPLPUSH', KEYS[1], KEYS[2])
+if topic then
+    redis.call('HSET', KEYS[3], topic, ARGV[1])
+    redis.call('HINCRBY', KEYS[4], topic, 1)
+end
+return topic
+"""
+
+TOPICS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'topics.txt')
+
+
+def import_topics(topics, shuffle=True):
+    """Добавляет темы в очередь, пропуская уже известные. Возвращает число добавленных."""
+    r = get_redis_client()
+    topics = list(dict.fromkeys(topic.strip() for topic in topics if topic and topic.strip()))
+    if not topics:
+        return 0
+    pipe = r.pipeline()
+    for topic in topics:
+        pipe.sadd(KNOWN_KEY, topic)
+    new_topics = [topic for topic, added in zip(topics, pipe.execute()) if added]
+    if shuffle:
+        random.shuffle(new_topics)
+    if new_topics:
+        r.lpush(PENDING_KEY, *new_topics)
+    return len(new_topics)
+
+
+def seed_from_file(path=TOPICS_FILE):
+    """Однократно импортирует темы из topics.txt (файл из образа больше не перезаписывается)."""
+    r = get_redis_client()
+    if not r.set(SEEDED_KEY, 1, nx=True):
+        return 0
+    try:
+        with open(path, encoding='utf-8') as f:
+            return import_topics(f)
+    except FileNotFoundError:
+        print(f"[topic_queue] {path} not found, nothing to seed.")
+        return 0
+
+
+def claim_topic():
+    """Атомарно берёт следующую тему в работу. Возвращает строку или None, если очередь пуста."""
+    topic = get_redis_client().eval(CLAIM_SCRIPT, 4, PENDING_KEY, PROCESSING_KEY, CLAIMED_AT_KEY, ATTEMPTS_KEY,
+                                    int(time.time()))
+    return topic.decode('utf-8') if topic else None
+
+
+def ack_topic(topic):
+    """Тема обработана (статья опубликована или тема отброшена) — убираем её из очереди насовсем."""
+    pipe = get_redis_client().pipeline()
+    pipe.lrem(PROCESSING_KEY, 1, topic)
+    pipe.hdel(CLAIMED_AT_KEY, topic)
+    pipe.hdel(ATTEMPTS_KEY, topic)
+    pipe.execute()
+
+
+def requeue_topic(topic):
+    """
+    Возвращает тему в начало очереди после неудачной генерации.
+    После TOPIC_MAX_ATTEMPTS попыток тема отбрасывается. Возвращает True, если тема снова в очереди.
+    """
+    r = get_redis_client()
+    attempts = int(r.hget(ATTEMPTS_KEY, topic) or 0)
+    if attempts >= TOPIC_MAX_ATTEMPTS:
+        print(f"[topic_queue] Dropping topic after {attempts} failed attempts: '{topic}'")
+        ack_topic(topic)
+        return False
+    pipe = r.pipeline()
+    pipe.lrem(PROCESSING_KEY, 1, topic)
+    pipe.hdel(CLAIMED_AT_KEY, topic)
+    pipe.rpush(PENDING_KEY, topic)
+    pipe.execute()
+    return True
+
+
+def requeue_stale_claims(max_age=TOPIC_CLAIM_TIMEOUT_SECONDS):
+    """
+    Возвращает в очередь темы, взятые воркером, который так и не подтвердил их. Возвращает их число.
+    Тема в processing без отметки claimed_at тоже считается зависшей.
+    """
+    r = get_redis_client()
+    deadline = time.time() - max_age
+    claimed_at = {topic.decode('utf-8'): int(value) for topic, value in r.hgetall(CLAIMED_AT_KEY).items()}
+    processing = dict.fromkeys(topic.decode('utf-8') for topic in r.lrange(PROCESSING_KEY, 0, -1))
+    stale = [topic for topic in processing if claimed_at.get(topic, 0) < deadline]
+    leftovers = [topic for topic, claimed in claimed_at.items() if topic not in processing and claimed < deadline]
+    if leftovers:
+        r.hdel(CLAIMED_AT_KEY, *leftovers)
+    return sum(1 for topic in stale if requeue_topic(topic))
+
+
+def pending_count():
+    return get_redis_client().llen(PENDING_KEY)
+
+
+if __name__ == '__main__':
+    # python topic_queue.py import topics_backfill.txt [more.txt ...]
+    if len(sys.argv) < 3 or sys.argv[1] != 'import':
+        print("Usage: python topic_queue.py import <file> [<file> ...]")
+        sys.exit(1)
+    for file_path in sys.argv[2:]:
+        with open(file_path, encoding='utf-8') as topics_file:
+            print(f"{file_path}: added {import_topics(topics_file)} topics")
+    print(f"Pending topics: {pending_count()}")
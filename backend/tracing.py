@@ -0,0 +1,197 @@
+# backend/tracing.py
+"""
+Сквозная трассировка: HTTP-запрос Flask -> задача Celery -> вызовы провайдеров и Firestore.
+
+OpenTelemetry — необязательная зависимость (как orjson и brotli в responses.py): без пакета
+или без настроенного экспорта все функции модуля ничего не делают. Экспорт выбирается окружением:
+  OTEL_EXPORTER_OTLP_ENDPOINT — OTLP/HTTP коллектор (например, http://localhost:4318);
+  TRACE_FILE                  — спаны JSON-строками в локальный файл;
+  OTEL_SERVICE_NAME           — имя сервиса (в supervisord.conf своё у веба, воркера и beat).
+
+Передача контекста в Celery: при публикации задачи (сигнал before_task_publish срабатывает
+внутри send_task/apply_async) в заголовки сообщения пишутся traceparent/tracestate
+и enqueued_at. FlaskTask.__call__ продолжает трассу через task_span:
+  celery.queue_wait     — от enqueued_at до начала выполнения (ожидание свободного воркера);
+  celery.run <задача>   — само выполнение.
+Их соотношение показывает, чего не хватает: воркеров (растёт ожидание) или скорости кода.
+
+Внутри задачи: спаны provider.<имя> в resilience.call, firestore.* в doc_cache; если установлены
+opentelemetry-instrumentation-grpc / -requests, трассируются и все RPC Firestore и Gemini
+и HTTP-запросы (SearchAPI, загрузка страниц).
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from celery.signals import before_task_publish
+
+try:
+    from opentelemetry import context as otel_context, propagate, trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:
+    trace = None
+
+OTLP_ENDPOINT = os.environ.get('OTEL_EXPORTER_OTLP_ENDPOINT')
+TRACE_FILE = os.environ.get('TRACE_FILE')
+SERVICE_NAME = os.environ.get('OTEL_SERVICE_NAME', 'factcheck')
+CARRIER_HEADERS = ('traceparent', 'tracestate')
+
+_tracer = None
+
+
+def _exporter():
+    if OTLP_ENDPOINT:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter(endpoint=f"{OTLP_ENDPOINT.rstrip('/')}/v1/traces")
+    trace_file = open(TRACE_FILE, 'a', encoding='utf-8', buffering=1)
+    return ConsoleSpanExporter(out=trace_file, formatter=lambda span: span.to_json(indent=None) + "\n")
+
+
+def _instrument_libraries():
+    """Автоинструментирование gRPC (Firestore, Gemini) и requests, если пакеты установлены."""
+    try:
+        from opentelemetry.instrumentation.grpc import GrpcInstrumentorClient
+        GrpcInstrumentorClient().instrument()
+    except ImportError:
+        pass
+    try:
+        from opentelemetry.instrumentation.requests import RequestsInstrumentor
+        RequestsInstrumentor().instrument()
+    except ImportError:
+        pass
+
+
+def setup():
+    """Включает трассировку, если есть OpenTelemetry и задан экспорт. Повторный вызов ничего не делает."""
+    global _tracer
+    if _tracer is not None or trace is None or not (OTLP_ENDPOINT or TRACE_FILE):
+        return _tracer is not None
+    provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    # BatchSpanProcessor пересоздаёт поток экспорта в дочерних процессах (prefork Celery)
+    provider.add_span_processor(BatchSpanProcessor(_exporter()))
+    trace.set_tracer_provider(provider)
+    _instrument_libraries()
+    _tracer = trace.get_tracer(__name__)
+    print(f"[tracing] Exporting spans of {SERVICE_NAME} to {OTLP_ENDPOINT or TRACE_FILE}")
+    return True
+
+
+@contextmanager
+def span(name, attributes=None):
+    """Дочерний спан текущей трассы (None вместо спана, если трассировка выключена)."""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def set_attribute(key, value):
+    """Атрибут текущего спана (например, что вызов провайдера был захеджирован)."""
+    if _tracer is not None:
+        trace.get_current_span().set_attribute(key, value)
+
+
+def bind(fn):
+    """
+    Переносит текущий контекст трассы в поток пула: спаны внутри fn
+    станут дочерними для вызвавшего, а не отдельными трассами.
+    """
+    if _tracer is None:
+        return fn
+    parent = otel_context.get_current()
+
+    def bound(*args, **kwargs):
+        token = otel_context.attach(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            otel_context.detach(token)
+    return bound
+
+
+# --- Celery ---
+
+@before_task_publish.connect
+def _inject_task_headers(headers=None, **kwargs):
+    if headers is None:
+        return
+    headers['enqueued_at'] = time.time()
+    if _tracer is not None:
+        propagate.inject(headers)
+
+
+def _request_header(request, name):
+    return getattr(request, name, None) or (getattr(request, 'headers', None) or {}).get(name)
+
+
+@contextmanager
+def task_span(task):
+    """Продолжает трассу отправителя задачи: спан ожидания в очереди и спан выполнения."""
+    if _tracer is None:
+        yield None
+        return
+    request = task.request
+    carrier = {name: value for name in CARRIER_HEADERS if (value := _request_header(request, name))}
+    # Прямой вызов задачи как функции (без сообщения) остаётся внутри текущей трассы
+    parent = propagate.extract(carrier) if carrier else None
+    attributes = {"celery.task_name": task.name, "celery.task_id": request.id or '',
+                  "celery.retries": request.retries or 0}
+    started_ns = time.time_ns()
+    enqueued_at = _request_header(request, 'enqueued_at')
+    if enqueued_at:
+        enqueued_ns = min(int(float(enqueued_at) * 1e9), started_ns)
+        attributes["celery.queue_wait_ms"] = (started_ns - enqueued_ns) // 1_000_000
+        _tracer.start_span('celery.queue_wait', context=parent, kind=SpanKind.CONSUMER,
+                           start_time=enqueued_ns, attributes=attributes).end(end_time=started_ns)
+    with _tracer.start_as_current_span(f"celery.run {task.name}", context=parent, kind=SpanKind.CONSUMER,
+                                       start_time=started_ns, attributes=attributes) as current:
+        yield current
+
+
+# --- Flask ---
+
+def init_app(app):
+    """Спан на каждый HTTP-запрос; задачи, отправленные из обработчика, продолжают его трассу."""
+    if _tracer is None:
+        return
+    app.before_request(_start_request_span)
+    app.after_request(_record_response)
+    app.teardown_request(_end_request_span)
+
+
+def _start_request_span():
+    from flask import g, request
+    # Входящий traceparent (прокси, балансировщик) делает запрос частью внешней трассы
+    parent = propagate.extract(request.headers)
+    route = request.url_rule.rule if request.url_rule else request.path
+    request_span = _tracer.start_span(f"{request.method} {route}", context=parent, kind=SpanKind.SERVER,
+                                      attributes={"http.method": request.method, "http.route": route,
+                                                  "http.target": request.full_path})
+    g.trace_span = request_span
+    g.trace_token = otel_context.attach(trace.set_span_in_context(request_span, parent))
+
+
+def _record_response(response):
+    from flask import g
+    request_span = g.get('trace_span')
+    if request_span is not None:
+        request_span.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 500:
+            request_span.set_status(Status(StatusCode.ERROR))
+    return response
+
+
+def _end_request_span(exc):
+    from flask import g
+    request_span = g.pop('trace_span', None)
+    if request_span is None:
+        return
+    if exc is not None:
+        request_span.record_exception(exc)
+        request_span.set_status(Status(StatusCode.ERROR))
+    request_span.end()
+    otel_context.detach(g.pop('trace_token'))